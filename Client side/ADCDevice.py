@@ -25,6 +25,9 @@ class ADCDevice(object):
             print("Not found device in address 0x%x"%(addr))
             return False
             
+    def scan(self, channels): # read several channels, returns their values in order
+        return [self.analogRead(chn) for chn in channels]
+
     def close(self):
         self.bus.close()
         
@@ -38,6 +41,15 @@ class PCF8591(ADCDevice):
         value = self.bus.read_byte_data(self.address, self.cmd+chn)
         value = self.bus.read_byte_data(self.address, self.cmd+chn)
         return value
+
+    def scan(self, channels): # read several channels in one I2C block read
+        # With the auto-increment flag (0x04) the PCF8591 converts the channels
+        # in turn from the first one; the first byte read back is the stale
+        # previous conversion and is skipped.
+        first = min(channels)
+        count = max(channels) - first + 1
+        values = self.bus.read_i2c_block_data(self.address, self.cmd | 0x04 | first, count + 1)
+        return [values[chn - first + 1] for chn in channels]
     
     def analogWrite(self,value): # write DAC value
         self.bus.write_byte_data(address,cmd,value)	
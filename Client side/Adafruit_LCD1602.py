@@ -53,9 +53,20 @@ class Adafruit_CharLCD(object):
             import RPi.GPIO as GPIO
             GPIO.setwarnings(False)
         self.GPIO = GPIO
+        # Port expanders that can set several pins per bus write and queue
+        # writes into one burst (PCF8574_GPIO) get whole nibbles at a time
+        self.burst = hasattr(GPIO, 'outputs') and hasattr(GPIO, 'beginBatch')
+        self.batch_depth = 0
         self.pin_rs = pin_rs
         self.pin_e = pin_e
         self.pins_db = pins_db
+        # Pin states for every nibble value: bit n of the nibble drives pins_db[n]
+        self.nibble_states = [tuple((pin, bool(nibble >> n & 1)) for n, pin in enumerate(pins_db))
+                              for nibble in range(16)]
+        self.numcols = 16
+        self.numlines = 2
+        self.row_offsets = [0x00, 0x40, 0x14, 0x54]
+        self.resetFrame()
 
         self.GPIO.setmode(GPIO.BCM) #GPIO=None use Raspi PIN in BCM mode
         self.GPIO.setup(self.pin_e, GPIO.OUT)
@@ -82,23 +93,58 @@ class Adafruit_CharLCD(object):
         self.clear()
 
     def begin(self, cols, lines):
+        self.numcols = cols
         if (lines > 1):
             self.numlines = lines
             self.displayfunction |= self.LCD_2LINE
+        self.resetFrame()
 
     def home(self):
         self.write4bits(self.LCD_RETURNHOME)  # set cursor position to zero
+        self.flush()
         self.delayMicroseconds(3000)  # this command takes a long time!
+        self.cursor_pos = (0, 0)
 
     def clear(self):
         self.write4bits(self.LCD_CLEARDISPLAY)  # command to clear display
+        self.flush()
         self.delayMicroseconds(3000)  # 3000 microsecond sleep, clearing the display takes a long time
+        self.resetFrame()
 
     def setCursor(self, col, row):
-        self.row_offsets = [0x00, 0x40, 0x14, 0x54]
         if row > self.numlines:
             row = self.numlines - 1  # we count rows starting w/0
         self.write4bits(self.LCD_SETDDRAMADDR | (col + self.row_offsets[row]))
+        self.cursor_pos = (col, row)
+
+    def resetFrame(self):
+        """ Shadow framebuffer of what the display shows, blank after a clear """
+        self.frame = [[' '] * self.numcols for _ in range(self.numlines)]
+        self.cursor_pos = (0, 0)
+
+    def writeFrame(self, lines):
+        """ Show lines (one string per row) by rewriting only the cells that changed
+
+        No clear: the text is diffed against the shadow framebuffer and each
+        run of changed cells costs one cursor move plus its characters.
+        Returns the number of characters written.
+        """
+        written = 0
+        self.beginBatch()
+        for row, text in enumerate(lines[:self.numlines]):
+            text = text[:self.numcols].ljust(self.numcols)
+            shadow = self.frame[row]
+            for col, char in enumerate(text):
+                if shadow[col] == char:
+                    continue
+                if self.cursor_pos != (col, row):
+                    self.setCursor(col, row)
+                self.write4bits(ord(char), True)
+                shadow[col] = char
+                self.cursor_pos = (col + 1, row)
+                written += 1
+        self.endBatch()
+        return written
 
     def noDisplay(self):
         """ Turn the display off (quickly) """
@@ -158,24 +204,56 @@ class Adafruit_CharLCD(object):
         self.displaymode &= ~self.LCD_ENTRYSHIFTINCREMENT
         self.write4bits(self.LCD_ENTRYMODESET | self.displaymode)
 
+    def beginBatch(self):
+        """ Queue the following writes and send them as one I2C burst on endBatch() """
+        if self.burst:
+            self.batch_depth += 1
+            self.GPIO.beginBatch()
+
+    def endBatch(self):
+        if self.burst:
+            self.batch_depth -= 1
+            self.GPIO.endBatch()
+
+    def flush(self):
+        """ Send queued writes now, before a delay that has to follow them """
+        if self.burst:
+            self.GPIO.flush()
+
     def write4bits(self, bits, char_mode=False):
         """ Send command to LCD """
+        if self.burst:
+            self.write4bitsBurst(bits, char_mode)
+            return
         self.delayMicroseconds(1000)  # 1000 microsecond sleep
-        bits = bin(bits)[2:].zfill(8)
-        self.GPIO.output(self.pin_rs, char_mode)
-        for pin in self.pins_db:
-            self.GPIO.output(pin, False)
-        for i in range(4):
-            if bits[i] == "1":
-                self.GPIO.output(self.pins_db[::-1][i], True)
+        output = self.GPIO.output
+        output(self.pin_rs, char_mode)
+        for pin, state in self.nibble_states[bits >> 4 & 0x0F]:  # high nibble
+            output(pin, state)
         self.pulseEnable()
-        for pin in self.pins_db:
-            self.GPIO.output(pin, False)
-        for i in range(4, 8):
-            if bits[i] == "1":
-                self.GPIO.output(self.pins_db[::-1][i-4], True)
+        for pin, state in self.nibble_states[bits & 0x0F]:  # low nibble
+            output(pin, state)
         self.pulseEnable()
 
+    def write4bitsBurst(self, bits, char_mode=False):
+        """ Send command to LCD as six port states: (data, E high, E low) per nibble
+
+        Inside a batch the bus paces the burst (about 90us per byte at
+        100kHz), which covers the enable pulse width and the 37us command
+        settle time, so only a standalone command keeps the 1ms sleep.
+        """
+        if not self.batch_depth:
+            self.delayMicroseconds(1000)  # 1000 microsecond sleep
+        GPIO = self.GPIO
+        enable_high = ((self.pin_e, True),)
+        enable_low = ((self.pin_e, False),)
+        GPIO.beginBatch()
+        for nibble in (bits >> 4 & 0x0F, bits & 0x0F):
+            GPIO.outputs(((self.pin_rs, char_mode),) + self.nibble_states[nibble])
+            GPIO.outputs(enable_high)
+            GPIO.outputs(enable_low)
+        GPIO.endBatch()
+
     def delayMicroseconds(self, microseconds):
         seconds = microseconds / float(1000000)  # divide microseconds by 1 million for seconds
         sleep(seconds)
@@ -190,11 +268,19 @@ class Adafruit_CharLCD(object):
 
     def message(self, text):
         """ Send string to LCD. Newline wraps to second line"""
+        self.beginBatch()
+        col, row = self.cursor_pos
         for char in text:
             if char == '\n':
                 self.write4bits(0xC0)  # next line
+                col, row = 0, 1
             else:
                 self.write4bits(ord(char), True)
+                if col < self.numcols and row < self.numlines:
+                    self.frame[row][col] = char
+                col += 1
+        self.cursor_pos = (col, row)
+        self.endBatch()
 
 
 if __name__ == '__main__':
@@ -10,11 +10,15 @@ class PCF8574_I2C(object):
     OUPUT = 0
     INPUT = 1
     
+    BLOCK_SIZE = 33 # Bytes per I2C block write: the command byte plus 32 data bytes
+
     def __init__(self,address):
         # Note you need to change the bus number to 0 if running on a revision 1 Raspberry Pi.
         self.bus = smbus.SMBus(0)
         self.address = address
         self.currentValue = 0
+        self.batchDepth = 0 # >0 while port states are collected instead of written
+        self.pending = []   # Port states waiting for flush()
         self.writeByte(0)   #I2C test.
         
     def readByte(self):#Read PCF8574 all port of the data
@@ -23,7 +27,30 @@ class PCF8574_I2C(object):
         
     def writeByte(self,value):#Write data to PCF8574 port
         self.currentValue = value
-        self.bus.write_byte(self.address,value)
+        if self.batchDepth:
+            self.pending.append(value)
+        else:
+            self.bus.write_byte(self.address,value)
+
+    def beginBatch(self):#Collect port states until the matching endBatch
+        self.batchDepth += 1
+
+    def endBatch(self):
+        self.batchDepth -= 1
+        if not self.batchDepth:
+            self.flush()
+
+    def flush(self):#Write the collected port states as I2C block writes
+        # Every byte of a write transaction updates the PCF8574 port in turn,
+        # so the first state goes out as the "command" byte of the block
+        pending = self.pending
+        self.pending = []
+        for i in range(0, len(pending), self.BLOCK_SIZE):
+            chunk = pending[i:i + self.BLOCK_SIZE]
+            if len(chunk) == 1:
+                self.bus.write_byte(self.address, chunk[0])
+            else:
+                self.bus.write_i2c_block_data(self.address, chunk[0], chunk[1:])
 
     def digitalRead(self,pin):#Read PCF8574 one port of the data
         value = readByte()  
@@ -37,6 +64,15 @@ class PCF8574_I2C(object):
             value &= ~(1<<pin)
         self.writeByte(value)   
 
+    def digitalWrites(self,pins):#Write several ports as one port state, pins: (pin,value) pairs
+        value = self.currentValue
+        for pin,newvalue in pins:
+            if newvalue:
+                value |= (1<<pin)
+            else:
+                value &= ~(1<<pin)
+        self.writeByte(value)
+
 def loop():
     mcp = PCF8574_I2C(0x27)
     while True:
@@ -65,6 +101,14 @@ class PCF8574_GPIO(object):#Standardization function interface
         return self.chip.digitalRead(pin)
     def output(self,pin,value):#Write data to PCF8574 one port
         self.chip.digitalWrite(pin,value)
+    def outputs(self,pins):#Write several ports in one I2C byte, pins: (pin,value) pairs
+        self.chip.digitalWrites(pins)
+    def beginBatch(self):#Queue port writes and send them as one burst on endBatch
+        self.chip.beginBatch()
+    def endBatch(self):
+        self.chip.endBatch()
+    def flush(self):#Send queued port writes now, even inside a batch
+        self.chip.flush()
         
 def destroy():
     bus.close()
@@ -5,164 +5,244 @@
 # Author      : Akshatha Vallampati
 # modification: 2024/24/04
 ########################################################################
-import RPi.GPIO as GPIO
+import os
+import sys
 import time
-import math
-import threading
-from ADCDevice import *
-from PCF8574 import PCF8574_GPIO
+import hardware
+# THERMOSTAT_HARDWARE=sim swaps in simulated I2C and GPIO (see hardware.py);
+# this has to happen before RPi.GPIO and the drivers are imported
+SIMULATED = hardware.install()
+import RPi.GPIO as GPIO
 import socket
-from Adafruit_LCD1602 import Adafruit_CharLCD
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad,unpad
-
-adc = ADCDevice() # Define an ADCDevice class object
+from discovery import ProbeCache, device_id, open_adc, open_lcd_async
+from sampler import Sampler
+from calibration import Calibration
+from client_runtime import ClientRuntime
+# The wire protocol is shared with the server and lives in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from thermostat_protocol import WIRE_BINARY, decode_command, encode_knob, encode_telemetry
+from reporting import ChangeReporter
+from structured_log import INFO, configure
+from profiler import SUMMARY_INTERVAL, Profiler
+from secure_channel import SecureSession, load_key, parse_header
+
+# I2C addresses (and the device ID) found by earlier runs, see discovery.py
+PROBE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'i2c-probe.json')
+probes = ProbeCache(PROBE_CACHE)
+adc = None  # The ADC driver, found in setup()
+mcp = lcd = None  # The LCD and its PCF8574, set once the LCD thread has initialised them
+sampler = None  # Background ADC sampler, started in setup()
+SAMPLE_RATE = 50  # ADC scans per second
+SAMPLE_STALE = 2.0  # Seconds without a good ADC scan before readings count as stale
 
 # Define the IP address and port of the server (laptop)
-SERVER_IP = '192.168.0.110'#'192.168.17.88'
-SERVER_PORT = 12345
+SERVER_IP = os.environ.get('THERMOSTAT_SERVER_IP', '192.168.0.110')#'192.168.17.88'
+SERVER_PORT = int(os.environ.get('THERMOSTAT_SERVER_PORT', 12345))
+# Identifies this thermostat to the server; set THERMOSTAT_DEVICE_ID to run
+# several (simulated) thermostats on one machine
+DEVICE_ID = (int(os.environ['THERMOSTAT_DEVICE_ID'], 0) if 'THERMOSTAT_DEVICE_ID' in os.environ
+             else device_id(probes))
+# Log records are written by a background thread; DEBUG adds every ADC reading
+LOG_LEVEL = INFO
+log = configure(LOG_LEVEL)
+# Timing spans and I2C counters (see profiler.py), off unless THERMOSTAT_PROFILE=1
+profiler = Profiler() if os.environ.get('THERMOSTAT_PROFILE') == '1' else None
+# Thermistor and potentiometer conversion tables, cached per device next to this script
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'calibration-%08x.json' % DEVICE_ID)
+calibration = Calibration.load(CALIBRATION_FILE)
+# This thermostat's pre-shared key, see secure_channel.py to provision one
+DEVICE_KEY_FILE = os.environ.get('THERMOSTAT_DEVICE_KEY',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'device.key'))
+session = None  # Encryption session with the server, set up in loop()
+# Timer periods of the client's event loop, in seconds
+SAMPLE_INTERVAL = 0.5   # Sensor reads and knob checks
+SEND_INTERVAL = 2.0     # Telemetry datagrams
+DISPLAY_INTERVAL = 0.5  # LCD refreshes
+runtime = None  # The client's event loop, set up in loop()
+tempC = tempS = None  # Latest sensor readings
+set_temp = None  # Latest set temperature from the server
+led_state = None  # (cool, heat) currently driven on the LEDs
+shown = None  # (tempC, set_temp) currently on the LCD
+stale = False  # True while the sampler has no recent ADC scan
+prev_control_knob_status = None  # Last control knob status sent
+seq = 0  # Sequence number of the datagrams sent
+# Telemetry is only sent when it moved past a deadband, or as a heartbeat
+reporter = ChangeReporter()
 
 heat_led = 40
 cool_led = 38
 
 def setup():
-    global adc
+    global adc, sampler
     GPIO.setmode(GPIO.BOARD)
     GPIO.setup(cool_led, GPIO.OUT)
     GPIO.output(cool_led, GPIO.LOW)
     GPIO.setup(heat_led, GPIO.OUT)  
     GPIO.output(heat_led, GPIO.LOW)
-    if adc.detectI2C(0x48): # Detect the pcf8591.
-        adc = PCF8591()
-    elif adc.detectI2C(0x4b): # Detect the ads7830
-        adc = ADS7830()
-    else:
-        print("No correct I2C address found, \n"
-              "Please use command 'i2cdetect -y 1' to check the I2C address! \n"
-              "Program Exit. \n")
+    adc = open_adc(probes)  # The PCF8591 or the ADS7830, cached address first
+    if adc is None:
+        log.error('no_adc', hint="use command 'i2cdetect -y 1' to check the I2C address")
+        exit(-1)
+    if profiler is not None:
+        profiler.instrument_adc(adc)
+        profiler.dump_on_signal(log)
+    # Sample both channels in the background so a reading is never a bus transaction
+    sampler = Sampler(adc, (0, 1), SAMPLE_RATE)
+    sampler.start()
+    # The LCD's init delays run on their own thread; readings are reported meanwhile
+    open_lcd_async(probes, display_ready)
+    if not sampler.ready.wait(SAMPLE_STALE):
+        log.error('no_samples', errors=sampler.errors, error=sampler.last_error)
         exit(-1)
 
-def getTemperature():
-    value = adc.analogRead(0)        # read ADC value A0 pin
-    voltage = value / 255.0 * 3.3        # calculate voltage
-    Rt = 10 * voltage / (3.3 - voltage)    # calculate resistance value of thermistor
-    tempK = 1/(1/(273.15 + 25) + math.log(Rt/10)/3950.0) # calculate temperature (Kelvin)
-    tempC = tempK -273.15        # calculate temperature (Celsius)
-    print('ADC Value : %d, Voltage : %.2f, Temperature : %.2f' % (value, voltage, tempC))
+def display_ready(found):
+    """ LCD thread: start showing readings, or carry on without a display """
+    global mcp, lcd
+    if found is None:
+        log.error('no_lcd', hint='no PCF8574 at 0x27 or 0x3F')
+        return
+    if profiler is not None:
+        profiler.instrument_lcd(*found)
+    mcp, lcd = found
+
+def getTemperature(value=None):
+    if value is None:
+        value = adc.analogRead(0)        # read ADC value A0 pin
+    tempC = calibration.temperature(value)  # look up temperature (Celsius)
+    log.debug('temperature', adc=value, celsius=tempC)
     return tempC
 
-def get_set_temperature():
-    value = adc.analogRead(1)  # read ADC value A1 pin (connected to potentiometer)
-    voltage = value / 255.0 * 3.3  # calculate voltage
-    set_temp = (voltage / 3.3) * 100  # convert voltage to percentage (0-100)
-    return set_temp
+def get_set_temperature(value=None):
+    if value is None:
+        value = adc.analogRead(1)  # read ADC value A1 pin (connected to potentiometer)
+    return calibration.set_temperature(value)  # look up set temperature (0-100)
+
+def read_sensors():
+    # Thermistor: oversampled and median filtered for finer, spike free readings.
+    # Potentiometer: plain median, so the knob does not "turn" on sub-step noise
+    return getTemperature(sampler.filtered(0)), get_set_temperature(sampler.median(1))
 
 def display_temperature(tempC, set_temp):
-    lcd.clear()
-    lcd.setCursor(0, 0)  # set cursor position
-    lcd.message('Current: {:.2f} C\n'.format(tempC))
-    lcd.message('Set: {:.2f} C'.format(set_temp))
-
-def receive_and_process(s,tempC):
-    while True:
-        data, addr = s.recvfrom(1024)
-        # Extract the secret key and encrypted message from the received data
-        secret_key1 = data[:16]
-        encrypted_message = data[16:]
-
-        # Decrypt the received message using AES ECB mode and the shared secret key
-        cipher = AES.new(secret_key1, AES.MODE_ECB)
-        decrypted_message = unpad(cipher.decrypt(encrypted_message), AES.block_size)
-        # Print the encrypted and decrypted messages
-        print(f"Received encrypted message from {addr}: {encrypted_message.hex()}")
-        print(f"Decrypted message: {decrypted_message.decode()}")
-        data = decrypted_message.decode().split(',')
-        set_temp = float(data[0])
+    # Only the characters that changed since the last update are written
+    lcd.writeFrame(['Current: {:.2f} C'.format(tempC),
+                    'Set: {:.2f} C'.format(set_temp)])
+
+def send(frame):
+    # Encrypt and authenticate the message with the session key. Secure
+    # frames always carry binary frames: no server older than those opens them
+    runtime.send(session.seal(frame), (SERVER_IP, SERVER_PORT))  # Send data to control server
+
+def apply_command(command):
+    """ Drive the LEDs from a server command, skipping GPIO work if nothing changed """
+    global set_temp, led_state
+    set_temp, cool_on, heat_on = command
+    if (cool_on, heat_on) == led_state:
+        return
+    led_state = (cool_on, heat_on)
+    log.info('leds', cool=cool_on, heat=heat_on)
+    GPIO.output(cool_led, GPIO.HIGH if cool_on else GPIO.LOW)
+    GPIO.output(heat_led, GPIO.HIGH if heat_on else GPIO.LOW)
+
+def receive(data, addr):
+    """ Reply handler: set temperature and LED status from the server """
+    log.debug('reply', addr=addr, data=data)
+    # Authenticate and decrypt the reply with the session key
+    try:
+        device_id, reply_seq, salt = parse_header(data)
+        if device_id != DEVICE_ID or salt != session.salt:
+            raise ValueError("reply for another session")
+        decrypted_message = session.open(data, reply_seq)
+        if not decrypted_message:
+            # The server's challenge: send the last frame again under its cookie
+            runtime.send(session.reseal(), (SERVER_IP, SERVER_PORT))
+            return
+        reply = decode_command(decrypted_message)
+    except ValueError as e:
+        log.warning('dropped_reply', addr=addr, error=str(e))
+        return
+    if reply is None:
+        return  # Keepalive: the last command still stands
+    apply_command(reply[:3])
+
+def next_seq():
+    global seq
+    seq += 1
+    return seq
+
+def sample():
+    """ Sample timer: read the sensors, send the knob status when it changes """
+    global tempC, tempS, prev_control_knob_status, stale
+    if (sampler.age() > SAMPLE_STALE) != stale:
+        stale = not stale
+        log.warning('stale_samples' if stale else 'samples_resumed', **sampler.stats())
+    if stale:
+        return  # The readings are frozen; report nothing rather than old values
+    prev_tempS = tempS
+    tempC, tempS = read_sensors()
+    # Determine control knob status
+    if tempS > prev_tempS:
+        control_knob_status = "Increasing"
+    elif tempS < prev_tempS:
+        control_knob_status = "Decreasing"
+    else:
+        control_knob_status = "Not Turned"
+    # Send control knob status to the server only if it has changed
+    if control_knob_status != prev_control_knob_status:
+        log.info('knob', status=control_knob_status)
+        send(encode_knob(WIRE_BINARY, DEVICE_ID, next_seq(), control_knob_status))
+        prev_control_knob_status = control_knob_status  # Update previous control knob status
+
+def send_telemetry():
+    """ Send timer: current temperature and set temperature, if they changed """
+    if not stale and reporter.due(tempC, tempS, time.monotonic()):
+        send(encode_telemetry(WIRE_BINARY, DEVICE_ID, next_seq(), tempC, tempS))
+
+def refresh_display():
+    """ Display timer: show the latest reading once the server has answered """
+    global shown
+    if lcd is None:
+        return  # Still initialising, or there is no display
+    reading = (round(tempC, 2), set_temp)
+    if set_temp is not None and reading != shown:
+        shown = reading
         display_temperature(tempC, set_temp)
-        cool_status = data[1]
-        heat_status = data[2]
-        print(f"Received LED status: Cool: {cool_status}, Heat: {heat_status}")
-        if cool_status == 'ON':
-            GPIO.output(cool_led, GPIO.HIGH)
-        else:
-            GPIO.output(cool_led, GPIO.LOW)
-        if heat_status == 'ON':
-            GPIO.output(heat_led, GPIO.HIGH)
-        else:
-            GPIO.output(heat_led, GPIO.LOW)
+
+def stage(func, name):
+    """ func, timed as the loop stage name when profiling """
+    return profiler.wrap(func, 'loop.' + name) if profiler is not None else func
 
 def loop():
-    mcp.output(3, 1)     # turn on LCD backlight
-    lcd.begin(16, 2)     # set number of LCD lines and columns
-    # Generate a random 16-byte (128-bit) secret key for AES encryption
-    secret_key = get_random_bytes(16)
+    global runtime, session, tempC, tempS
+    # Start a new session (fresh salt) keyed by this thermostat's pre-shared key
+    session = SecureSession(load_key(DEVICE_KEY_FILE), DEVICE_ID)
+    if profiler is not None:
+        profiler.instrument(session, ('seal', 'open'), 'aes')
+    tempC, tempS = read_sensors()
     # Create a UDP socket
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-        prev_tempS = get_set_temperature()
-        prev_control_knob_status = None  # Initialize previous control knob status
-        #receive_thread = threading.Thread(target=receive_and_process, args=(s,))
-        #receive_thread.start()
-        while True:
-            tempC = getTemperature()
-            tempS = get_set_temperature()
-            receive_thread = threading.Thread(target=receive_and_process, args=(s,tempC))
-            receive_thread.start()
-            # Determine control knob status
-            if tempS > prev_tempS:
-                control_knob_status = "Increasing"
-            elif tempS < prev_tempS:
-                control_knob_status = "Decreasing"
-            else:
-                control_knob_status = "Not Turned"
-            print("control_knob_status", control_knob_status)
-
-            # Send control knob status to the server only if it has changed
-            if control_knob_status != prev_control_knob_status:
-                send_data = f"{control_knob_status}"  # Combine sensor data
-                # Pad the message to align with block boundary
-                padded_message = pad(send_data.encode(), AES.block_size)
-                # Encrypt the message using AES with the secret key
-                cipher = AES.new(secret_key, AES.MODE_ECB)
-                # Encrypt the padded message
-                encrypted_message = cipher.encrypt(padded_message)
-
-                s.sendto(secret_key + encrypted_message, (SERVER_IP, SERVER_PORT))  # Send data to control server
-                prev_control_knob_status = control_knob_status  # Update previous control knob status
-            time.sleep(1)  # Send data once every second            
-            #display_temperature(tempC, tempS)  # Display temperature on the LCD
-            # Send temperature data every second
-            send_data = f"{tempC},{tempS}"  # Combine sensor data
-            # Pad the message to align with block boundary
-            padded_message = pad(send_data.encode(), AES.block_size)
-            # Encrypt the message using AES with the secret key
-            cipher = AES.new(secret_key, AES.MODE_ECB)
-            # Encrypt the padded message
-            encrypted_message = cipher.encrypt(padded_message)
-            s.sendto(secret_key + encrypted_message, (SERVER_IP, SERVER_PORT))  # Send data to control server
-            time.sleep(1)  # Send data once every second         
-            prev_tempS = tempS  # Update previous potentiometer status
+        # Everything runs on one event loop: three timers and the reply handler
+        runtime = ClientRuntime(s, log)
+        runtime.on_receive(stage(receive, 'receive'))
+        runtime.every(SAMPLE_INTERVAL, stage(sample, 'sample'))
+        runtime.every(SEND_INTERVAL, stage(send_telemetry, 'send'))
+        runtime.every(DISPLAY_INTERVAL, stage(refresh_display, 'display'))
+        if profiler is not None:
+            profiler.instrument(runtime, ('send',), 'socket')
+            runtime.every(SUMMARY_INTERVAL, lambda: profiler.log_summary(log))
+        runtime.run()
 
 def destroy():
+    sampler.stop()
+    sampler.join()
+    log.info('sampler', **sampler.stats())
+    if SIMULATED:
+        log.info('sim_hardware', **hardware.stats())
     adc.close()
     GPIO.cleanup()
 
-PCF8574_address = 0x27  # I2C address of the PCF8574 chip.
-PCF8574A_address = 0x3F  # I2C address of the PCF8574A chip.
-# Create PCF8574 GPIO adapter.
-try:
-    mcp = PCF8574_GPIO(PCF8574_address)
-except:
-    try:
-        mcp = PCF8574_GPIO(PCF8574A_address)
-    except:
-        print('I2C Address Error !')
-        exit(1)
-# Create LCD, passing in MCP GPIO adapter.
-lcd = Adafruit_CharLCD(pin_rs=0, pin_e=2, pins_db=[4, 5, 6, 7], GPIO=mcp)
-
 if __name__ == '__main__':  # Program entrance
-    print('Program is starting ... ')
+    log.info('starting', device_id=DEVICE_ID)
     setup()
 
     try:
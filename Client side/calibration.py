@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : calibration.py
+# Description : Per-device sensor calibration as precomputed lookup tables
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The ADC has 2**bits possible readings, so the thermistor and set point
+# conversions are computed once per reading into a table and a conversion
+# is an index (plus linear interpolation for oversampled, fractional
+# readings). The thermistor sits on the low side of a voltage divider with
+# a series resistor; it is modelled with the Beta equation or, when
+# coefficients are given, the Steinhart-Hart equation.
+#
+# The calibration of a device is a small JSON file holding the parameters,
+# the tables and a copy of the parameters the tables were built from.
+# Change a parameter to have the tables rebuilt at startup.
+import json
+import math
+import os
+from array import array
+
+DEFAULTS = {
+    'bits': 8,                  # ADC resolution
+    'series_resistor': 10000.0, # Ohms
+    'r0': 10000.0,              # Thermistor resistance at t0, ohms
+    't0': 25.0,                 # Celsius
+    'beta': 3950.0,
+    'steinhart_hart': None,     # [A, B, C] overrides beta when set
+    'set_min': 0.0,             # Set point at the potentiometer's ends
+    'set_max': 100.0,
+}
+
+
+class Calibration(object):
+    """ Thermistor and set point lookup tables for one thermostat """
+
+    def __init__(self, tables=None, **params):
+        unknown = set(params) - set(DEFAULTS)
+        if unknown:
+            raise ValueError("unknown calibration parameters %s" % ', '.join(sorted(unknown)))
+        self.params = dict(DEFAULTS, **params)
+        self.full_scale = (1 << self.params['bits']) - 1
+        if tables is None:
+            readings = range(self.full_scale + 1)
+            tables = map(self.thermistor_celsius, readings), map(self.set_point, readings)
+        self.temp_table, self.set_table = (array('d', table) for table in tables)
+
+    def thermistor_celsius(self, value):
+        """ The exact conversion of one ADC reading, used to build the table """
+        # The rails give a zero or infinite resistance, use half a step inside them
+        value = min(max(value, 0.5), self.full_scale - 0.5)
+        p = self.params
+        resistance = p['series_resistor'] * value / (self.full_scale - value)
+        if p['steinhart_hart']:
+            a, b, c = p['steinhart_hart']
+            ln_r = math.log(resistance)
+            kelvin = 1 / (a + b * ln_r + c * ln_r ** 3)
+        else:
+            kelvin = 1 / (1 / (273.15 + p['t0']) + math.log(resistance / p['r0']) / p['beta'])
+        return kelvin - 273.15
+
+    def set_point(self, value):
+        p = self.params
+        return p['set_min'] + (p['set_max'] - p['set_min']) * value / self.full_scale
+
+    def _lookup(self, table, value):
+        index = int(value)
+        if index < self.full_scale:
+            low = table[index]
+            return low + (value - index) * (table[index + 1] - low)
+        return table[self.full_scale]
+
+    def temperature(self, value):
+        """ ADC reading (may be fractional) -> degrees Celsius """
+        return self._lookup(self.temp_table, value)
+
+    def set_temperature(self, value):
+        """ Potentiometer ADC reading -> set point """
+        return self._lookup(self.set_table, value)
+
+    def save(self, path):
+        # Write and rename so a crash or a second client never leaves half a file
+        temp = '%s.%d' % (path, os.getpid())
+        with open(temp, 'w') as f:
+            json.dump({'params': self.params,
+                       'built_from': self.params,  # Compared with params by load()
+                       'temperature': list(self.temp_table),
+                       'set_temperature': list(self.set_table)}, f)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path, **defaults):
+        """ Calibration cached at path, built from defaults and saved when missing or stale """
+        params = dict(DEFAULTS, **defaults)
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}  # Missing or damaged: rebuild
+        if not isinstance(cached, dict):
+            cached = {}
+        params.update(cached.get('params', {}))
+        size = 1 << params['bits']
+        tables = cached.get('temperature', ()), cached.get('set_temperature', ())
+        if cached.get('built_from') == params and all(len(table) == size for table in tables):
+            return cls(tables, **params)
+        calibration = cls(**params)
+        try:
+            calibration.save(path)
+        except OSError:
+            pass  # A read-only disk only costs rebuilding the tables next time
+        return calibration
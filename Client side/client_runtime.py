@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : client_runtime.py
+# Description : Single-threaded event loop for the thermostat clients
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The client's work is a few periodic jobs (sample the sensors, send
+# telemetry, refresh the display) and handling the server's replies. All of
+# it runs as callbacks on one loop: the jobs on fixed-rate timers and the
+# replies from a reader on the non-blocking socket, so a lost reply never
+# stalls sampling and no threads are started per iteration.
+#
+# The loop is a timer heap and a selector rather than asyncio: that is all
+# the client needs, and importing asyncio alone takes longer than the rest
+# of the client's start-up.
+import heapq
+import itertools
+import selectors
+import time
+
+RECV_BUFFER_SIZE = 1024
+
+
+class ClientRuntime(object):
+    """ Periodic timers and one receive handler on a single event loop """
+
+    def __init__(self, sock, log):
+        self.sock = sock
+        self.log = log
+        self.sock.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.timers = []  # Heap of (deadline, order, interval, callback)
+        self.order = itertools.count()  # Equal deadlines run in the order they were added
+        self.receive_handler = None
+        self.running = False
+
+    def every(self, interval, callback):
+        """ Run callback every interval seconds, starting now """
+        heapq.heappush(self.timers, (time.monotonic(), next(self.order), interval, callback))
+
+    def on_receive(self, handler):
+        """ Call handler(data, addr) for every datagram received """
+        self.receive_handler = handler
+
+    def send(self, data, addr):
+        try:
+            self.sock.sendto(data, addr)
+        except OSError as e:
+            # UDP is best effort; the next send timer tries again
+            self.log.warning('send_failed', addr=addr, error=str(e))
+
+    def read_ready(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(RECV_BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self.log.warning('receive_failed', error=str(e))  # e.g. ICMP port unreachable
+                return
+            self.receive_handler(data, addr)
+
+    def run_timers(self):
+        """ Run the due timers, return the seconds until the next one """
+        timers = self.timers
+        now = time.monotonic()
+        while timers and timers[0][0] <= now:
+            deadline, _, interval, callback = timers[0]
+            # Fall behind rather than burst if the loop was held up
+            heapq.heapreplace(timers, (max(deadline + interval, now), next(self.order), interval, callback))
+            callback()
+            now = time.monotonic()
+        return max(timers[0][0] - now, 0.0) if timers else None
+
+    def run(self):
+        """ Run until stop() or Ctrl-C """
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        self.running = True
+        try:
+            while self.running:
+                if self.selector.select(self.run_timers()):
+                    self.read_ready()
+        finally:
+            self.selector.unregister(self.sock)
+            self.selector.close()
+
+    def stop(self):
+        """ Leave run() once the current callback or wait is over """
+        self.running = False
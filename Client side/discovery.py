@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : discovery.py
+# Description : Find the thermostat's I2C devices once and remember where
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The ADC is a PCF8591 (0x48) or an ADS7830 (0x4b) and the LCD sits behind
+# a PCF8574 (0x27) or PCF8574A (0x3F). Which ones a thermostat has does not
+# change between boots, so the addresses found are kept in a small JSON
+# file and tried first next time: a warm start costs one confirming bus
+# transaction per device instead of a scan with a failing probe.
+#
+# The LCD needs about 10 ms of init delays before it shows anything, and
+# nothing else waits for it, so open_lcd_async() does that on a thread
+# while the client starts sampling and reporting.
+import json
+import os
+import threading
+
+from ADCDevice import ADS7830, PCF8591
+from Adafruit_LCD1602 import Adafruit_CharLCD
+from PCF8574 import PCF8574_GPIO
+
+ADCS = {0x48: PCF8591, 0x4b: ADS7830}  # Address -> driver, in probe order
+LCD_ADDRESSES = (0x27, 0x3F)  # PCF8574, PCF8574A
+LCD_PINS = {'pin_rs': 0, 'pin_e': 2, 'pins_db': [4, 5, 6, 7]}
+LCD_BACKLIGHT = 3  # PCF8574 port driving the backlight
+LCD_SIZE = (16, 2)
+
+
+class ProbeCache(object):
+    """ Small persisted dict of what earlier runs found, e.g. {'adc': 72} """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()  # The LCD is found on another thread
+        try:
+            with open(path) as f:
+                self.found = json.load(f)
+        except (OSError, ValueError):
+            self.found = {}  # Missing or damaged: probe again
+
+    def get(self, name):
+        return self.found.get(name)
+
+    def put(self, name, value):
+        with self.lock:
+            if self.found.get(name) == value:
+                return
+            self.found[name] = value
+            # Write and rename so a crash or a second client never leaves half a file
+            temp = '%s.%d' % (self.path, os.getpid())
+            try:
+                with open(temp, 'w') as f:
+                    json.dump(self.found, f)
+                os.replace(temp, self.path)
+            except OSError:
+                pass  # A read-only disk only costs the probes next time
+
+
+def ordered(candidates, cached):
+    """ candidates with the cached one first """
+    return sorted(candidates, key=lambda address: address != cached)
+
+
+def device_id(cache):
+    """ This thermostat's ID: the low 32 bits of its MAC address, looked up once """
+    found = cache.get('device_id')
+    if found is None:
+        import uuid  # Slow to import; only needed the first time
+        found = uuid.getnode() & 0xFFFFFFFF
+        cache.put('device_id', found)
+    return found
+
+
+def open_adc(cache):
+    """ The ADC driver, or None when there is no ADC on the bus """
+    for address in ordered(ADCS, cache.get('adc')):
+        adc = ADCS[address]()
+        try:
+            adc.bus.write_byte(address, 0)
+        except OSError:
+            adc.close()
+            continue
+        cache.put('adc', address)
+        return adc
+    return None
+
+
+def open_lcd(cache):
+    """ (PCF8574 GPIO adapter, initialised LCD), or None when there is no LCD """
+    for address in ordered(LCD_ADDRESSES, cache.get('lcd')):
+        try:
+            mcp = PCF8574_GPIO(address)  # Writes the port once, which fails without a chip
+        except OSError:
+            continue
+        cache.put('lcd', address)
+        lcd = Adafruit_CharLCD(GPIO=mcp, **LCD_PINS)
+        mcp.output(LCD_BACKLIGHT, 1)
+        lcd.begin(*LCD_SIZE)
+        return mcp, lcd
+    return None
+
+
+def open_lcd_async(cache, ready):
+    """ Find and initialise the LCD on a thread, then call ready(open_lcd's result) """
+    thread = threading.Thread(target=lambda: ready(open_lcd(cache)), name='lcd-init', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : hardware.py
+# Description : Hardware backend selection: the Pi's I2C and GPIO or
+#               simulated devices with a bus timing model
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The drivers and the clients import smbus and RPi.GPIO at module load.
+# install() is called before those imports: with THERMOSTAT_HARDWARE=sim it
+# puts the simulated modules below in their place, so the real clients run
+# unchanged on any Linux box. On a Pi (the default, 'pi') it does nothing.
+#
+# The simulated SMBus emulates the chips the clients talk to, by register:
+#   PCF8591 (0x48)  control byte, previous-conversion read, auto-increment
+#   ADS7830 (0x4b)  single-ended command byte decoding
+#   PCF8574 (0x27)  port writes, one state per byte written
+# Only the ADC chosen by THERMOSTAT_SIM_ADC (pcf8591 or ads7830) answers;
+# other addresses fail with EREMOTEIO like an empty bus. Every transaction
+# is charged its time on a 100 kHz bus plus a fixed driver overhead, which
+# adds up in bus_time (slept as well with THERMOSTAT_SIM_REALTIME=1), so
+# I2C and LCD cost can be measured without the hardware and without noise.
+#
+# The simulated GPIO records every pin write.
+import errno
+import math
+import os
+import random
+import sys
+import time
+import types
+from collections import deque
+
+BACKENDS = ('pi', 'sim')
+ADCS = {'pcf8591': 0x48, 'ads7830': 0x4b}
+LCD_ADDRESS = 0x27
+ADC_BUS = 1  # Bus numbers the drivers open
+LCD_BUS = 0
+BUS_CLOCK = 100000.0          # Hz, the Pi's default I2C clock
+TRANSACTION_OVERHEAD = 50e-6  # Seconds of ioctl and driver time per transaction
+HISTORY = 1024  # Pin writes and port states kept by the simulated devices
+
+
+def transaction_time(nbytes):
+    """ Modelled time of one transaction moving nbytes, address bytes included """
+    # 9 clocks per byte (8 bits and the ACK), plus start and stop
+    return TRANSACTION_OVERHEAD + (9 * nbytes + 2) / BUS_CLOCK
+
+
+class Thermistor(object):
+    """ ADC readings of the thermistor divider at a slowly drifting room temperature """
+
+    def __init__(self, rng, celsius=21.0, swing=1.5, period=600.0, noise=0.6,
+                 series_resistor=10000.0, r0=10000.0, t0=25.0, beta=3950.0, full_scale=255):
+        self.rng = rng
+        self.celsius = celsius
+        self.swing = swing
+        self.period = period
+        self.noise = noise  # Standard deviation in ADC steps
+        self.series_resistor = series_resistor
+        self.r0 = r0
+        self.t0 = t0
+        self.beta = beta
+        self.full_scale = full_scale
+        self.phase = rng.random() * period
+
+    def temperature(self, now):
+        return self.celsius + self.swing * math.sin(2 * math.pi * (now + self.phase) / self.period)
+
+    def __call__(self, now):
+        kelvin = 273.15 + self.temperature(now)
+        resistance = self.r0 * math.exp(self.beta * (1 / kelvin - 1 / (273.15 + self.t0)))
+        value = self.full_scale * resistance / (self.series_resistor + resistance)
+        return min(max(int(round(value + self.rng.gauss(0, self.noise))), 0), self.full_scale)
+
+
+class Knob(object):
+    """ A potentiometer left at one position, turned now and then """
+
+    def __init__(self, rng, value=None, turn_every=120.0, full_scale=255):
+        self.rng = rng
+        self.full_scale = full_scale
+        self.value = rng.randint(40, 70) if value is None else value
+        self.turn_every = turn_every
+        self.next_turn = time.monotonic() + rng.expovariate(1 / turn_every)
+
+    def __call__(self, now):
+        if self.turn_every and now >= self.next_turn:
+            self.value = min(max(self.value + self.rng.randint(-8, 8), 0), self.full_scale)
+            self.next_turn = now + self.rng.expovariate(1 / self.turn_every)
+        return self.value
+
+
+class SimPCF8591(object):
+    """ 4 channel ADC: reading returns the previous conversion and starts the next """
+
+    def __init__(self, inputs):
+        self.inputs = inputs  # One callable per channel: now -> reading
+        self.control = 0x40
+        self.previous = 0x80  # Power-on conversion register
+
+    def convert(self, channel):
+        result, self.previous = self.previous, self.inputs[channel % 4](time.monotonic())
+        return result
+
+    def write(self, data):
+        self.control = data[0]
+
+    def read(self, count):
+        if not self.control & 0x04:
+            return [self.convert(self.control & 0x03) for _ in range(count)]
+        # Auto-increment: the channel advances after every conversion
+        values = []
+        for _ in range(count):
+            values.append(self.convert(self.control & 0x03))
+            self.control = self.control & ~0x03 | (self.control + 1) & 0x03
+        return values
+
+
+class SimADS7830(object):
+    """ 8 channel ADC: the command byte selects the channel, reads are fresh """
+    # Command bits 6..4 for single-ended inputs 0..7, as the driver encodes them
+    CHANNELS = {((chn << 2 | chn >> 1) & 0x07): chn for chn in range(8)}
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.command = 0x84
+
+    def write(self, data):
+        self.command = data[0]
+
+    def read(self, count):
+        channel = self.CHANNELS[self.command >> 4 & 0x07]
+        value = self.inputs[channel % len(self.inputs)](time.monotonic())
+        return [value] * count
+
+
+class SimPCF8574(object):
+    """ 8 bit port: every byte written becomes the port state in turn """
+
+    def __init__(self):
+        self.port = 0xff
+        self.writes = 0  # Port states written
+        self.history = deque(maxlen=HISTORY)
+
+    def write(self, data):
+        self.writes += len(data)
+        self.history.extend(data)
+        self.port = data[-1]
+
+    def read(self, count):
+        return [self.port] * count
+
+
+class SimBus(object):
+    """ smbus.SMBus over the simulated devices of one bus number """
+
+    def __init__(self, bus):
+        self.devices = BUSES.get(bus, {})
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_time = 0.0  # Modelled seconds on the wire
+
+    def _device(self, address, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        cost = transaction_time(nbytes)
+        self.bus_time += cost
+        TOTALS['transactions'] += 1
+        TOTALS['bus_time'] += cost
+        if REALTIME:
+            time.sleep(cost)
+        try:
+            return self.devices[address]
+        except KeyError:
+            raise OSError(errno.EREMOTEIO, os.strerror(errno.EREMOTEIO)) from None
+
+    def write_byte(self, address, value):
+        self._device(address, 2).write([value])
+
+    def read_byte(self, address):
+        return self._device(address, 2).read(1)[0]
+
+    def write_byte_data(self, address, cmd, value):
+        self._device(address, 3).write([cmd, value])
+
+    def read_byte_data(self, address, cmd):
+        # Write the command, repeated start, read one byte
+        device = self._device(address, 4)
+        device.write([cmd])
+        return device.read(1)[0]
+
+    def read_i2c_block_data(self, address, cmd, length=32):
+        device = self._device(address, 3 + length)
+        device.write([cmd])
+        return device.read(length)
+
+    def write_i2c_block_data(self, address, cmd, data):
+        self._device(address, 2 + len(data)).write([cmd] + list(data))
+
+    def close(self):
+        pass
+
+
+class SimGPIO(types.ModuleType):
+    """ RPi.GPIO stand-in recording pin setups and writes """
+    BOARD, BCM = 10, 11
+    OUT, IN = 0, 1
+    LOW, HIGH = 0, 1
+
+    def __init__(self):
+        super(SimGPIO, self).__init__('RPi.GPIO')
+        self.mode = None
+        self.pins = {}    # pin -> direction
+        self.levels = {}  # pin -> last level written
+        self.writes = 0
+        self.history = deque(maxlen=HISTORY)  # (monotonic time, pin, level)
+
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction, **kwargs):
+        self.pins[pin] = direction
+
+    def output(self, pin, level):
+        if pin not in self.pins:
+            raise RuntimeError('The GPIO channel has not been set up as an OUTPUT')
+        self.writes += 1
+        self.levels[pin] = bool(level)
+        self.history.append((time.monotonic(), pin, bool(level)))
+
+    def input(self, pin):
+        return int(self.levels.get(pin, False))
+
+    def cleanup(self):
+        self.pins.clear()
+
+
+BUSES = {}   # bus number -> {address: simulated device}
+TOTALS = {'transactions': 0, 'bus_time': 0.0}
+REALTIME = False
+gpio = None  # The SimGPIO in use
+
+
+def simulate(adc='pcf8591', seed=None, realtime=False):
+    """ Put the simulated devices on the buses and the modules in sys.modules """
+    global REALTIME, gpio
+    if adc not in ADCS:
+        raise ValueError("unknown simulated ADC %r, expected one of %s" % (adc, ', '.join(ADCS)))
+    rng = random.Random(seed)
+    inputs = [Thermistor(rng), Knob(rng)] + [lambda now: 0] * 6
+    device = SimPCF8591(inputs) if adc == 'pcf8591' else SimADS7830(inputs)
+    BUSES.clear()
+    BUSES[ADC_BUS] = {ADCS[adc]: device}
+    BUSES[LCD_BUS] = {LCD_ADDRESS: SimPCF8574()}
+    REALTIME = realtime
+    gpio = SimGPIO()
+    rpi = types.ModuleType('RPi')
+    rpi.GPIO = gpio
+    sys.modules['smbus'] = types.SimpleNamespace(SMBus=SimBus)
+    sys.modules['RPi'] = rpi
+    sys.modules['RPi.GPIO'] = gpio
+
+
+def install(backend=None):
+    """ Select the hardware backend, THERMOSTAT_HARDWARE by default; True if simulated """
+    backend = backend or os.environ.get('THERMOSTAT_HARDWARE', 'pi')
+    if backend not in BACKENDS:
+        raise ValueError("unknown hardware backend %r, expected one of %s" % (backend, ', '.join(BACKENDS)))
+    if backend == 'sim':
+        simulate(os.environ.get('THERMOSTAT_SIM_ADC', 'pcf8591'),
+                 os.environ.get('THERMOSTAT_SIM_SEED'),
+                 os.environ.get('THERMOSTAT_SIM_REALTIME') == '1')
+    return backend == 'sim'
+
+
+def stats():
+    """ Totals of the simulated hardware, for the client's exit log """
+    lcd = BUSES.get(LCD_BUS, {}).get(LCD_ADDRESS)
+    return {'i2c_transactions': TOTALS['transactions'],
+            'i2c_bus_ms': round(TOTALS['bus_time'] * 1e3, 3),
+            'lcd_port_writes': lcd.writes if lcd else 0,
+            'gpio_writes': gpio.writes if gpio else 0}
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : profiler.py
+# Description : Timing spans and I2C counters for the thermostat client
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Nothing in the drivers or the client loop calls the profiler. When it is
+# enabled it wraps the methods to be measured (driver methods on their
+# class, loop stages where they are registered) with a timer and puts a
+# counting proxy in front of each driver's SMBus. Disabled, nothing is
+# wrapped and the hot path is exactly what it was.
+#
+# Spans go into per-name histograms (histogram.py). The summary is logged
+# every SUMMARY_INTERVAL seconds and on SIGUSR1 (kill -USR1 <pid>).
+import functools
+import signal
+import time
+
+from histogram import Histogram
+
+SUMMARY_INTERVAL = 60.0  # Seconds between logged summaries
+clock = time.perf_counter_ns
+
+# Driver methods timed by instrument_adc() and instrument_lcd(), per driver
+ADC_METHODS = ('scan', 'analogRead')
+PCF8574_METHODS = ('writeByte', 'flush')
+LCD_METHODS = ('writeFrame', 'write4bits', 'write4bitsBurst', 'clear', 'home')
+
+
+class CountingBus(object):
+    """ SMBus proxy counting the transactions made through it """
+
+    def __init__(self, bus, counts, name):
+        self._bus = bus
+        self._counts = counts
+        self._name = name
+
+    def __getattr__(self, attr):
+        method = getattr(self._bus, attr)
+        if not callable(method) or attr == 'close':
+            return method
+        counts, name = self._counts, self._name
+
+        def counted(*args):
+            counts[name] += 1
+            return method(*args)
+        setattr(self, attr, counted)  # Later lookups skip __getattr__
+        return counted
+
+
+class Profiler(object):
+    """ Span histograms in nanoseconds and I2C transaction counts """
+
+    def __init__(self):
+        self.spans = {}  # span name -> Histogram
+        self.i2c = {}    # driver name -> transactions
+        self.started = time.monotonic()
+
+    def wrap(self, func, name):
+        """ func timed into the span called name """
+        record = self.spans.setdefault(name, Histogram()).record
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(clock() - start)
+        return timed
+
+    def instrument(self, owner, names, prefix):
+        """ Time the methods names of owner (a class or an instance) as prefix.name """
+        for name in names:
+            if hasattr(owner, name):
+                setattr(owner, name, self.wrap(getattr(owner, name), prefix + '.' + name))
+
+    def count_bus(self, driver, name):
+        """ Count the I2C transactions driver makes on its bus """
+        self.i2c.setdefault(name, 0)
+        driver.bus = CountingBus(driver.bus, self.i2c, name)
+
+    def instrument_adc(self, adc):
+        self.instrument(type(adc), ADC_METHODS, 'adc')
+        self.count_bus(adc, 'adc')
+
+    def instrument_lcd(self, gpio, lcd):
+        """ The PCF8574 behind the LCD and the LCD itself """
+        self.instrument(type(gpio.chip), PCF8574_METHODS, 'pcf8574')
+        self.count_bus(gpio.chip, 'pcf8574')
+        self.instrument(type(lcd), LCD_METHODS, 'lcd')
+
+    def summary(self):
+        """ One compact line: span count p50/p99/max in microseconds, then I2C counts """
+        elapsed = time.monotonic() - self.started
+        parts = []
+        for name, histogram in sorted(self.spans.items()):
+            count = histogram.count()
+            if count:
+                p50, p99, top = histogram.quantiles((0.5, 0.99, 1.0))
+                parts.append('%s n=%d %.0f/%.0f/%.0fus' % (name, count, p50 / 1e3, p99 / 1e3, top / 1e3))
+        parts += ['i2c.%s n=%d (%.1f/s)' % (name, count, count / elapsed)
+                  for name, count in sorted(self.i2c.items())]
+        return '; '.join(parts)
+
+    def log_summary(self, log):
+        summary = self.summary()
+        if summary:
+            log.info('profile', summary=summary)
+
+    def dump_on_signal(self, log, signum=signal.SIGUSR1):
+        signal.signal(signum, lambda *_: self.log_summary(log))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : sampler.py
+# Description : Fixed-rate background ADC sampler with ring buffers
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import threading
+import time
+from array import array
+
+DEFAULT_RATE = 50.0   # Samples per second
+DEFAULT_SIZE = 256    # Samples kept per channel (about 5 s at 50 Hz)
+DEFAULT_WINDOW = 50   # Samples behind one filtered value (1 s at 50 Hz)
+
+
+class Sampler(threading.Thread):
+    """ Reads the ADC channels at a fixed rate into preallocated ring buffers
+
+    The sampler thread is the only writer: it stores a scan in every ring
+    and only then advances count, so readers never take a lock. A reader
+    copies the window it wants and checks afterwards that the writer has
+    not lapped it in the meantime.
+
+    A scan that fails with an I2C error is counted and its slot skipped, so
+    the rings only ever hold real readings; age() tells how stale they are.
+    """
+
+    def __init__(self, adc, channels=(0, 1), rate=DEFAULT_RATE, size=DEFAULT_SIZE):
+        super(Sampler, self).__init__(daemon=True)
+        self.adc = adc
+        self.channels = tuple(channels)
+        self.period = 1.0 / rate
+        self.size = size
+        self.rings = [array('H', bytes(2 * size)) for _ in self.channels]
+        self.count = 0            # Samples written, the next slot is count % size
+        self.dropped = 0          # Sample slots skipped because a read overran
+        self.errors = 0           # Sample slots skipped because the scan failed
+        self.last_error = None    # The latest scan error, as text
+        self.last_sample = None   # perf_counter() time of the latest published sample
+        self.read_time = 0.0      # Total seconds spent in adc.scan
+        self.max_read_time = 0.0
+        self.max_jitter = 0.0     # Worst lateness of a sample against its deadline
+        self.running = True
+        self.ready = threading.Event()  # Set once the first sample is published
+
+    def run(self):
+        deadline = time.perf_counter()
+        while self.running:
+            start = time.perf_counter()
+            self.max_jitter = max(self.max_jitter, start - deadline)
+            try:
+                values = self.adc.scan(self.channels)
+            except OSError as e:
+                # A glitch on the bus: leave the last good samples in place
+                self.errors += 1
+                self.last_error = str(e)
+                values = None
+            cost = time.perf_counter() - start
+            self.read_time += cost
+            self.max_read_time = max(self.max_read_time, cost)
+            if values is not None:
+                slot = self.count % self.size
+                for ring, value in zip(self.rings, values):
+                    ring[slot] = value
+                self.count += 1  # Publish the sample
+                self.last_sample = time.perf_counter()
+                if not self.ready.is_set():
+                    self.ready.set()
+            deadline += self.period
+            now = time.perf_counter()
+            if now > deadline:
+                # Overran one or more periods: skip them instead of bursting
+                missed = int((now - deadline) / self.period) + 1
+                self.dropped += missed
+                deadline += missed * self.period
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def stop(self):
+        self.running = False
+
+    def age(self):
+        """ Seconds since the latest sample was published, None before the first """
+        last = self.last_sample
+        return time.perf_counter() - last if last is not None else None
+
+    def recent(self, channel, n=DEFAULT_WINDOW):
+        """ The last n samples of one channel (oldest first), copied without locking """
+        ring = self.rings[self.channels.index(channel)]
+        while True:
+            count = self.count
+            n = min(n, count, self.size)
+            start = (count - n) % self.size
+            if start + n <= self.size:
+                values = ring[start:start + n]
+            else:
+                values = ring[start:] + ring[:start + n - self.size]
+            if self.count - count <= self.size - n:
+                return values  # The writer did not reach the copied slots
+
+    def mean(self, channel, n=DEFAULT_WINDOW):
+        """ Oversampled value: the mean of n samples, finer than one ADC step """
+        values = self.recent(channel, n)
+        return sum(values) / len(values) if values else None
+
+    def median(self, channel, n=DEFAULT_WINDOW):
+        """ Median of n samples, rejects spikes and stays on whole ADC steps """
+        values = sorted(self.recent(channel, n))
+        return values[len(values) // 2] if values else None
+
+    def filtered(self, channel, n=DEFAULT_WINDOW):
+        """ Median-filtered oversampled value: mean of the middle half of n samples """
+        values = sorted(self.recent(channel, n))
+        quarter = len(values) // 4
+        middle = values[quarter:len(values) - quarter]
+        return sum(middle) / len(middle) if middle else None
+
+    def decimated(self, channel, factor, n=DEFAULT_SIZE):
+        """ The last n samples reduced by factor, each output the mean of factor samples """
+        values = self.recent(channel, n - n % factor)
+        return [sum(values[i:i + factor]) / factor for i in range(0, len(values), factor)]
+
+    def stats(self):
+        """ Sampling counters: samples, dropped and failed slots, read cost and jitter """
+        count = self.count
+        scans = count + self.errors
+        return {
+            'samples': count,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'mean_read_us': self.read_time / scans * 1e6 if scans else 0.0,
+            'max_read_us': self.max_read_time * 1e6,
+            'max_jitter_us': self.max_jitter * 1e6,
+        }
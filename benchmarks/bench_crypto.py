@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_crypto.py
+# Description : Messages/sec of the old ECB-with-embedded-key framing
+#               against the cached session channel (seal + open per message)
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from Crypto.Util.Padding import pad, unpad
+from secure_channel import Challenge, SecureServerChannel, SecureSession, parse_header
+from thermostat_protocol import pack_telemetry
+
+DEVICE_ID = 0x1234
+FRAME = pack_telemetry(DEVICE_ID, 1, 21.5, 22.0)
+
+
+def legacy(count):
+    for _ in range(count):
+        # Client side: new key and cipher for every datagram
+        secret_key = get_random_bytes(16)
+        cipher = AES.new(secret_key, AES.MODE_ECB)
+        data = secret_key + cipher.encrypt(pad(FRAME, AES.block_size))
+        # Server side: rebuild the cipher from the embedded key
+        cipher = AES.new(data[:16], AES.MODE_ECB)
+        unpad(cipher.decrypt(data[16:]), AES.block_size)
+
+def session(count):
+    psk = get_random_bytes(16)
+    client = SecureSession(psk, DEVICE_ID)
+    server = SecureServerChannel({DEVICE_ID: psk})
+    try:
+        server.open(client.seal(FRAME))
+    except Challenge as e:  # A session's first frame is always challenged
+        client.open(e.reply, parse_header(e.reply)[1])
+    server.open(client.reseal())
+    for _ in range(count):
+        server.open(client.seal(FRAME))
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-message crypto benchmark')
+    parser.add_argument('-n', '--count', type=int, default=50000, help='messages per run')
+    args = parser.parse_args()
+    results = {}
+    for name, fn in (('ecb + embedded key', legacy), ('session channel', session)):
+        start = time.perf_counter()
+        fn(args.count)
+        elapsed = time.perf_counter() - start
+        results[name] = args.count / elapsed
+        print(f"{name:20} {results[name]:10.0f} msgs/s   {elapsed / args.count * 1e6:6.1f} us/msg")
+    print(f"speedup: {results['session channel'] / results['ecb + embedded key']:.1f}x")
+
+if __name__ == '__main__':
+    main()
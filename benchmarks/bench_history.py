@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_history.py
+# Description : Ingest cost of the memory-mapped temperature history per
+#               sample, and range query latency
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# --devices thermostats report in control ticks of --batch rows, each
+# about every 30 s of simulated time; with the defaults that is 400
+# samples a device, so the raw rings wrap and the minute and hour tiers
+# fill. The time of each append (as the control tick makes it) is
+# recorded, first page faults on the sparse files included; then random
+# devices are queried for their last hour of raw samples and their last
+# day of minutes.
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'server side'))
+sys.path.insert(0, os.path.join(HERE, '..', 'common'))
+
+import numpy as np
+from device_table import DeviceTable
+from timeseries import TimeSeriesStore
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devices', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=256, help='rows decided per control tick')
+    parser.add_argument('--samples', type=int, default=4000000, help='samples to ingest in total')
+    parser.add_argument('--queries', type=int, default=10000)
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp(prefix='history-')
+    try:
+        devices = DeviceTable(args.devices)
+        for device_id in range(1, args.devices + 1):
+            devices.row_for(device_id)
+        devices.current_temp[:args.devices] = np.random.uniform(15, 25, args.devices)
+        store = TimeSeriesStore(directory)
+        store.slots(devices, np.arange(args.devices))  # Hand out every slot up front
+
+        ticks = args.samples // args.batch
+        # Every device reports about every 30 s of simulated time
+        step = 30.0 * args.batch / args.devices
+        now = time.time() - ticks * step
+        timings = []
+        rows = np.arange(args.batch)
+        clock = time.perf_counter_ns
+        for _ in range(ticks):
+            rows = (rows + args.batch) % args.devices
+            devices.current_temp[rows] += np.random.normal(0, 0.05, args.batch)
+            now += step
+            start = clock()
+            store.append(devices, rows, now)
+            timings.append(clock() - start)
+        p50, p99 = percentiles(timings)
+        print('append per tick of %d rows: p50 %.1f us  p99 %.1f us  (%.0f ns per sample)'
+              % (args.batch, p50 / 1e3, p99 / 1e3, sum(timings) / (ticks * args.batch)))
+        sizes = [os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)]
+        blocks = [os.stat(os.path.join(directory, name)).st_blocks * 512 for name in os.listdir(directory)]
+        print('files: %.0f MB mapped, %.0f MB allocated on disk for %d devices'
+              % (sum(sizes) / 1e6, sum(blocks) / 1e6, args.devices))
+
+        for tier, span in (('raw', 3600), ('minute', 86400)):
+            timings, entries = [], 0
+            for _ in range(args.queries):
+                device_id = random.randint(1, args.devices)
+                start = clock()
+                views = store.history(device_id, tier, now - span, now)
+                timings.append(clock() - start)
+                entries += sum(len(view) for view in views)
+            p50, p99 = percentiles(timings)
+            print('%-6s query, last %5d s: p50 %.1f us  p99 %.1f us  (%.0f entries on average, no copies)'
+                  % (tier, span, p50 / 1e3, p99 / 1e3, entries / args.queries))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_lcd_i2c.py
+# Description : I2C transactions per LCD update through the PCF8574, one bus
+#               write per pin change against composed, batched bursts
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Client side'))
+
+
+class FakeSMBus(object):
+    """ Records every I2C transaction and the port states it wrote """
+
+    def __init__(self, bus):
+        self.transactions = 0
+        self.states = []
+
+    def write_byte(self, address, value):
+        self.transactions += 1
+        self.states.append(value)
+
+    def write_i2c_block_data(self, address, cmd, data):
+        self.transactions += 1
+        self.states.append(cmd)
+        self.states.extend(data)
+
+    def close(self):
+        pass
+
+
+# The drivers import smbus at module load; this benchmark only needs the fake
+sys.modules['smbus'] = types.SimpleNamespace(SMBus=FakeSMBus)
+
+import Adafruit_LCD1602
+from PCF8574 import PCF8574_GPIO
+
+Adafruit_LCD1602.sleep = lambda seconds: None  # count bus traffic, not delays
+PIN_RS, PIN_E, PINS_DB = 0, 2, [4, 5, 6, 7]
+
+
+class PerPinGPIO(object):
+    """ PCF8574_GPIO without outputs/batching: every pin change is one write """
+    OUT = PCF8574_GPIO.OUT
+    BCM = PCF8574_GPIO.BCM
+
+    def __init__(self, mcp):
+        self.mcp = mcp
+
+    def setmode(self, mode):
+        pass
+
+    def setup(self, pin, mode):
+        pass
+
+    def output(self, pin, value):
+        self.mcp.output(pin, value)
+
+
+def latched(states):
+    """ (RS, data nibble) the LCD latches on every falling edge of E """
+    nibbles = []
+    for prev, state in zip(states, states[1:]):
+        if prev >> PIN_E & 1 and not state >> PIN_E & 1:
+            nibbles.append((state >> PIN_RS & 1, state >> 4))
+    return nibbles
+
+
+def run(make_gpio):
+    mcp = PCF8574_GPIO(0x27)
+    bus = mcp.chip.bus
+    lcd = Adafruit_LCD1602.Adafruit_CharLCD(pin_rs=PIN_RS, pin_e=PIN_E, pins_db=PINS_DB, GPIO=make_gpio(mcp))
+    lcd.begin(16, 2)
+    results = []
+    for name, update in (
+            ('one character', lambda: lcd.message('A')),
+            ('16 character line', lambda: lcd.message('Current: 21.50 C')),
+            ('full 16x2 redraw', lambda: (lcd.clear(), lcd.setCursor(0, 0),
+                                          lcd.message('Current: 21.50 C\nSet: 22.00 C'))),
+            ('writeFrame, 2 digits', lambda: lcd.writeFrame(['Current: 21.75 C', 'Set: 22.00 C']))):
+        before, start = bus.transactions, len(bus.states)
+        update()
+        results.append((name, bus.transactions - before, len(bus.states) - start))
+    return results, latched(bus.states)
+
+
+def main():
+    per_pin, per_pin_latched = run(PerPinGPIO)
+    burst, burst_latched = run(lambda mcp: mcp)
+    print(f"{'update':22} {'per-pin writes':>16} {'batched bursts':>16}")
+    for (name, old_tx, old_bytes), (_, new_tx, new_bytes) in zip(per_pin, burst):
+        print(f"{name:22} {old_tx:6} tx {old_bytes:4} B   {new_tx:6} tx {new_bytes:4} B")
+    print("LCD latches the same nibbles:", per_pin_latched == burst_latched)
+
+
+if __name__ == '__main__':
+    main()
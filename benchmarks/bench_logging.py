@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_logging.py
+# Description : Log call latency on the hot loop when the log output backs
+#               up, synchronous print() against structured_log
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The log output is a pipe whose reader only takes READ_CHUNK bytes every
+# READ_DELAY seconds, like a terminal or journald that has fallen behind.
+# A hot loop makes CALLS log calls of one server line each and times every
+# call: print() has to wait whenever the pipe is full, structured_log only
+# queues the record (and drops it if its queue is full).
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from structured_log import AsyncLog, TextSink
+
+CALLS = 200000
+READ_CHUNK = 4096
+READ_DELAY = 0.002
+
+
+def slow_pipe():
+    """ A text stream into a pipe drained slowly by a background thread """
+    read_fd, write_fd = os.pipe()
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                if not os.read(read_fd, READ_CHUNK):
+                    break
+            except OSError:
+                break
+            time.sleep(READ_DELAY)
+        os.close(read_fd)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    return os.fdopen(write_fd, 'w'), stop
+
+
+def hot_loop(log_call):
+    timings = []
+    clock = time.perf_counter_ns
+    message = b'\x01\x03\x00\x01\x00\x04\x00\x00\x00\x07\x03\xe8\x01'
+    for i in range(CALLS):
+        start = clock()
+        log_call(i, message)
+        timings.append(clock() - start)
+    timings.sort()
+    return timings
+
+
+def report(name, timings, elapsed, extra=''):
+    def pct(fraction):
+        return timings[min(len(timings) - 1, int(fraction * len(timings)))] / 1000
+    print(f"{name:<16} {CALLS / elapsed:>10.0f} calls/s  p50 {pct(0.5):7.2f} us  "
+          f"p99.9 {pct(0.999):9.2f} us  max {timings[-1] / 1000:9.0f} us  {extra}")
+
+
+def main():
+    stream, stop = slow_pipe()
+
+    def print_call(i, message):
+        print(f"Sent control commands to ('10.0.0.{i % 250}', 40000): {message}", file=stream, flush=True)
+
+    start = time.perf_counter()
+    timings = hot_loop(print_call)
+    report('print()', timings, time.perf_counter() - start)
+    stop.set()
+
+    stream, stop = slow_pipe()
+    log = AsyncLog(sink=TextSink(stream))
+
+    def log_call(i, message):
+        log.info('command', i, addr=('10.0.0.%d' % (i % 250), 40000), message=message)
+
+    start = time.perf_counter()
+    timings = hot_loop(log_call)
+    elapsed = time.perf_counter() - start
+    queued = log.written + len(log.records)
+    report('structured_log', timings, elapsed, f"({log.dropped} dropped, {queued} queued or written)")
+    stop.set()
+    os._exit(0)  # The pipe readers are stopped, do not wait on a full pipe at exit
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_query_api.py
+# Description : Control loop latency with and without heavy load on the
+#               device query API
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The control server is started twice, with the query API on. Both times
+# loadgen.py runs a thermostat fleet against it and measures reply
+# latency, and the server's own queue and decide stage quantiles are
+# scraped from /metrics at the end. The second time --query-processes
+# closed-loop HTTP clients hammer the API meanwhile: mostly single device
+# reads, some full device lists and statistics (answered by the control
+# loop itself) and a few set point overrides. The query
+# clients stand aside for the server the way the API process does, so
+# that on a small machine they take no more of its CPU than remote
+# clients would. The CPU column is the control server's own; the API
+# process runs in a session of its own.
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'server side'))
+sys.path.insert(0, os.path.join(HERE, '..', 'common'))
+
+from loadgen import CONTROL_SERVER, FIRST_DEVICE_ID
+from query_api import stand_aside
+
+STAGES = ('queue', 'decide')
+
+
+def query_process(api, devices, stop, results):
+    stand_aside()  # Remote clients would not take the server's CPU either
+    counts = {'device': 0, 'list': 0, 'stats': 0, 'override': 0, 'errors': 0}
+    while not stop.is_set():
+        device_id = FIRST_DEVICE_ID + random.randrange(devices)
+        choice = random.random()
+        if choice < 0.01:
+            kind, request = 'override', urllib.request.Request(
+                '%s/devices/%d' % (api, device_id), method='POST',
+                data=json.dumps({'set_temp': random.randint(15, 25)}).encode())
+        elif choice < 0.1:
+            kind, request = 'list', urllib.request.Request(api + '/devices')
+        elif choice < 0.2:
+            kind, request = 'stats', urllib.request.Request('%s/devices/%d/stats' % (api, device_id))
+        else:
+            kind, request = 'device', urllib.request.Request('%s/devices/%d' % (api, device_id))
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                response.read()
+            counts[kind] += 1
+        except urllib.error.HTTPError as e:
+            counts[kind if e.code == 404 else 'errors'] += 1  # 404: not heard from yet
+        except OSError:
+            counts['errors'] += 1
+    results.put(counts)
+
+
+def stage_quantiles(port):
+    with urllib.request.urlopen('http://127.0.0.1:%d/metrics' % port, timeout=5) as response:
+        text = response.read().decode()
+    quantiles = {}
+    for line in text.splitlines():
+        for stage in STAGES:
+            prefix = 'thermostat_stage_seconds{stage="%s",quantile="' % stage
+            if line.startswith(prefix):
+                quantile = float(line[len(prefix):].split('"')[0])
+                if quantile in (0.5, 0.99):
+                    quantiles['%s p%g' % (stage, quantile * 100)] = float(line.split()[-1]) * 1e6
+    return quantiles
+
+
+def run(args, queried):
+    metrics_port, api_port = args.port + 1, args.port + 2
+    server = subprocess.Popen(
+        [sys.executable, CONTROL_SERVER, '--quiet', '--host', '127.0.0.1', '--port', str(args.port),
+         '--metrics-host', '127.0.0.1', '--metrics-port', str(metrics_port),
+         '--api-host', '127.0.0.1', '--api-port', str(api_port), '--state-dir', '', '--history-dir', ''],
+        stdout=subprocess.DEVNULL, start_new_session=True)
+    api = 'http://127.0.0.1:%d' % api_port
+    output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+    output.close()
+    try:
+        for _ in range(100):  # Wait for the API process to come up
+            try:
+                urllib.request.urlopen(api + '/devices', timeout=1).read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        stop = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=query_process,
+                                           args=(api, args.clients, stop, results))
+                   for _ in range(args.query_processes if queried else 0)]
+        for client in clients:
+            client.start()
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(HERE, 'loadgen.py'), '--target', '127.0.0.1:%d' % args.port,
+                        '--server-pid', str(server.pid), '--clients', str(args.clients),
+                        '--processes', '1', '--duration', str(args.duration), '--output', output.name],
+                       stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        counts = {}
+        for client in clients:
+            for name, value in results.get().items():
+                counts[name] = counts.get(name, 0) + value
+            client.join()
+        with open(output.name) as f:
+            report = json.load(f)
+        report['stages_us'] = stage_quantiles(metrics_port)
+        report['queries'] = counts
+        report['queries_per_sec'] = sum(counts.values()) / elapsed if counts else 0.0
+        return report
+    finally:
+        os.killpg(server.pid, signal.SIGINT)
+        server.wait()
+        os.unlink(output.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=1000, help='simulated thermostats')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--query-processes', type=int, default=4)
+    parser.add_argument('--port', type=int, default=22700, help='server port; metrics and API use the next two')
+    args = parser.parse_args()
+    reports = [('idle API', run(args, False)), ('queried API', run(args, True))]
+    print('%-12s %9s %9s %9s %7s %6s' % ('', 'p50 ms', 'p99 ms', 'p999 ms', 'drops', 'CPU'), end='')
+    stages = list(reports[0][1]['stages_us'])
+    print(''.join(' %14s' % ('%s us' % name) for name in stages), ' queries/s')
+    for name, report in reports:
+        latency = report['latency_ms']
+        print('%-12s %9.3f %9.3f %9.3f %6.2f%% %5.0f%%' % (
+            name, latency['p50'], latency['p99'], latency['p999'], report['drop_rate'] * 100,
+            report['server_cpu_percent']), end='')
+        print(''.join(' %14.1f' % report['stages_us'].get(stage, float('nan')) for stage in stages),
+              ' %9.0f' % report['queries_per_sec'])
+    counts = reports[1][1]['queries']
+    print('queries: %s' % ', '.join('%s %d' % item for item in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_replies.py
+# Description : Replies/sec of the old per-reply socket send path against
+#               the persistent socket + batched outbound queue (the AES
+#               run seals with the cached session channel)
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import argparse
+import os
+import socket
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'server side'))
+sys.path.insert(0, os.path.join(HERE, '..', 'common'))
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from Crypto.Util.Padding import pad
+from outbound import OutboundQueue, encode_plain
+from codec_stages import AesStage
+from secure_channel import Challenge, SecureSession, parse_header
+
+MESSAGE = b"21,OFF,ON"
+DEVICE_ID = 0x1234
+
+
+def legacy_plain(count, addr):
+    # What send_control_commands() in server.py used to do for every reply
+    for _ in range(count):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.sendto(MESSAGE, addr)
+
+def legacy_aes(count, addr):
+    # ...and the encrypted server: new key, new cipher and new socket per reply
+    for _ in range(count):
+        secret_key1 = get_random_bytes(16)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            cipher = AES.new(secret_key1, AES.MODE_ECB)
+            s.sendto(secret_key1 + cipher.encrypt(pad(MESSAGE, AES.block_size)), addr)
+
+def queued(encode_batch):
+    def run(count, addr):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.bind(('127.0.0.1', 0))
+            queue = OutboundQueue(s.sendto, encode_batch)
+            for _ in range(count):
+                queue.put(DEVICE_ID, addr, MESSAGE)
+            while queue.drain():
+                pass
+    return run
+
+def measure(fn, count, addr):
+    start = time.perf_counter()
+    fn(count, addr)
+    return count / (time.perf_counter() - start)
+
+def aes_stage():
+    # The server's aes codec stage with an open session for DEVICE_ID
+    psk = get_random_bytes(16)
+    stage = AesStage({DEVICE_ID: psk})
+    client = SecureSession(psk, DEVICE_ID)
+    try:
+        stage.unwrap(client.seal(MESSAGE))
+    except Challenge as e:  # A session's first frame is always challenged
+        client.open(e.reply, parse_header(e.reply)[1])
+    stage.unwrap(client.reseal())
+    return stage
+
+def main():
+    parser = argparse.ArgumentParser(description='Reply send path benchmark')
+    parser.add_argument('-n', '--count', type=int, default=20000, help='replies per run')
+    args = parser.parse_args()
+    # The sink is never read; the kernel drops what does not fit its buffer
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sink:
+        sink.bind(('127.0.0.1', 0))
+        addr = sink.getsockname()
+        for name, before, after in (('plain', legacy_plain, queued(encode_plain)),
+                                    ('aes', legacy_aes, queued(aes_stage().wrap_batch))):
+            old = measure(before, args.count, addr)
+            new = measure(after, args.count, addr)
+            print(f"{name:6} before: {old:10.0f} replies/s   after: {new:10.0f} replies/s   ({new / old:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_rolling_stats.py
+# Description : Update cost of the rolling device statistics per packet,
+#               their memory per device, and query latency
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# --devices thermostats report in control ticks of 1, 16, 256 and 4096
+# rows (a tick adds every device that reported since the last one), each
+# device about every 30 s of simulated time, so buckets keep being
+# recycled. Every update is timed as the control tick makes it, all rows
+# at once; the cost per packet is that time divided by the rows. Then
+# random devices are queried.
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'server side'))
+sys.path.insert(0, os.path.join(HERE, '..', 'common'))
+
+import numpy as np
+from device_table import DeviceTable
+from rolling_stats import RollingStats
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devices', type=int, default=100000)
+    parser.add_argument('--samples', type=int, default=4000000, help='samples to add in total')
+    parser.add_argument('--queries', type=int, default=10000)
+    args = parser.parse_args()
+    devices = DeviceTable(args.devices)
+    for device_id in range(1, args.devices + 1):
+        devices.row_for(device_id)
+    devices.current_temp[:args.devices] = np.random.uniform(15, 25, args.devices)
+    stats = RollingStats(devices.capacity)
+
+    clock = time.perf_counter_ns
+    now = 1000.0
+    for batch in (1, 16, 256, 4096):
+        batch = min(batch, args.devices)
+        ticks = max(1, args.samples // batch // 4)
+        step = 30.0 * batch / args.devices  # Every device reports about every 30 s
+        rows = np.arange(batch)
+        timings = []
+        for _ in range(ticks):
+            rows = (rows + batch) % args.devices
+            devices.current_temp[rows] += np.random.normal(0, 0.05, batch)
+            devices.heat[rows] = devices.current_temp[rows] < 20
+            now += step
+            start = clock()
+            stats.update(devices, rows, now)
+            timings.append(clock() - start)
+        p50, p99 = percentiles(timings)
+        print('update per tick of %4d rows: p50 %8.1f us  p99 %8.1f us  (%.0f ns per packet)'
+              % (batch, p50 / 1e3, p99 / 1e3, sum(timings) / (ticks * batch)))
+    print('memory: %d bytes per device (%.1f MB for %d devices)'
+          % (stats.nbytes() // stats.capacity, stats.nbytes() / 1e6, args.devices))
+
+    timings = []
+    for _ in range(args.queries):
+        row = random.randrange(args.devices)
+        start = clock()
+        stats.query(row, now)
+        timings.append(clock() - start)
+    p50, p99 = percentiles(timings)
+    print('query of one device (%d windows): p50 %.1f us  p99 %.1f us'
+          % (len(stats.windows), p50 / 1e3, p99 / 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_startup.py
+# Description : Time from starting a thermostat client to its first
+#               datagram at the server, on simulated hardware
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The client is a real thermometer.py process on simulated hardware (see
+# Client side/hardware.py) with the bus time slept, so the I2C probes and
+# the LCD's init delays cost what they would on a Pi. The "server" is a
+# UDP socket here. Each run starts the client and waits for its first
+# datagram. Runs are cold (no cached I2C probe results) or warm (cached
+# from the run before). Interpreter start-up is measured on its own for
+# reference.
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLIENT_DIR = os.path.join(HERE, '..', 'Client side')
+CLIENT = os.path.join(CLIENT_DIR, 'thermometer.py')
+PROBE_CACHE = os.path.join(CLIENT_DIR, 'i2c-probe.json')
+DEVICE_ID = 0x5700000a
+TIMEOUT = 10.0  # Seconds to wait for a client's first datagram
+
+
+def first_datagram(sock, env):
+    """ Seconds from starting the client until the server socket hears from it """
+    start = time.perf_counter()
+    client = subprocess.Popen([sys.executable, CLIENT], env=env, cwd=CLIENT_DIR,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        sock.recvfrom(1024)
+        return time.perf_counter() - start
+    finally:
+        client.send_signal(signal.SIGINT)
+        try:
+            client.wait(5)
+        except subprocess.TimeoutExpired:
+            client.kill()
+            client.wait()
+        sock.setblocking(False)
+        try:
+            while True:  # Leave nothing from this run for the next one
+                sock.recvfrom(1024)
+        except BlockingIOError:
+            pass
+        sock.settimeout(TIMEOUT)
+
+
+def interpreter():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.perf_counter() - start
+
+
+def report(name, times):
+    times = sorted(times)
+    print('%-12s median %7.1f ms  min %7.1f ms  max %7.1f ms'
+          % (name, times[len(times) // 2] * 1e3, times[0] * 1e3, times[-1] * 1e3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--adc', choices=('pcf8591', 'ads7830'), default='pcf8591')
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(TIMEOUT)
+    env = dict(os.environ, THERMOSTAT_HARDWARE='sim', THERMOSTAT_SIM_ADC=args.adc,
+               THERMOSTAT_SIM_REALTIME='1', THERMOSTAT_SIM_SEED='1',
+               THERMOSTAT_DEVICE_ID=str(DEVICE_ID), THERMOSTAT_SERVER_IP='127.0.0.1',
+               THERMOSTAT_SERVER_PORT=str(sock.getsockname()[1]))
+    calibration = os.path.join(CLIENT_DIR, 'calibration-%08x.json' % DEVICE_ID)
+    had_cache = os.path.exists(PROBE_CACHE)
+    try:
+        first_datagram(sock, env)  # Calibration tables and bytecode are built once
+        report('interpreter', [interpreter() for _ in range(args.runs)])
+        cold = []
+        for _ in range(args.runs):
+            if os.path.exists(PROBE_CACHE):
+                os.remove(PROBE_CACHE)
+            cold.append(first_datagram(sock, env))
+        report('cold', cold)
+        report('warm', [first_datagram(sock, env) for _ in range(args.runs)])
+    finally:
+        if os.path.exists(calibration):
+            os.remove(calibration)
+        if not had_cache and os.path.exists(PROBE_CACHE):
+            os.remove(PROBE_CACHE)
+
+
+if __name__ == '__main__':
+    main()
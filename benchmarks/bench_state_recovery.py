@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_state_recovery.py
+# Description : Cost of the device state log on the control tick, and
+#               restart time from a snapshot plus a log tail
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# A table of --devices thermostats is filled and snapshotted, then
+# --ticks control ticks of --batch devices each are recorded and committed
+# as the server would. The server then "crashes" (nothing more is
+# committed or snapshotted) and a fresh table is recovered from the
+# directory, once from the snapshot and log tail and once from a final
+# snapshot after a clean shutdown.
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'server side'))
+sys.path.insert(0, os.path.join(HERE, '..', 'common'))
+
+import numpy as np
+from device_table import DeviceTable
+from state_log import RECORD, StateLog
+from structured_log import WARNING, configure
+
+
+def filled_table(count):
+    devices = DeviceTable(count)
+    for device_id in range(1, count + 1):
+        devices.row_for(device_id)
+    devices.current_temp[:count] = np.random.uniform(15, 25, count)
+    devices.set_temp[:count] = np.random.randint(15, 25, count)
+    return devices
+
+
+def recover(directory, log):
+    devices = DeviceTable()
+    state = StateLog(directory, log)
+    start = time.perf_counter()
+    state.recover(devices)
+    elapsed = time.perf_counter() - start
+    state.writer.shutdown()
+    return devices, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devices', type=int, default=200000)
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=256, help='rows decided per control tick')
+    args = parser.parse_args()
+    log = configure(WARNING)
+    directory = tempfile.mkdtemp(prefix='state-')
+    try:
+        devices = filled_table(args.devices)
+        state = StateLog(directory, log)
+        state.recover(devices)
+        state.snapshot()
+
+        timings = []
+        rows = np.arange(args.batch)
+        for tick in range(args.ticks):
+            rows = (rows + args.batch) % args.devices
+            devices.set_temp[rows] += 1
+            start = time.perf_counter_ns()
+            state.record(rows)
+            if tick % 10 == 9:  # About ten ticks per commit interval
+                state.commit()
+            timings.append(time.perf_counter_ns() - start)
+        state.commit()
+        state.writer.shutdown(wait=True)  # Crash: committed, no final snapshot
+        timings.sort()
+        records = args.ticks * args.batch
+        print('record+commit per tick of %d rows: p50 %.1f us  p99 %.1f us  (%.0f ns per row)'
+              % (args.batch, timings[len(timings) // 2] / 1e3, timings[int(len(timings) * 0.99)] / 1e3,
+                 sum(timings) / records))
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)}
+        print('files: %s' % ', '.join('%s %.1f MB' % (name, size / 1e6) for name, size in sorted(sizes.items())))
+
+        recovered, elapsed = recover(directory, log)
+        same = np.array_equal(recovered.set_temp[:args.devices], devices.set_temp[:args.devices])
+        print('restart from snapshot + %d logged records: %.0f ms, %d devices, set points match: %s'
+              % (records, elapsed * 1e3, len(recovered), same))
+
+        state = StateLog(directory, log)
+        state.recover(DeviceTable())
+        state.close()  # Clean shutdown: final snapshot, empty log
+        recovered, elapsed = recover(directory, log)
+        print('restart from snapshot only: %.0f ms, %d devices' % (elapsed * 1e3, len(recovered)))
+        print('(%d bytes per logged record)' % RECORD.itemsize)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
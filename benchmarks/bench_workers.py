@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : bench_workers.py
+# Description : Aggregate control server throughput against the number of
+#               SO_REUSEPORT worker processes
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import argparse
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'common'))
+
+from thermostat_protocol import pack_telemetry
+
+CONTROL_SERVER = os.path.join(HERE, '..', 'server side', 'control_server.py')
+
+
+def load_process(port, first_device, devices, sockets, window, duration, results):
+    # Closed loop: every reply immediately releases the next request. Several
+    # source sockets so the kernel spreads them over the workers.
+    server = ('127.0.0.1', port)
+    frames = [pack_telemetry(device_id, 1, 21.5, 22.0)
+              for device_id in range(first_device, first_device + devices)]
+    selector = selectors.DefaultSelector()
+    for _ in range(sockets):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+    sent = replies = 0
+
+    def prime():
+        nonlocal sent
+        for key in selector.get_map().values():
+            for _ in range(window):
+                key.fileobj.sendto(frames[sent % devices], server)
+                sent += 1
+
+    prime()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        events = selector.select(0.05)
+        if not events:
+            prime()  # replies were lost, refill the window
+        for key, _ in events:
+            sock = key.fileobj
+            while True:
+                try:
+                    sock.recv(64)
+                except BlockingIOError:
+                    break
+                replies += 1
+                sock.sendto(frames[sent % devices], server)
+                sent += 1
+    results.put(replies)
+
+def measure(workers, args):
+    server = subprocess.Popen([sys.executable, CONTROL_SERVER, '--quiet', '--host', '127.0.0.1',
+                               '--port', str(args.port), '--workers', str(workers),
+                               '--state-dir', '', '--history-dir', '', '--api-port', '0'],
+                              stdout=subprocess.DEVNULL, start_new_session=True)
+    try:
+        time.sleep(1.0)  # let the workers bind
+        results = multiprocessing.Queue()
+        loaders = [multiprocessing.Process(target=load_process,
+                                           args=(args.port, i * args.devices, args.devices,
+                                                 args.sockets, args.window, args.duration, results))
+                   for i in range(args.clients)]
+        for loader in loaders:
+            loader.start()
+        total = sum(results.get() for _ in loaders)
+        for loader in loaders:
+            loader.join()
+        return total / args.duration
+    finally:
+        os.killpg(server.pid, signal.SIGINT)
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description='SO_REUSEPORT worker scaling benchmark')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--clients', type=int, default=max(1, os.cpu_count() // 2), help='load generator processes')
+    parser.add_argument('--devices', type=int, default=1000, help='device ids per load process')
+    parser.add_argument('--sockets', type=int, default=16, help='source sockets per load process')
+    parser.add_argument('--window', type=int, default=4, help='requests in flight per socket')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--port', type=int, default=22345)
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs, {args.clients} load processes")
+    base = None
+    workers = 1
+    while workers <= args.max_workers:
+        rate = measure(workers, args)
+        base = base or rate
+        print(f"{workers:3} workers: {rate:10.0f} replies/s   {rate / base:5.2f}x   "
+              f"({rate / base / workers * 100:.0f}% of linear)")
+        workers *= 2
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : loadgen.py
+# Description : Simulated thermostat fleet and latency benchmark for the
+#               control server
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Every simulated thermostat has its own UDP socket and repeats the client
+# loop of thermometer.py / ThermostatClientwithEncryptionDecryption.py:
+# a knob status datagram when the knob status changes, then half an
+# --interval later the "tempC,tempS" telemetry. With --on-change the
+# telemetry is only sent when it moved past the reporting deadband or a
+# heartbeat is due, as the clients do. The fleet is open loop (sends never
+# wait for replies) and split over --processes processes.
+#
+# By default the server is started by this script (control_server.py with
+# the matching codecs) so its CPU time can be measured; --target points
+# the fleet at an already running server instead. Results are printed and
+# written as JSON to --output so runs can be compared between versions.
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import random
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'common'))
+
+import thermostat_protocol
+from reporting import ChangeReporter
+from secure_channel import SecureSession, parse_header
+from thermostat_protocol import WIRE_BINARY, WIRE_CSV, encode_knob, encode_telemetry
+
+CONTROL_SERVER = os.path.join(HERE, '..', 'server side', 'control_server.py')
+FIRST_DEVICE_ID = 0x10000
+KNOB, TELEMETRY = 0, 1  # the two halves of a client loop iteration
+
+
+class SimulatedThermostat(object):
+    """ One client: its socket, sensor random walk and in-flight requests """
+
+    def __init__(self, device_id, wire_format, psk=None, on_change=False):
+        self.device_id = device_id
+        self.wire_format = wire_format
+        self.session = SecureSession(psk, device_id) if psk is not None else None
+        self.reporter = ChangeReporter() if on_change else None
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.temp = random.uniform(15, 30)
+        self.set_temp = random.uniform(0, 100)
+        self.prev_knob_status = None
+        self.seq = 0
+        self.in_flight = {}  # sequence number (binary) or send order (CSV) -> send time
+        self.server = None  # Address the last datagram went to
+
+    def send_knob(self, server, knob_turn_probability):
+        """ First half of a client loop iteration, returns the datagrams sent """
+        knob_status = "Not Turned"
+        if random.random() < knob_turn_probability:
+            knob_status = random.choice(("Increasing", "Decreasing"))
+        if knob_status == self.prev_knob_status:
+            return 0  # Only sent when it has changed
+        self.prev_knob_status = knob_status
+        self.send(encode_knob(self.wire_format, self.device_id, self.seq + 1, knob_status), server)
+        return 1
+
+    def send_telemetry(self, server, drift):
+        """ Second half of a client loop iteration """
+        self.temp += random.uniform(-drift, drift)
+        if self.reporter is not None and not self.reporter.due(self.temp, self.set_temp,
+                                                               time.monotonic()):
+            return 0
+        self.send(encode_telemetry(self.wire_format, self.device_id, self.seq + 1,
+                                   self.temp, self.set_temp), server)
+        return 1
+
+    def send(self, frame, server):
+        self.server = server
+        self.seq += 1
+        if self.session is not None:
+            frame = self.session.seal(frame)
+        self.in_flight[self.seq] = time.perf_counter()
+        try:
+            self.sock.sendto(frame, server)
+        except BlockingIOError:
+            pass  # counted as a drop when it never gets a reply
+
+    def reply_seq(self, data):
+        """ Which request a reply answers """
+        if self.session is not None:
+            _, seq, _ = parse_header(data)
+            data = self.session.open(data, seq)
+            if not data:  # A challenge: the request is answered once sent again
+                try:
+                    self.sock.sendto(self.session.reseal(), self.server)
+                except BlockingIOError:
+                    pass
+                return None
+        if thermostat_protocol.is_binary(data):
+            return thermostat_protocol.unpack(data)[2]
+        return min(self.in_flight) if self.in_flight else None  # CSV replies come back in order
+
+
+def run_fleet(server, devices, args, results):
+    random.seed(devices[0][0])
+    clients = [SimulatedThermostat(device_id, args.wire, psk, args.on_change)
+               for device_id, psk in devices]
+    selector = selectors.DefaultSelector()
+    for client in clients:
+        selector.register(client.sock, selectors.EVENT_READ, client)
+    start = time.perf_counter()
+    end = start + args.duration
+    # Spread the first iterations over one interval like a fleet booting up
+    schedule = [(start + random.uniform(0, args.interval), i, KNOB) for i in range(len(clients))]
+    heapq.heapify(schedule)
+    half = args.interval / 2
+    latencies = []
+    sent = replies = coalesced = 0
+    while True:
+        now = time.perf_counter()
+        while schedule and schedule[0][0] <= now:
+            due, i, phase = heapq.heappop(schedule)
+            if due < end:
+                if phase == KNOB:
+                    sent += clients[i].send_knob(server, args.knob_turn_probability)
+                else:
+                    sent += clients[i].send_telemetry(server, args.temp_drift)
+                heapq.heappush(schedule, (due + half, i, TELEMETRY if phase == KNOB else KNOB))
+        if not schedule and now > end + args.timeout:
+            break
+        next_due = schedule[0][0] if schedule else end + args.timeout
+        timeout = max(0.0, min(next_due, end + args.timeout) - now)
+        for key, _ in selector.select(timeout):
+            client = key.data
+            while True:
+                try:
+                    data = client.sock.recv(2048)
+                except BlockingIOError:
+                    break
+                received = time.perf_counter()
+                try:
+                    seq = client.reply_seq(data)
+                except ValueError:
+                    continue
+                sent_at = client.in_flight.pop(seq, None)
+                if sent_at is None:
+                    continue
+                replies += 1
+                latencies.append(received - sent_at)
+                # Requests the server folded into the same control tick
+                for older in [s for s in client.in_flight if s < seq]:
+                    del client.in_flight[older]
+                    coalesced += 1
+    for client in clients:
+        client.sock.close()
+    results.put({'sent': sent, 'replies': replies, 'coalesced': coalesced, 'latencies': latencies})
+
+
+def server_cpu_seconds(pgid):
+    """ User + system CPU time of every process in the server's process group """
+    total = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid:  # fields[2] is the process group
+            total += int(fields[11]) + int(fields[12])  # utime, stime
+    return total / os.sysconf('SC_CLK_TCK')
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated thermostat fleet benchmark')
+    parser.add_argument('--clients', type=int, default=2000, help='simulated thermostats')
+    parser.add_argument('--processes', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds per client loop iteration')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--timeout', type=float, default=1.0, help='wait for late replies after the run')
+    parser.add_argument('--knob-turn-probability', type=float, default=0.1)
+    parser.add_argument('--temp-drift', type=float, default=0.1,
+                        help='largest temperature change per iteration, degrees')
+    parser.add_argument('--on-change', action='store_true',
+                        help='send telemetry only past the deadband or on a heartbeat')
+    parser.add_argument('--wire', choices=(WIRE_BINARY, WIRE_CSV), default=WIRE_BINARY)
+    parser.add_argument('--aes', action='store_true', help='secure channel framing (binary only)')
+    parser.add_argument('--target', help='host:port of a running server instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='with --target, process group to measure CPU of')
+    parser.add_argument('--workers', type=int, default=1, help='workers of the started server')
+    parser.add_argument('--port', type=int, default=22346, help='port of the started server')
+    parser.add_argument('--output', default='loadgen_results.json')
+    args = parser.parse_args()
+    if args.aes and args.wire != WIRE_BINARY:
+        parser.error('--aes carries binary frames only')
+
+    device_ids = [FIRST_DEVICE_ID + i for i in range(args.clients)]
+    keys = {device_id: os.urandom(16) for device_id in device_ids} if args.aes else {}
+    server_process = None
+    pgid = args.server_pid
+    if args.target:
+        host, port = args.target.rsplit(':', 1)
+        server = (host, int(port))
+    else:
+        server = ('127.0.0.1', args.port)
+        codecs = 'aes,binary' if args.aes else 'binary,plain'
+        keys_file = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        json.dump({str(device_id): key.hex() for device_id, key in keys.items()}, keys_file)
+        keys_file.close()
+        server_process = subprocess.Popen(
+            [sys.executable, CONTROL_SERVER, '--quiet', '--host', server[0], '--port', str(server[1]),
+             '--codecs', codecs, '--keys', keys_file.name, '--workers', str(args.workers),
+             '--state-dir', '', '--history-dir', '', '--api-port', '0'],
+            stdout=subprocess.DEVNULL, start_new_session=True)
+        pgid = server_process.pid
+        time.sleep(1.0)  # let the server bind
+
+    try:
+        results = multiprocessing.Queue()
+        shares = [[(device_id, keys.get(device_id)) for device_id in device_ids[i::args.processes]]
+                  for i in range(args.processes)]
+        fleets = [multiprocessing.Process(target=run_fleet, args=(server, share, args, results))
+                  for share in shares if share]
+        cpu_before = server_cpu_seconds(pgid) if pgid else None
+        wall_start = time.perf_counter()
+        for fleet in fleets:
+            fleet.start()
+        totals = {'sent': 0, 'replies': 0, 'coalesced': 0}
+        latencies = []
+        for _ in fleets:
+            result = results.get()
+            latencies.extend(result.pop('latencies'))
+            for name in totals:
+                totals[name] += result[name]
+        wall = time.perf_counter() - wall_start
+        cpu_after = server_cpu_seconds(pgid) if pgid else None
+        for fleet in fleets:
+            fleet.join()
+    finally:
+        if server_process is not None:
+            os.killpg(server_process.pid, signal.SIGINT)
+            server_process.wait()
+            os.unlink(keys_file.name)
+
+    latencies.sort()
+    answered = totals['replies'] + totals['coalesced']
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {name: getattr(args, name) for name in
+                   ('clients', 'processes', 'interval', 'duration', 'knob_turn_probability',
+                    'temp_drift', 'on_change', 'wire', 'aes', 'workers', 'target')},
+        'sent': totals['sent'],
+        'replies': totals['replies'],
+        'coalesced': totals['coalesced'],
+        'packets_per_sec': totals['sent'] / args.duration,
+        'replies_per_sec': totals['replies'] / args.duration,
+        'drop_rate': 1 - answered / totals['sent'] if totals['sent'] else 0.0,
+        'latency_ms': {name: (None if value is None else value * 1000) for name, value in (
+            ('p50', percentile(latencies, 0.50)), ('p99', percentile(latencies, 0.99)),
+            ('p999', percentile(latencies, 0.999)), ('max', latencies[-1] if latencies else None))},
+        'server_cpu_seconds': None if cpu_before is None else cpu_after - cpu_before,
+        'server_cpu_percent': None if cpu_before is None else (cpu_after - cpu_before) / wall * 100,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    latency = report['latency_ms']
+    print(f"{report['sent']} sent, {report['replies']} replies ({report['coalesced']} coalesced) "
+          f"in {args.duration:.0f} s: {report['packets_per_sec']:.0f} packets/s, "
+          f"drop rate {report['drop_rate'] * 100:.2f}%")
+    if latencies:
+        print(f"latency p50 {latency['p50']:.3f} ms  p99 {latency['p99']:.3f} ms  "
+              f"p999 {latency['p999']:.3f} ms  max {latency['max']:.3f} ms")
+    if report['server_cpu_seconds'] is not None:
+        print(f"server CPU {report['server_cpu_seconds']:.2f} s ({report['server_cpu_percent']:.0f}%)")
+    print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
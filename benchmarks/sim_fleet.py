@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : sim_fleet.py
+# Description : Run many real thermostat clients on simulated hardware
+#               against a control server and sum up their I2C and LCD cost
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Every client is an unmodified thermometer.py process with
+# THERMOSTAT_HARDWARE=sim (see Client side/hardware.py) and its own device
+# ID. Unless --server is given, a local control server is started for the
+# run. At the end the clients are stopped with SIGINT, so they log their
+# sampler and simulated hardware counters, which are added up here; the
+# server's /metrics counters are printed alongside. The calibration files
+# the clients write next to thermometer.py are removed afterwards, and so
+# is the I2C probe cache unless there was one before the run.
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLIENT_DIR = os.path.join(HERE, '..', 'Client side')
+CLIENT = os.path.join(CLIENT_DIR, 'thermometer.py')
+PROBE_CACHE = os.path.join(CLIENT_DIR, 'i2c-probe.json')
+SERVER = os.path.join(HERE, '..', 'server side', 'control_server.py')
+FIRST_DEVICE_ID = 0x51000000
+FIELD = re.compile(r'(\w+)=(\S+)')
+# Counters that are also shown per client per second
+RATES = ('samples', 'dropped', 'i2c_transactions', 'i2c_bus_ms', 'lcd_port_writes', 'gpio_writes')
+
+
+def exit_counters(path):
+    """ {event: {field: value}} from the sampler and sim_hardware lines of a client log """
+    counters = {}
+    with open(path) as log:
+        for line in log:
+            parts = line.split()
+            if len(parts) > 3 and parts[3] in ('sampler', 'sim_hardware'):
+                fields = counters[parts[3]] = {}
+                for name, value in FIELD.findall(line):
+                    try:
+                        fields[name] = float(value)
+                    except ValueError:
+                        pass  # Not a counter, e.g. last_error=None
+    return counters
+
+
+def scrape(host, port):
+    try:
+        with urllib.request.urlopen('http://%s:%d/metrics' % (host, port), timeout=2) as response:
+            text = response.read().decode()
+    except OSError as e:
+        return ['(metrics unavailable: %s)' % e]
+    return [line for line in text.splitlines()
+            if line.startswith(('thermostat_packets', 'thermostat_devices', 'thermostat_active'))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--server', metavar='HOST:PORT', help='use this server instead of starting one')
+    parser.add_argument('--port', type=int, default=22500, help='port of the local server')
+    parser.add_argument('--metrics-port', type=int, default=22501)
+    parser.add_argument('--adc', choices=('pcf8591', 'ads7830'), default='pcf8591')
+    parser.add_argument('--realtime', action='store_true', help='sleep for the modelled bus time')
+    parser.add_argument('--profile', action='store_true', help='run the clients with THERMOSTAT_PROFILE=1')
+    args = parser.parse_args()
+
+    server = None
+    clients = []
+    had_cache = os.path.exists(PROBE_CACHE)
+    try:
+        if args.server:
+            host, port = args.server.rsplit(':', 1)
+        else:
+            host, port = '127.0.0.1', str(args.port)
+            server = subprocess.Popen([sys.executable, SERVER, '--host', host, '--port', port, '--quiet',
+                                       '--metrics-host', host, '--metrics-port', str(args.metrics_port),
+                                       '--state-dir', '', '--history-dir', '', '--api-port', '0'])
+            time.sleep(1.0)
+
+        logs = tempfile.mkdtemp(prefix='sim_fleet-')
+        for i in range(args.clients):
+            device_id = FIRST_DEVICE_ID + i
+            env = dict(os.environ, THERMOSTAT_HARDWARE='sim', THERMOSTAT_SIM_ADC=args.adc,
+                       THERMOSTAT_SIM_SEED=str(device_id), THERMOSTAT_DEVICE_ID=str(device_id),
+                       THERMOSTAT_SERVER_IP=host, THERMOSTAT_SERVER_PORT=port,
+                       THERMOSTAT_SIM_REALTIME='1' if args.realtime else '0',
+                       THERMOSTAT_PROFILE='1' if args.profile else '0')
+            path = os.path.join(logs, 'client-%08x.log' % device_id)
+            with open(path, 'w') as out:
+                clients.append((device_id, path, subprocess.Popen([sys.executable, CLIENT], env=env,
+                                                                  cwd=CLIENT_DIR, stdout=out,
+                                                                  stderr=subprocess.STDOUT)))
+        print('%d clients started, logs in %s' % (len(clients), logs))
+        time.sleep(args.duration)
+        metrics = scrape(host, args.metrics_port) if server is not None else []
+
+        for _, _, process in clients:
+            process.send_signal(signal.SIGINT)
+        totals, failed = {}, 0
+        for device_id, path, process in clients:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            counters = exit_counters(path)
+            if process.returncode or 'sim_hardware' not in counters:
+                failed += 1
+            for event, fields in counters.items():
+                for name, value in fields.items():
+                    totals.setdefault(event, {}).setdefault(name, []).append(value)
+    finally:
+        for device_id, _, process in clients:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            calibration = os.path.join(CLIENT_DIR, 'calibration-%08x.json' % device_id)
+            if os.path.exists(calibration):
+                os.remove(calibration)
+        if not had_cache and os.path.exists(PROBE_CACHE):
+            os.remove(PROBE_CACHE)
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print('%d clients ran for %.0f s, %d did not exit cleanly' % (len(clients), args.duration, failed))
+    for event, fields in sorted(totals.items()):
+        for name, values in sorted(fields.items()):
+            mean = sum(values) / len(values)
+            line = '%-13s %-18s mean %10.2f  max %10.2f' % (event, name, mean, max(values))
+            if name in RATES:
+                line += '  %8.2f/s per client' % (mean / args.duration)
+            print(line)
+    for line in metrics:
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : histogram.py
+# Description : Fixed memory latency histogram shared by clients and server
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Log-linear buckets in the HDR histogram style: 2**SUB_BITS buckets per
+# power of two, so a value is known to within about 12%. The counts live
+# in one preallocated array and recording never allocates a bucket.
+from array import array
+
+SUB_BITS = 3
+SUB_COUNT = 1 << SUB_BITS
+BUCKETS = SUB_COUNT * 40  # Up to 2**40, about 18 minutes in nanoseconds
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Histogram(object):
+    """ Fixed memory log-linear histogram of non-negative integers """
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * BUCKETS))
+        self.total = 0
+
+    def record(self, value):
+        if value < 2 * SUB_COUNT:
+            index = value if value > 0 else 0
+        else:
+            shift = value.bit_length() - SUB_BITS - 1
+            index = (shift << SUB_BITS) + (value >> shift)
+            if index >= BUCKETS:
+                index = BUCKETS - 1
+        self.counts[index] += 1
+        self.total += value
+
+    @staticmethod
+    def upper_bound(index):
+        """ Largest value counted in bucket index """
+        if index < 2 * SUB_COUNT:
+            return index
+        shift = (index >> SUB_BITS) - 1
+        return ((index - (shift << SUB_BITS) + 1) << shift) - 1
+
+    def count(self):
+        return sum(self.counts)
+
+    def quantiles(self, fractions=QUANTILES):
+        """ Upper bound of the bucket holding each quantile (fractions ascending), 0 when empty """
+        counts = self.counts.tolist()
+        total = sum(counts)
+        results = []
+        seen = 0
+        index = 0
+        for fraction in fractions:
+            target = fraction * total
+            while index < BUCKETS - 1 and seen + counts[index] < target:
+                seen += counts[index]
+                index += 1
+            results.append(self.upper_bound(index) if total else 0)
+        return results
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : reporting.py
+# Description : Send-on-change telemetry policy shared by clients and server
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# A thermostat only sends telemetry when the temperature or the set point
+# has moved further than a deadband since the last report, and otherwise
+# once per heartbeat. The server keeps a device's last reported values
+# through the silence in between and only treats a device as gone after
+# several missed heartbeats.
+
+TEMP_DEADBAND = 0.2       # Degrees the temperature must move to be reported
+SET_DEADBAND = 0.5        # Set point units the knob must move to be reported
+HEARTBEAT_INTERVAL = 30.0 # Seconds between reports of an unchanged reading
+SILENCE_TIMEOUT = 3 * HEARTBEAT_INTERVAL  # Server: no report for this long -> inactive
+
+
+class ChangeReporter(object):
+    """ Decides which telemetry readings are worth a datagram """
+
+    def __init__(self, temp_deadband=TEMP_DEADBAND, set_deadband=SET_DEADBAND,
+                 heartbeat=HEARTBEAT_INTERVAL):
+        self.temp_deadband = temp_deadband
+        self.set_deadband = set_deadband
+        self.heartbeat = heartbeat
+        self.last_temp = None
+        self.last_set_temp = None
+        self.last_time = None
+        self.sent = 0
+        self.suppressed = 0
+
+    def due(self, temp, set_temp, now):
+        """ True (and remember the reading) if it should be sent at time now """
+        if (self.last_time is None
+                or now - self.last_time >= self.heartbeat
+                or abs(temp - self.last_temp) > self.temp_deadband
+                or abs(set_temp - self.last_set_temp) > self.set_deadband):
+            self.last_temp = temp
+            self.last_set_temp = set_temp
+            self.last_time = now
+            self.sent += 1
+            return True
+        self.suppressed += 1
+        return False
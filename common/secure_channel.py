@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : secure_channel.py
+# Description : Session-keyed authenticated encryption for thermostat frames
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Every thermostat has a 16-byte pre-shared key (PSK). At start-up the client
+# picks a random 8-byte session salt. A salt only becomes a session on the
+# server once the client has answered a challenge for it: the first frame
+# of a salt (or one under a cookie the server did not issue) is answered
+# with a cookie, and the client sends the frame again under that cookie.
+# The cookie is the time it was issued plus an HMAC of device id, salt and
+# issue time, keyed with a secret the server draws at every start, so the
+# server keeps no state for challenges and frames from before a restart
+# are challenged, never accepted. A session under a valid cookie replaces
+# the device's current one only if its cookie is the newer; the replaced
+# salt is refused from then on.
+#
+# Both directions' keys are derived from PSK + salt + cookie with
+# HKDF-SHA256, once per session, and the AES-GCM contexts are kept for the
+# whole session, so no key travels on the wire and nothing is set up per
+# packet. A client follows a new cookie once a frame under it
+# authenticates, and never goes back to one it has left.
+#
+#   secure frame : version (B) | MSG_SECURE (B) | device id (I) | sequence (I)
+#                  | session salt (8s) | cookie (16s) | ciphertext | tag (16)
+#
+# Both directions use this frame; a challenge is a reply with no
+# ciphertext. The header is the GCM associated data and the nonce is the
+# direction and sequence number. Each side's sequence numbers are checked
+# against a 64-frame replay window; the server's start at CHALLENGE_SEQ + 1
+# under every cookie, so a reply never reuses the challenge's nonce.
+import hashlib
+import hmac
+import json
+import os
+import struct
+import sys
+import time
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from thermostat_protocol import MSG_SECURE, PROTOCOL_VERSION, SEQUENCE_MASK
+
+KEY_SIZE = 16
+SALT_SIZE = 8
+TAG_SIZE = 16
+COOKIE = struct.Struct('!Q8s')  # issue time (monotonic ns), truncated HMAC
+NO_COOKIE = bytes(COOKIE.size)  # What a client sends before its first challenge
+SECURE_HEADER = struct.Struct('!BBII8s16s')
+COOKIE_OFFSET = SECURE_HEADER.size - COOKIE.size
+NONCE = struct.Struct('!4sI4x')  # direction | sequence number | zero
+CHALLENGE_SEQ = 1  # Sequence number of every challenge
+REPLAY_WINDOW = 64
+WINDOW_MASK = (1 << REPLAY_WINDOW) - 1
+
+CLIENT_TO_SERVER = b'C2S\0'
+SERVER_TO_CLIENT = b'S2C\0'
+CONTEXT = b'thermostat session v3'
+
+
+def derive(psk, salt, cookie):
+    """ (client-to-server, server-to-client) AES-GCM contexts of one session """
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=2 * KEY_SIZE, salt=salt + cookie, info=CONTEXT)
+    keys = hkdf.derive(psk)
+    return AESGCM(keys[:KEY_SIZE]), AESGCM(keys[KEY_SIZE:])
+
+
+class Challenge(ValueError):
+    """ A secure frame the server will not accept before the client answers reply """
+
+    def __init__(self, message, reply):
+        super(Challenge, self).__init__(message)
+        self.reply = reply
+
+
+class SecureSession(object):
+    """ Cached cipher state for one thermostat session (one PSK + salt + cookie) """
+
+    def __init__(self, psk, device_id, salt=None, cookie=NO_COOKIE, server=False):
+        self.device_id = device_id
+        self.salt = salt if salt is not None else os.urandom(SALT_SIZE)
+        self.issued = COOKIE.unpack(cookie)[0]
+        self._psk = psk
+        self._server = server
+        self._send_prefix = SERVER_TO_CLIENT if server else CLIENT_TO_SERVER
+        self._recv_prefix = CLIENT_TO_SERVER if server else SERVER_TO_CLIENT
+        self.cookie = None
+        self._left = set()     # cookies the client has moved on from
+        self._use_cookie(cookie)
+        self.send_seq = CHALLENGE_SEQ if server else 0
+        self.recv_seq = 0      # highest sequence number accepted
+        self.recv_window = 0   # bitmap of accepted sequence numbers below it
+        self.last = None       # last plaintext sealed, sent again after a challenge
+
+    def _use_cookie(self, cookie, ciphers=None):
+        if self.cookie is not None:
+            self._left.add(self.cookie)
+        self.cookie = cookie
+        to_server, to_client = ciphers or derive(self._psk, self.salt, cookie)
+        self._send, self._recv = (to_client, to_server) if self._server else (to_server, to_client)
+
+    def _seal(self, seq, plaintext):
+        header = SECURE_HEADER.pack(PROTOCOL_VERSION, MSG_SECURE, self.device_id, seq,
+                                    self.salt, self.cookie)
+        return header + self._send.encrypt(NONCE.pack(self._send_prefix, seq), plaintext, header)
+
+    def seal(self, plaintext):
+        """ Encrypt and authenticate one frame with the next send sequence number """
+        self.send_seq = (self.send_seq + 1) & SEQUENCE_MASK
+        self.last = plaintext
+        return self._seal(self.send_seq, plaintext)
+
+    def reseal(self):
+        """ The last frame again, under the cookie of the challenge just opened """
+        return self.seal(self.last)
+
+    def challenge(self):
+        """ Server: the challenge carrying this session's cookie """
+        return self._seal(CHALLENGE_SEQ, b'')
+
+    def open(self, data, seq):
+        """ Verify and decrypt a secure frame (bytes or memoryview) whose header was already parsed
+
+        On the client an empty result is a challenge: send reseal() next.
+        """
+        if len(data) < SECURE_HEADER.size + TAG_SIZE:
+            raise ValueError("short secure frame")
+        cookie = bytes(data[COOKIE_OFFSET:SECURE_HEADER.size])
+        ciphers = None
+        if cookie == self.cookie:
+            cipher = self._recv
+        elif self._server or cookie == NO_COOKIE or cookie in self._left:
+            raise ValueError("frame from another server session")
+        else:
+            # The server (re)started this session: its keys are the new cookie's
+            ciphers = derive(self._psk, self.salt, cookie)
+            cipher = ciphers[1]
+        header = data[:SECURE_HEADER.size]
+        try:
+            plaintext = cipher.decrypt(NONCE.pack(self._recv_prefix, seq), data[SECURE_HEADER.size:], header)
+        except InvalidTag:
+            raise ValueError("authentication failed") from None
+        if ciphers is not None:
+            self._use_cookie(cookie, ciphers)
+            self.recv_seq = self.recv_window = 0
+        self._check_replay(seq)
+        return plaintext
+
+    def _check_replay(self, seq):
+        if seq > self.recv_seq:
+            # The previous highest sequence number is now shift frames behind
+            shift = seq - self.recv_seq
+            self.recv_window = ((self.recv_window << shift) | (1 << (shift - 1))) & WINDOW_MASK
+            self.recv_seq = seq
+            return
+        age = self.recv_seq - seq
+        if age == 0 or age > REPLAY_WINDOW or self.recv_window & (1 << (age - 1)):
+            raise ValueError("replayed or stale frame %d" % seq)
+        self.recv_window |= 1 << (age - 1)
+
+
+def parse_header(data):
+    """ Secure frame -> (device id, sequence, session salt) """
+    if len(data) < SECURE_HEADER.size + TAG_SIZE:
+        raise ValueError("short secure frame")
+    version, msg_type, device_id, seq, salt, _ = SECURE_HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION or msg_type != MSG_SECURE:
+        raise ValueError("not a secure frame")
+    return device_id, seq, salt
+
+
+class SecureServerChannel(object):
+    """ Server end: PSKs by device id and one cached session per device """
+
+    def __init__(self, keys, clock=time.monotonic_ns):
+        self.keys = keys         # device id -> PSK
+        self.sessions = {}       # device id -> SecureSession
+        self.replaced = {}       # device id -> salts of the sessions replaced since start
+        self.secret = os.urandom(KEY_SIZE)  # Cookies of earlier server runs do not verify
+        self.clock = clock
+        self.challenges = 0
+
+    def cookie(self, device_id, salt, issued):
+        mac = hmac.new(self.secret, struct.pack('!IQ', device_id, issued) + salt, hashlib.sha256)
+        return COOKIE.pack(issued, mac.digest()[:COOKIE.size - 8])
+
+    def open(self, data):
+        """ Secure frame -> (device id, inner frame); raises Challenge for an unproven salt """
+        device_id, seq, salt = parse_header(data)
+        cookie = bytes(data[COOKIE_OFFSET:SECURE_HEADER.size])
+        session = self.sessions.get(device_id)
+        if session is not None and session.salt == salt and session.cookie == cookie:
+            return device_id, session.open(data, seq)
+        psk = self.keys.get(device_id)
+        if psk is None:
+            raise ValueError("unknown device %d" % device_id)
+        if salt in self.replaced.get(device_id, ()):
+            raise ValueError("frame from an earlier session of device %d" % device_id)
+        issued = COOKIE.unpack(cookie)[0]
+        if not hmac.compare_digest(cookie, self.cookie(device_id, salt, issued)):
+            # A new salt, or a frame from before a restart: make the sender prove it is live
+            self.challenges += 1
+            fresh = self.cookie(device_id, salt, self.clock())
+            raise Challenge("session of device %d not established" % device_id,
+                            SecureSession(psk, device_id, salt, fresh, server=True).challenge())
+        if session is not None and issued <= session.issued:
+            raise ValueError("frame from an earlier session of device %d" % device_id)
+        # The tag proves the sender holds the PSK and answered a challenge
+        # issued after the current session's: it replaces that session
+        candidate = SecureSession(psk, device_id, salt, cookie, server=True)
+        plaintext = candidate.open(data, seq)
+        if session is not None and session.salt != salt:
+            self.replaced.setdefault(device_id, set()).add(session.salt)
+        self.sessions[device_id] = candidate
+        return device_id, plaintext
+
+    def seal(self, device_id, plaintext):
+        return self.sessions[device_id].seal(plaintext)
+
+
+def load_keys(path):
+    """ Server key file: JSON object of device id -> hex PSK """
+    with open(path) as f:
+        try:
+            return {int(device_id): bytes.fromhex(key) for device_id, key in json.load(f).items()}
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError("bad device key file %s: %s" % (path, e)) from None
+
+def load_key(path):
+    """ Client key file: the device's hex PSK """
+    with open(path) as f:
+        return bytes.fromhex(f.read().strip())
+
+def provision(keys_path, key_path, device_id):
+    """ Create a PSK for device_id, add it to the server key file and write the client key file """
+    keys = {}
+    if os.path.exists(keys_path):
+        with open(keys_path) as f:
+            keys = json.load(f)
+    key = os.urandom(KEY_SIZE).hex()
+    keys[str(device_id)] = key
+    with open(keys_path, 'w') as f:
+        json.dump(keys, f, indent=2)
+    with open(key_path, 'w') as f:
+        f.write(key + '\n')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print("Usage: secure_channel.py <server device_keys.json> <client device.key> <device id>")
+        exit(1)
+    provision(sys.argv[1], sys.argv[2], int(sys.argv[3], 0))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : structured_log.py
+# Description : Levelled structured logging with a background writer
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# A log call below the configured level costs one comparison. Above it the
+# record (time, level, event, device, fields) is appended to a bounded
+# deque and the call returns; nothing is formatted or written on the
+# caller's thread. A writer thread drains the deque every FLUSH_INTERVAL
+# into the sink. When the deque is full new records are dropped and
+# counted rather than making the caller wait. Field values are formatted
+# later on the writer thread, so pass immutable values (bytes, not
+# memoryviews over a reused buffer).
+#
+# Sinks: 'text' (human readable, stdout or a file), 'jsonl' (one JSON
+# object per line) and 'binary' (marshal records, see read_binary()).
+import atexit
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+LEVEL_NAMES = {number: name.upper() for name, number in LEVELS.items()}
+QUEUE_SIZE = 8192       # Records buffered before new ones are dropped
+FLUSH_INTERVAL = 0.05   # Seconds between writer passes
+WRITE_BATCH = 256       # Records formatted and written per sink write
+
+
+class TextSink(object):
+    """ "time LEVEL event device=.. key=value" lines """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, records):
+        lines = []
+        for created, level, event, device, fields in records:
+            line = '%s.%03d %-7s %s' % (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created)),
+                                        created % 1 * 1000, LEVEL_NAMES[level], event)
+            if device is not None:
+                line += ' device=%s' % (device,)
+            for name, value in fields.items():
+                line += ' %s=%s' % (name, value.hex() if isinstance(value, bytes) else value)
+            lines.append(line + '\n')
+        self.stream.write(''.join(lines))
+        self.stream.flush()
+
+
+class JsonLinesSink(object):
+    """ One JSON object per record """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, records):
+        dumps = json.dumps
+        self.stream.write(''.join(
+            dumps({'time': created, 'level': LEVEL_NAMES[level], 'event': event,
+                   'device': device, **fields}, default=_json_default) + '\n'
+            for created, level, event, device, fields in records))
+        self.stream.flush()
+
+
+class BinarySink(object):
+    """ marshal-encoded record tuples, the cheapest to write """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, records):
+        for created, level, event, device, fields in records:
+            fields = {name: value if isinstance(value, (int, float, str, bytes, type(None)))
+                      else str(value) for name, value in fields.items()}
+            self.stream.write(marshal.dumps((created, level, event, device, fields)))
+        self.stream.flush()
+
+
+def _json_default(value):
+    return value.hex() if isinstance(value, bytes) else str(value)
+
+
+def read_binary(path):
+    """ Yield the (time, level, event, device, fields) records of a binary log """
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield marshal.load(f)
+            except EOFError:
+                return
+
+
+SINKS = {'text': (TextSink, 'a'), 'jsonl': (JsonLinesSink, 'a'), 'binary': (BinarySink, 'ab')}
+
+
+class AsyncLog(object):
+    """ Levelled log calls queued for a background writer thread """
+
+    def __init__(self, level=INFO, sink=None, queue_size=QUEUE_SIZE, sample_every=1):
+        self.level = LEVELS.get(level, level)
+        self.sink = sink if sink is not None else TextSink(sys.stdout)
+        self.queue_size = queue_size
+        self.sample_every = sample_every  # Keep one in N records of each device
+        self.records = deque()
+        self.device_counts = {}
+        self.dropped = 0
+        self.sampled_out = 0
+        self.written = 0
+        self.running = False
+        self.writer = None
+        self.start()
+        _logs.add(self)
+
+    def start(self):
+        self.running = True
+        self.writer = threading.Thread(target=self._run, name='log writer', daemon=True)
+        self.writer.start()
+
+    def _after_fork(self):
+        if self.running:
+            self.records = deque()
+            self.start()
+
+    def log(self, level, event, device=None, **fields):
+        if level < self.level:
+            return
+        if device is not None and self.sample_every > 1 and level < WARNING:
+            count = self.device_counts.get(device, 0)
+            self.device_counts[device] = count + 1
+            if count % self.sample_every:
+                self.sampled_out += 1
+                return
+        if len(self.records) >= self.queue_size:
+            self.dropped += 1
+            return
+        self.records.append((time.time(), level, event, device, fields))
+
+    def debug(self, event, device=None, **fields):
+        self.log(DEBUG, event, device, **fields)
+
+    def info(self, event, device=None, **fields):
+        self.log(INFO, event, device, **fields)
+
+    def warning(self, event, device=None, **fields):
+        self.log(WARNING, event, device, **fields)
+
+    def error(self, event, device=None, **fields):
+        self.log(ERROR, event, device, **fields)
+
+    def enabled_for(self, level):
+        return level >= self.level
+
+    def _drain(self):
+        records = self.records
+        while records:
+            # Small batches keep the writer from holding the GIL for long
+            batch = [records.popleft() for _ in range(min(len(records), WRITE_BATCH))]
+            try:
+                self.sink.write(batch)
+                self.written += len(batch)
+            except (OSError, ValueError):
+                self.dropped += len(batch)  # Closed or broken sink, never stop the writer
+
+    def _run(self):
+        while self.running:
+            time.sleep(FLUSH_INTERVAL)
+            self._drain()
+
+    def close(self):
+        """ Stop the writer and write what is still queued """
+        if self.running:
+            self.running = False
+            self.writer.join()
+            self._drain()
+
+
+# Every AsyncLog, for the one fork handler: a forked worker has their
+# queues but not their writer threads
+_logs = weakref.WeakSet()
+
+
+def _after_fork():
+    for log in list(_logs):
+        log._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):  # Not on Windows, which cannot fork
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+_log = None
+
+
+def configure(level=INFO, sink='text', path=None, sample_every=1, queue_size=QUEUE_SIZE):
+    """ Set up the process-wide log: sink 'text', 'jsonl' or 'binary', to path or stdout """
+    global _log
+    if _log is not None:
+        _log.close()
+    sink_class, mode = SINKS[sink]
+    if path is not None:
+        stream = open(path, mode, buffering=1 << 16)
+    elif sink == 'binary':
+        stream = sys.stdout.buffer
+    else:
+        stream = sys.stdout
+    _log = AsyncLog(level, sink_class(stream), queue_size, sample_every)
+    return _log
+
+
+def get_log():
+    """ The process-wide log, a default one on stdout if not configured """
+    if _log is None:
+        configure()
+    return _log
+
+
+@atexit.register
+def _close():
+    if _log is not None:
+        _log.close()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : thermostat_protocol.py
+# Description : Thermostat wire protocol shared by the clients and servers
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Binary frames are a fixed header followed by a fixed payload per type,
+# all big endian. Temperatures are sent as signed hundredths of a degree.
+#
+#   header     : version (B) | type (B) | device id (I) | sequence (I)
+#   KNOB       : knob step (b)                     -1 decreasing, 0 not turned, 1 increasing
+#   TELEMETRY  : current temp (h) | set temp (h)
+#   COMMAND    : set temp (h) | LED flags (B)      bit 0 cool, bit 1 heat
+#   KEEPALIVE  : no payload, the last COMMAND still stands
+#   SECURE     : an encrypted frame, see secure_channel.py
+#
+# The old CSV text messages ("Increasing", "tempC,tempS", "set,cool,heat")
+# are still understood. A CSV datagram can never start with the version
+# byte, so both formats can share the port: the server answers each device
+# in the format it spoke. Servers older than the binary frames can crash on
+# one, so a client starts in CSV and sends BINARY_PROBE: older servers read
+# it as a knob status they do not know, which leaves the set point alone,
+# and answer in CSV; a server that takes binary frames answers with a binary
+# KEEPALIVE, and the client switches. A client also falls back to CSV as
+# soon as it gets a CSV reply. CSV devices always get a full command, the
+# CSV protocol has no keepalive.
+import struct
+
+PROTOCOL_VERSION = 1
+MSG_KNOB = 1
+MSG_TELEMETRY = 2
+MSG_COMMAND = 3
+MSG_KEEPALIVE = 4
+MSG_SECURE = 0x10
+
+COOL_FLAG = 0x01
+HEAT_FLAG = 0x02
+TEMP_SCALE = 100  # hundredths of a degree
+
+HEADER = struct.Struct('!BBII')
+KNOB = struct.Struct('!BBIIb')
+TELEMETRY = struct.Struct('!BBIIhh')
+COMMAND = struct.Struct('!BBIIhB')
+PAYLOADS = {MSG_KNOB: KNOB, MSG_TELEMETRY: TELEMETRY, MSG_COMMAND: COMMAND,
+            MSG_KEEPALIVE: HEADER}
+
+WIRE_BINARY = 'binary'
+WIRE_CSV = 'csv'
+BINARY_PROBE = 'Binary?'  # CSV message asking whether the server takes binary frames
+
+# Control knob status strings of the CSV protocol, as set point steps
+KNOB_STEPS = {"Increasing": 1, "Decreasing": -1, "Not Turned": 0}
+KNOB_STATUS = {step: status for status, step in KNOB_STEPS.items()}
+SEQUENCE_MASK = 0xFFFFFFFF
+
+
+def _scale(temp):
+    return max(-32768, min(32767, int(round(temp * TEMP_SCALE))))
+
+def is_binary(data):
+    """ A binary or secure frame, maybe malformed; CSV text never starts with the version byte """
+    return len(data) > 0 and data[0] == PROTOCOL_VERSION
+
+def device_id_of(data):
+    """ Device id from the header of a binary or secure frame, None for CSV or a short frame """
+    if is_binary(data) and len(data) >= HEADER.size:
+        return HEADER.unpack_from(data)[2]
+    return None
+
+def pack_knob(device_id, seq, step):
+    return KNOB.pack(PROTOCOL_VERSION, MSG_KNOB, device_id, seq & SEQUENCE_MASK, step)
+
+def pack_telemetry(device_id, seq, current_temp, set_temp):
+    return TELEMETRY.pack(PROTOCOL_VERSION, MSG_TELEMETRY, device_id, seq & SEQUENCE_MASK,
+                          _scale(current_temp), _scale(set_temp))
+
+def pack_command(device_id, seq, set_temp, cool, heat):
+    flags = (COOL_FLAG if cool else 0) | (HEAT_FLAG if heat else 0)
+    return COMMAND.pack(PROTOCOL_VERSION, MSG_COMMAND, device_id, seq & SEQUENCE_MASK,
+                        _scale(set_temp), flags)
+
+def pack_keepalive(device_id, seq):
+    return HEADER.pack(PROTOCOL_VERSION, MSG_KEEPALIVE, device_id, seq & SEQUENCE_MASK)
+
+def unpack(data):
+    """ Binary frame -> (type, device id, sequence, value1, value2)
+
+    KNOB gives (step, None), TELEMETRY (current temp, set temp),
+    COMMAND (set temp, LED flags) and KEEPALIVE (None, None). Raises
+    ValueError on a bad frame.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("short frame")
+    version, msg_type, device_id, seq = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError("unsupported protocol version %d" % version)
+    layout = PAYLOADS.get(msg_type)
+    if layout is None or len(data) != layout.size:
+        raise ValueError("bad frame type %d or length %d" % (msg_type, len(data)))
+    if msg_type == MSG_KNOB:
+        return msg_type, device_id, seq, layout.unpack_from(data)[4], None
+    if msg_type == MSG_KEEPALIVE:
+        return msg_type, device_id, seq, None, None
+    _, _, _, _, a, b = layout.unpack_from(data)
+    if msg_type == MSG_TELEMETRY:
+        return msg_type, device_id, seq, a / TEMP_SCALE, b / TEMP_SCALE
+    return msg_type, device_id, seq, a / TEMP_SCALE, b
+
+def parse_csv(data):
+    """ CSV datagram -> the same tuple as unpack(), with no device id """
+    fields = str(data, 'utf-8').split(',')
+    if fields == [BINARY_PROBE]:
+        return MSG_KEEPALIVE, None, 0, 0, None
+    if len(fields) == 1:  # Control knob status message
+        return MSG_KNOB, None, 0, KNOB_STEPS.get(fields[0], 0), None
+    if len(fields) == 2:  # Current temperature and set temperature message
+        return MSG_TELEMETRY, None, 0, float(fields[0]), float(fields[1])
+    if len(fields) == 3:  # set,cool,heat command
+        flags = (COOL_FLAG if fields[1] == 'ON' else 0) | (HEAT_FLAG if fields[2] == 'ON' else 0)
+        return MSG_COMMAND, None, 0, float(fields[0]), flags
+    raise ValueError("unexpected CSV message %r" % bytes(data))
+
+def decode(data):
+    """ Either wire format -> (type, device id, sequence, value1, value2) """
+    if is_binary(data):
+        return unpack(data)
+    return parse_csv(data)
+
+def format_csv_command(set_temp, cool, heat):
+    return ("%g,%s,%s" % (set_temp, 'ON' if cool else 'OFF', 'ON' if heat else 'OFF')).encode()
+
+def encode_knob(wire_format, device_id, seq, status):
+    """ Client knob message in the negotiated wire format """
+    if wire_format == WIRE_BINARY:
+        return pack_knob(device_id, seq, KNOB_STEPS.get(status, 0))
+    return status.encode()
+
+def encode_telemetry(wire_format, device_id, seq, current_temp, set_temp):
+    """ Client telemetry message in the negotiated wire format """
+    if wire_format == WIRE_BINARY:
+        return pack_telemetry(device_id, seq, current_temp, set_temp)
+    return f"{current_temp},{set_temp}".encode()
+
+def decode_command(data):
+    """ Server reply -> (set temp, cool on, heat on, wire format it came in)
+
+    None for a keepalive, which means the last command still stands.
+    """
+    msg_type, _, _, set_temp, flags = decode(data)
+    if msg_type == MSG_KEEPALIVE:
+        return None
+    if msg_type != MSG_COMMAND:
+        raise ValueError("expected a command, got message type %d" % msg_type)
+    wire_format = WIRE_BINARY if is_binary(data) else WIRE_CSV
+    return set_temp, bool(flags & COOL_FLAG), bool(flags & HEAT_FLAG), wire_format
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : codec_stages.py
+# Description : Pluggable datagram codec stages for the control server
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# A codec chain is configured as a comma separated list of stages, e.g.
+# "plain", "binary,plain" or "aes,binary". Wrapping stages (aes) come first
+# and unwrap the datagram; the remaining stages are message parsers and the
+# first one that accepts the unwrapped frame decodes it. Stages are handed
+# memoryviews over the server's receive buffer and must not keep them.
+import thermostat_protocol
+from secure_channel import Challenge, SecureServerChannel, load_keys
+
+
+class PlainStage(object):
+    """ CSV text messages ("Increasing", "tempC,tempS") """
+    name = 'plain'
+
+    def accepts(self, view):
+        return not thermostat_protocol.is_binary(view)
+
+    def decode(self, view):
+        return thermostat_protocol.parse_csv(view)
+
+
+class BinaryStage(object):
+    """ struct-packed thermostat_protocol frames, parsed in place """
+    name = 'binary'
+
+    def accepts(self, view):
+        return thermostat_protocol.is_binary(view)
+
+    def decode(self, view):
+        return thermostat_protocol.unpack(view)
+
+
+class AesStage(object):
+    """ Secure channel frames, one cached session per device """
+    name = 'aes'
+
+    def __init__(self, keys):
+        self.channel = SecureServerChannel(keys)  # keys: device id -> PSK
+
+    def unwrap(self, view):
+        """ Secure frame -> (authenticated device id, inner frame), see SecureServerChannel.open """
+        return self.channel.open(view)
+
+    def wrap_batch(self, device_ids, payloads):
+        seal = self.channel.seal
+        return [seal(device_id, payload) for device_id, payload in zip(device_ids, payloads)]
+
+
+class CodecChain(object):
+    """ The configured wrapping stages followed by the message parsers """
+
+    def __init__(self, stages):
+        self.wrappers = [stage for stage in stages if hasattr(stage, 'unwrap')]
+        self.parsers = [stage for stage in stages if not hasattr(stage, 'unwrap')]
+        if not self.parsers:
+            raise ValueError("codec chain needs at least one of 'plain' or 'binary'")
+        self.name = ','.join(stage.name for stage in stages)
+        # Whether CSV devices that probe for binary frames are told to switch
+        self.takes_binary = any(isinstance(stage, BinaryStage) for stage in self.parsers)
+        # Datagrams rejected, by the stage that rejected them
+        self.failures = dict.fromkeys([stage.name for stage in stages] + ['device_id', 'unknown'], 0)
+
+    def decode(self, view):
+        """ Datagram view -> thermostat_protocol message tuple """
+        device_id = None
+        for stage in self.wrappers:
+            try:
+                device_id, view = stage.unwrap(view)
+            except Challenge:
+                raise  # Not a failure: the server answers it (see ControlServer)
+            except ValueError:
+                self.failures[stage.name] += 1
+                raise
+        for stage in self.parsers:
+            if stage.accepts(view):
+                try:
+                    message = stage.decode(view)
+                except ValueError:  # UnicodeDecodeError included
+                    self.failures[stage.name] += 1
+                    raise
+                if device_id is not None and message[1] != device_id:
+                    # The inner frame must be from the device that sealed it
+                    self.failures['device_id'] += 1
+                    raise ValueError("device id %s does not match its secure frame %d"
+                                     % (message[1], device_id))
+                return message
+        self.failures['unknown'] += 1
+        raise ValueError("no '%s' codec stage accepts this datagram" % self.name)
+
+    def encode_batch(self, keys, payloads):
+        for stage in reversed(self.wrappers):
+            payloads = stage.wrap_batch(keys, payloads)
+        return payloads
+
+
+def build_codec_chain(spec, keys_path=None):
+    """ "aes,binary" -> CodecChain """
+    stages = []
+    for name in spec.split(','):
+        name = name.strip()
+        if name == 'plain':
+            stages.append(PlainStage())
+        elif name == 'binary':
+            stages.append(BinaryStage())
+        elif name == 'aes':
+            stages.append(AesStage(load_keys(keys_path)))
+        else:
+            raise ValueError("unknown codec stage '%s'" % name)
+    return CodecChain(stages)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : control_server.py
+# Description : asyncio control server core, one device row per thermostat
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import argparse
+import asyncio
+import os
+import shlex
+import socket
+import sys
+import time
+
+# The wire protocol is shared with the clients and lives in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from codec_stages import build_codec_chain
+from device_table import DeviceTable
+from metrics import Metrics, clock, start_metrics_server
+from outbound import DEFAULT_BATCH_SIZE, OutboundQueue
+from query_api import API_SUPPORTED, QueryApi
+from rolling_stats import RollingStats
+from secure_channel import Challenge
+from state_log import StateLog
+from timeseries import TimeSeriesStore
+from structured_log import DEBUG, LEVELS, SINKS, configure, get_log
+from thermostat_protocol import MSG_KEEPALIVE, pack_keepalive
+
+# Define the IP address and port to listen for data
+SERVER_IP = '0.0.0.0'  # Listen on all available network interfaces
+SERVER_PORT = 12345
+RECV_BUFFER_SIZE = 2048  # Largest datagram accepted
+RECV_BATCH = 256  # Datagrams read per readiness callback before yielding
+DEFAULT_CODECS = 'binary,plain'
+PROBE_REPLY = pack_keepalive(0, 0)  # Answer to a CSV device's BINARY_PROBE
+METRICS_IP = '127.0.0.1'  # Prometheus endpoint, local only by default
+METRICS_PORT = 9108  # 0 disables it; worker N serves on METRICS_PORT + N
+API_IP = '127.0.0.1'  # Device query API (see query_api.py), local only by default
+API_PORT = 9180  # 0 disables it; worker N serves its own devices on API_PORT + N
+# Pre-shared key of every thermostat for the aes stage, see secure_channel.py
+DEVICE_KEYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'device_keys.json')
+# Write-ahead log and snapshots of the device table; worker N uses worker-N inside
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state')
+# Memory-mapped temperature history (see timeseries.py), also one directory per worker
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history')
+
+
+class ControlServer(object):
+    """ Receives thermostat datagrams and answers each sender from its own row
+
+    The socket is read with recvfrom_into into one preallocated buffer and
+    each datagram is handed to the codec chain as a memoryview, so nothing
+    is copied before the message is parsed. Datagrams only update their
+    device's row; the control tick then decides every LED at once and
+    queues the replies, which the codec chain wraps in batches and which
+    go out through the same socket. Logging only queues records for the
+    log's writer thread, so the loop never waits on log output. Counters
+    and stage timings are kept in metrics and served as Prometheus text at
+    metrics_addr. With a state_dir, the device table is recovered from it
+    at start and every decision is logged there (see state_log.py); with a
+    history_dir, every temperature report is also added to the device's
+    history. Rolling statistics of every device (see rolling_stats.py) are
+    updated with the reports of each tick and read with device_stats(). With
+    an api_addr, a separate process serves the devices as JSON at api_addr
+    from snapshots the loop publishes, and queues set point overrides back
+    to set_point() and stats requests to device_stats().
+
+    On loops without readiness callbacks (Windows' proactor loop) a
+    datagram endpoint receives instead, one bytes object per datagram.
+    """
+
+    def __init__(self, codecs, log=None, devices=None, batch_size=DEFAULT_BATCH_SIZE, shard=None,
+                 metrics_addr=None, state_dir=None, history_dir=None, api_addr=None):
+        self.codecs = codecs
+        self.shard = shard  # workers.Shard when running as one of several workers
+        self.log = log if log is not None else get_log()
+        self.metrics = Metrics()
+        self.metrics_addr = metrics_addr  # (host, port) of the /metrics endpoint, or None
+        self.devices = devices if devices is not None else DeviceTable()
+        self.state_dir = state_dir
+        self.state = None  # StateLog over state_dir, opened in start()
+        self.history_dir = history_dir
+        self.history = None  # TimeSeriesStore over history_dir, opened in start()
+        self.stats = RollingStats(self.devices.capacity)
+        self.api_addr = api_addr  # (host, port) of the query API, or None
+        self.api = None  # QueryApi serving api_addr, started in start()
+        self.batch_size = batch_size
+        self.sock = None
+        self.transport = None  # The datagram endpoint, where the loop has no add_reader
+        self.outbound = None
+        self.loop = None
+        self._buffer = bytearray(RECV_BUFFER_SIZE)
+        self._view = memoryview(self._buffer)
+        self._tick_scheduled = False
+        self._tick_requested = 0  # clock() when the pending tick was scheduled
+        self._drain_scheduled = False
+
+    def start(self, sock):
+        """ Serve on a bound non-blocking UDP socket from the running loop """
+        self.sock = sock
+        self.loop = asyncio.get_running_loop()
+        self.outbound = OutboundQueue(sock.sendto, self.codecs.encode_batch, self.batch_size,
+                                      self.metrics)
+        if self.state_dir is not None:
+            self.state = StateLog(self.state_dir, self.log)
+            self.state.recover(self.devices)
+            self.state.start(self.loop)
+        if self.history_dir is not None:
+            self.history = TimeSeriesStore(self.history_dir)
+        if self.api_addr is not None and not API_SUPPORTED:
+            self.log.error('api_unavailable', error='the query API needs Unix sockets (POSIX)')
+        elif self.api_addr is not None:
+            self.api = QueryApi(self.api_addr, self.log)
+            self.api.start(self.loop, self.devices, self.stats, self.set_point, self.device_stats)
+        try:
+            self.loop.add_reader(sock.fileno(), self.read_ready)
+        except NotImplementedError:
+            self.loop.create_task(self.open_endpoint(sock))
+        if self.shard is not None:
+            self.loop.add_reader(self.shard.inbox.fileno(), self.forward_ready)
+        self.register_metrics()
+
+    def register_metrics(self):
+        metrics = self.metrics
+        outbound = self.outbound
+        metrics.counter('thermostat_packets_received_total', 'Datagrams received',
+                        lambda: metrics.packets_in)
+        metrics.counter('thermostat_packets_sent_total', 'Replies sent',
+                        lambda: outbound.sent - outbound.dropped)
+        metrics.counter('thermostat_replies_dropped_total', 'Replies the socket refused',
+                        lambda: outbound.dropped)
+        metrics.labelled_counter('thermostat_decode_failures_total',
+                                 'Datagrams rejected (failed authentication or parsing)', 'stage',
+                                 lambda: self.codecs.failures)
+        metrics.counter('thermostat_log_dropped_total', 'Log records dropped on a full queue',
+                        lambda: self.log.dropped)
+        if self.shard is not None:
+            shard = self.shard
+            metrics.counter('thermostat_forwarded_total', 'Datagrams forwarded to their shard',
+                            lambda: shard.forwarded)
+            metrics.counter('thermostat_forward_dropped_total', 'Datagrams that could not be forwarded',
+                            lambda: shard.dropped)
+        if self.state is not None:
+            state = self.state
+            metrics.counter('thermostat_state_records_total', 'Device states committed to the log',
+                            lambda: state.records)
+            metrics.counter('thermostat_state_snapshots_total', 'Device table snapshots taken',
+                            lambda: state.snapshots)
+        if self.history is not None:
+            history = self.history
+            metrics.counter('thermostat_history_samples_total', 'Samples added to the device histories',
+                            lambda: history.appended)
+        metrics.counter('thermostat_stats_updates_total', 'Samples added to the rolling statistics',
+                        lambda: self.stats.updates)
+        if self.api is not None:
+            api = self.api
+            metrics.counter('thermostat_api_snapshots_total', 'Device table snapshots published to the API',
+                            lambda: api.published)
+            metrics.counter('thermostat_api_snapshots_skipped_total',
+                            'Snapshots skipped while the previous one was still being sent',
+                            lambda: api.skipped)
+            metrics.counter('thermostat_api_overrides_total', 'Set point overrides received from the API',
+                            lambda: api.overridden)
+            metrics.counter('thermostat_api_stats_requests_total', 'Statistics requests answered for the API',
+                            lambda: api.queried)
+        metrics.gauge('thermostat_devices', 'Devices known', lambda: len(self.devices))
+        metrics.gauge('thermostat_active_devices', 'Devices heard from within the silence timeout',
+                      lambda: self.devices.active(self.loop.time()))
+        metrics.gauge('thermostat_outbound_queue_depth', 'Replies waiting to be sent',
+                      lambda: len(outbound))
+        metrics.gauge('thermostat_log_queue_depth', 'Log records waiting for the writer',
+                      lambda: len(self.log.records))
+
+    async def open_endpoint(self, sock):
+        self.transport, _ = await self.loop.create_datagram_endpoint(lambda: DatagramReceiver(self),
+                                                                     sock=sock)
+
+    def stop(self):
+        if self.transport is not None:
+            self.transport.close()
+        else:
+            self.loop.remove_reader(self.sock.fileno())
+        if self.shard is not None:
+            self.loop.remove_reader(self.shard.inbox.fileno())
+        if self.state is not None:
+            self.state.close()
+        if self.history is not None:
+            self.history.flush()
+        if self.api is not None:
+            self.api.close()
+
+    def read_ready(self):
+        recvfrom_into = self.sock.recvfrom_into
+        buffer = self._buffer
+        view = self._view
+        shard = self.shard
+        received = 0
+        for received in range(RECV_BATCH):
+            try:
+                nbytes, addr = recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                self.error_received(e)
+                break
+            if shard is not None:
+                owner = shard.owner_of(view[:nbytes], addr)
+                if owner != shard.index:
+                    shard.forward(owner, view[:nbytes], addr)
+                    continue
+            self.datagram_received(view[:nbytes], addr)
+        else:
+            received = RECV_BATCH
+        self.metrics.packets_in += received
+
+    def forward_ready(self):
+        # Datagrams another worker received for a device of this shard
+        for _ in range(RECV_BATCH):
+            try:
+                offset, nbytes, addr = self.shard.receive_into(self._buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            self.datagram_received(self._view[offset:nbytes], addr)
+
+    def datagram_received(self, data, addr):
+        start = clock()
+        try:
+            message = self.codecs.decode(data)
+            device_id = message[1]
+            if message[0] == MSG_KEEPALIVE and device_id is None:
+                self.answer_probe(addr)
+                return
+            # Binary devices are keyed by their id, CSV ones by their address
+            row = self.devices.row_for(addr if device_id is None else device_id)
+            self.devices.update(row, addr, message, self.loop.time())
+        except Challenge as e:
+            # A secure session the device has not proven yet: it answers this first
+            try:
+                self.sock.sendto(e.reply, addr)
+            except OSError:
+                pass  # Lost like a reply; the device's next frame is challenged again
+            return
+        except (ValueError, UnicodeDecodeError) as e:
+            self.log.info('dropped_datagram', addr=addr, error=str(e))
+            return
+        end = clock()
+        self.metrics.stages['decode'].record(end - start)
+        self.schedule_tick(end)
+
+    def set_point(self, key, set_temp):
+        """ Override the set point of device key, as queued by the query API """
+        row = self.devices.index.get(key)
+        if row is None:
+            self.log.warning('override_unknown_device', key)
+            return
+        self.devices.set_temp[row] = set_temp
+        self.log.info('set_point_override', key, set_temp=set_temp)
+        if self.devices.addrs[row] is None:
+            # Not heard from since the restart, so there is nowhere to send it yet
+            if self.state is not None:
+                self.state.record([row])
+            return
+        self.devices.dirty[row] = True
+        self.schedule_tick(clock())
+
+    def schedule_tick(self, requested):
+        if not self._tick_scheduled:
+            # Every datagram read before the callback runs shares one tick
+            self._tick_scheduled = True
+            self._tick_requested = requested
+            self.loop.call_soon(self.control_tick)
+
+    def control_tick(self):
+        self._tick_scheduled = False
+        start = clock()
+        self.metrics.stages['queue'].record(start - self._tick_requested)
+        rows, reported = self.devices.tick()
+        if self.state is not None:
+            self.state.record(rows)
+        if self.history is not None:
+            self.history.append(self.devices, reported, time.time())
+        self.stats.update(self.devices, reported, self.loop.time())
+        debug = self.log.enabled_for(DEBUG)
+        for key, addr, message in self.devices.commands(rows, self.loop.time()):
+            self.outbound.put(key, addr, message)
+            if debug:
+                self.log.debug('command', key, addr=addr, message=message)
+        self.metrics.stages['decide'].record(clock() - start)
+        self.schedule_drain()
+
+    def device_stats(self, key):
+        """ Rolling statistics of device key (device id, or addr of a CSV device), None if unknown """
+        row = self.devices.index.get(key)
+        return None if row is None else self.stats.query(row, self.loop.time())
+
+    def schedule_drain(self):
+        if self.outbound and not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.loop.call_soon(self.drain_outbound)
+
+    def drain_outbound(self):
+        # One batch per loop pass so receiving is never starved by a long queue
+        self._drain_scheduled = False
+        if self.outbound.drain():
+            self.schedule_drain()
+
+    def answer_probe(self, addr):
+        """ A CSV device asks whether it can send binary frames (see BINARY_PROBE) """
+        if not self.codecs.takes_binary:
+            return  # Its next report gets a CSV command, which keeps it on CSV
+        try:
+            self.sock.sendto(PROBE_REPLY, addr)
+        except OSError:
+            pass  # The device reports in CSV, as to a server that does not answer
+
+    def error_received(self, exc):
+        self.log.warning('socket_error', error=str(exc))
+
+
+class DatagramReceiver(asyncio.DatagramProtocol):
+    """ Hands a ControlServer its datagrams where the loop cannot watch the socket """
+
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.metrics.packets_in += 1
+        self.server.datagram_received(memoryview(data), addr)
+
+    def error_received(self, exc):
+        self.server.error_received(exc)
+
+
+def bind_socket(host=SERVER_IP, port=SERVER_PORT, reuse_port=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reuse_port:
+        # Lets every worker process bind the same port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+
+async def serve(server, host=SERVER_IP, port=SERVER_PORT, reuse_port=False):
+    with bind_socket(host, port, reuse_port) as sock:
+        server.start(sock)
+        server.log.info('listening', host=host, port=port, codecs=server.codecs.name)
+        if server.api is not None:
+            server.log.info('api', url='http://%s:%d/devices' % server.api_addr)
+        http = None
+        if server.metrics_addr is not None:
+            try:
+                http = await start_metrics_server(server.metrics, *server.metrics_addr)
+                server.log.info('metrics', url='http://%s:%d/metrics' % server.metrics_addr)
+            except OSError as e:
+                # Keep serving thermostats without the endpoint
+                server.log.error('metrics_unavailable', error=str(e))
+        try:
+            await asyncio.Future()  # Serve until cancelled
+        finally:
+            if http is not None:
+                http.close()
+            server.stop()
+
+
+def run(server, host=SERVER_IP, port=SERVER_PORT, reuse_port=False):
+    try:
+        asyncio.run(serve(server, host, port, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(default_codecs=DEFAULT_CODECS):
+    parser = argparse.ArgumentParser(description='Thermostat control server')
+    parser.add_argument('--host', default=SERVER_IP)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--codecs', default=default_codecs,
+                        help="codec chain, e.g. 'plain', 'binary,plain' or 'aes,binary' (default: %(default)s)")
+    parser.add_argument('--keys', default=DEVICE_KEYS_FILE, help='device key file for the aes stage')
+    parser.add_argument('--log-level', choices=sorted(LEVELS, key=LEVELS.get), default='info',
+                        help="'debug' logs every command sent (default: %(default)s)")
+    parser.add_argument('--quiet', action='store_const', const='warning', dest='log_level',
+                        help='only log warnings and errors')
+    parser.add_argument('--log-format', choices=sorted(SINKS), default='text')
+    parser.add_argument('--log-file', help='log to this file instead of stdout')
+    parser.add_argument('--log-sample', type=int, default=1, metavar='N',
+                        help='keep one in N debug/info records per device')
+    parser.add_argument('--metrics-host', default=METRICS_IP)
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help='Prometheus /metrics port, 0 to disable (default: %(default)s)')
+    parser.add_argument('--api-host', default=API_IP)
+    parser.add_argument('--api-port', type=int, default=API_PORT,
+                        help='device query API port, 0 to disable (default: %(default)s)')
+    parser.add_argument('--state-dir', default=STATE_DIR,
+                        help="device state log and snapshots, '' to keep no state (default: %(default)s)")
+    parser.add_argument('--history-dir', default=HISTORY_DIR,
+                        help="temperature history rings, '' to keep none (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes sharing the port with SO_REUSEPORT (Linux)')
+    args = parser.parse_args()
+    configure(LEVELS[args.log_level], args.log_format, args.log_file, args.log_sample)
+    # Built before any worker starts, so a bad chain or key file stops the server once
+    try:
+        codecs = build_codec_chain(args.codecs, args.keys)
+    except OSError as e:
+        provision = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common', 'secure_channel.py')
+        parser.exit(2, "%s: cannot read the device key file %s (%s)\n"
+                       "Create it by provisioning each thermostat's key:\n"
+                       "    python3 %s %s <client device.key> <device id>\n"
+                    % (parser.prog, args.keys, e.strerror, shlex.quote(os.path.normpath(provision)),
+                       shlex.quote(args.keys)))
+    except ValueError as e:
+        parser.error(str(e))
+
+    def make_server():
+        metrics_addr = (args.metrics_host, args.metrics_port) if args.metrics_port else None
+        api_addr = (args.api_host, args.api_port) if args.api_port else None
+        return ControlServer(codecs, metrics_addr=metrics_addr,
+                             state_dir=args.state_dir or None, history_dir=args.history_dir or None,
+                             api_addr=api_addr)
+
+    if args.workers > 1:
+        from workers import run_workers
+        run_workers(args.workers, make_server, args.host, args.port)
+    else:
+        run(make_server(), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : device_table.py
+# Description : Columnar (NumPy) store of every thermostat's control state
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import socket
+import struct
+
+import numpy as np
+from reporting import HEARTBEAT_INTERVAL, SILENCE_TIMEOUT
+from thermostat_protocol import (COOL_FLAG, HEAT_FLAG, MSG_KNOB, MSG_TELEMETRY, format_csv_command,
+                                 pack_command, pack_keepalive)
+
+DEFAULT_SET_TEMP = 10  # Initial temperature set point
+DEFAULT_HYSTERESIS = 2  # Degrees either side of the set point before heating/cooling
+# An unchanged command is repeated after this long in case the last one was lost
+COMMAND_REFRESH = HEARTBEAT_INTERVAL
+ADDRESS_KEY = 1 << 62  # Marks a key code holding a CSV device's IPv4 address and port
+
+
+def key_code(key):
+    """ Device key (id, or (ip, port) for CSV devices) as one 64-bit number """
+    if isinstance(key, tuple):
+        ip, port = key
+        return ADDRESS_KEY | struct.unpack('!I', socket.inet_aton(ip))[0] << 16 | port
+    return key
+
+
+def key_from_code(code):
+    if code & ADDRESS_KEY:
+        return socket.inet_ntoa(struct.pack('!I', code >> 16 & 0xFFFFFFFF)), code & 0xFFFF
+    return code
+
+
+class DeviceTable(object):
+    """ One row per thermostat, one NumPy column per piece of state
+
+    A datagram only writes its own row and marks it dirty; tick() then
+    makes the heat/cool decision for the whole fleet in a single pass.
+    Binary devices are only sent a command when it differs from the last
+    one they were sent, and a keepalive otherwise.
+    """
+
+    COLUMNS = (
+        ('current_temp', np.float64),
+        ('set_temp', np.float64),
+        ('hysteresis', np.float64),
+        ('knob', np.int8),        # -1 decreasing, 0 not turned, 1 increasing
+        ('pending', np.int32),    # set point steps owed since the last tick
+        ('cool', np.bool_),
+        ('heat', np.bool_),
+        ('dirty', np.bool_),      # updated since the last tick, needs a reply
+        ('reported', np.bool_),   # sent telemetry since the last tick
+        ('binary', np.bool_),     # device speaks the binary protocol, else CSV
+        ('seq', np.uint32),       # last sequence number received, echoed in replies
+        ('last_seen', np.float64),  # loop time of the last message
+        ('sent_set_temp', np.float64),  # last command sent, NaN before the first
+        ('sent_flags', np.int8),
+        ('sent_at', np.float64),  # loop time the last command was sent
+        ('key_code', np.uint64),  # device key as a number, see key_code()
+    )
+
+    def __init__(self, capacity=1024, set_temp=DEFAULT_SET_TEMP, hysteresis=DEFAULT_HYSTERESIS):
+        self.default_set_temp = set_temp
+        self.default_hysteresis = hysteresis
+        self.index = {}  # device key (device id, or addr for CSV devices) -> row
+        self.keys = []   # row -> device key
+        self.addrs = []  # row -> address the device last sent from
+        self.capacity = 0
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(0, dtype))
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _grow(self, capacity):
+        for name, dtype in self.COLUMNS:
+            column = np.zeros(capacity, dtype)
+            column[:self.capacity] = getattr(self, name)
+            setattr(self, name, column)
+        self.set_temp[self.capacity:] = self.default_set_temp
+        self.hysteresis[self.capacity:] = self.default_hysteresis
+        self.sent_set_temp[self.capacity:] = np.nan
+        self.capacity = capacity
+
+    def row_for(self, key):
+        row = self.index.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == self.capacity:
+                self._grow(self.capacity * 2)
+            self.index[key] = row
+            self.keys.append(key)
+            self.addrs.append(None)
+            self.key_code[row] = key_code(key)
+        return row
+
+    def restore(self, codes, columns):
+        """ Set columns ({name: values}) for the devices with these key codes, return how many """
+        row_for = self.row_for
+        rows = np.fromiter((row_for(key_from_code(code)) for code in codes.tolist()), np.intp, len(codes))
+        for name, values in columns.items():
+            getattr(self, name)[rows] = values
+        return len(rows)
+
+    def update(self, row, addr, message, now=0.0):
+        """ Apply one decoded message (see thermostat_protocol.decode) to its row
+
+        Devices only report changes (see reporting.py), so a row keeps its
+        last values through silence; now records when it was last heard.
+        """
+        msg_type, device_id, seq, value1, value2 = message
+        if msg_type == MSG_KNOB:  # Control knob status message
+            self.knob[row] = value1
+        elif msg_type == MSG_TELEMETRY:  # Current temperature and set temperature message
+            self.current_temp[row] = value1
+            self.reported[row] = True
+        else:
+            raise ValueError("unexpected message type %d from %s" % (msg_type, addr))
+        self.addrs[row] = addr
+        self.binary[row] = device_id is not None
+        self.seq[row] = seq
+        self.last_seen[row] = now
+        # Every message applies the knob as it stands then, as the blocking server did
+        self.pending[row] += self.knob[row]
+        self.dirty[row] = True
+
+    def active(self, now, timeout=SILENCE_TIMEOUT):
+        """ Number of devices heard from within timeout seconds of now """
+        return int(np.count_nonzero(self.last_seen[:len(self.keys)] > now - timeout))
+
+    def tick(self):
+        """ Run the control decision for every device
+
+        Returns the rows to answer and, of those, the rows that reported a
+        temperature since the last tick (knob messages and set point
+        overrides also need an answer, but carry no new temperature).
+        """
+        n = len(self.keys)
+        current = self.current_temp[:n]
+        set_temp = self.set_temp[:n]
+        hysteresis = self.hysteresis[:n]
+        set_temp += self.pending[:n]
+        self.pending[:n] = 0
+        np.greater(current, set_temp + hysteresis, out=self.cool[:n])
+        np.less(current, set_temp - hysteresis, out=self.heat[:n])
+        rows = np.flatnonzero(self.dirty[:n])
+        self.dirty[rows] = False
+        reported = rows[self.reported[rows]]
+        self.reported[reported] = False
+        return rows, reported
+
+    def commands(self, rows, now=0.0):
+        """ Yield (device key, address, encoded reply) for the given rows
+
+        The reply is the set/cool/heat command if it changed since the last
+        one sent (or that one is older than COMMAND_REFRESH), else a
+        keepalive echoing the device's sequence number.
+        """
+        keys = self.keys
+        addrs = self.addrs
+        set_temps = self.set_temp[rows]
+        flags = self.cool[rows] * COOL_FLAG | self.heat[rows] * HEAT_FLAG
+        binary = self.binary[rows]
+        changed = ((set_temps != self.sent_set_temp[rows]) | (flags != self.sent_flags[rows])
+                   | (self.sent_at[rows] <= now - COMMAND_REFRESH) | ~binary)
+        sent = rows[changed]
+        self.sent_set_temp[sent] = set_temps[changed]
+        self.sent_flags[sent] = flags[changed]
+        self.sent_at[sent] = now
+        for row, set_temp, flag, is_binary, is_changed, seq in zip(
+                rows.tolist(), set_temps.tolist(), flags.tolist(), binary.tolist(),
+                changed.tolist(), self.seq[rows].tolist()):
+            cool, heat = flag & COOL_FLAG, flag & HEAT_FLAG
+            if not is_binary:
+                yield keys[row], addrs[row], format_csv_command(set_temp, cool, heat)
+            elif is_changed:
+                yield keys[row], addrs[row], pack_command(keys[row], seq, set_temp, cool, heat)
+            else:
+                yield keys[row], addrs[row], pack_keepalive(keys[row], seq)
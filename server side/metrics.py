@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : metrics.py
+# Description : Control server counters, stage latency histograms and a
+#               Prometheus text endpoint
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Counters are plain attributes bumped on the loop. Latencies go into
+# fixed-size histograms (see histogram.py) over nanoseconds. Gauges
+# (devices, queue depths) are only read when /metrics is scraped. The
+# endpoint is served by the server's own asyncio loop and never blocks it.
+import asyncio
+import time
+
+from histogram import QUANTILES, Histogram
+
+STAGES = ('queue', 'decode', 'decide', 'encode', 'send')
+clock = time.perf_counter_ns  # Stage timings are in nanoseconds
+
+
+class Metrics(object):
+    """ Everything the control server exposes on /metrics """
+
+    def __init__(self):
+        self.packets_in = 0
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.gauges = {}  # name -> (help, callable returning the value)
+        self.counters = {}  # name -> (help, callable returning the total)
+        self.labelled = {}  # name -> (help, label, callable returning {label value: total})
+
+    def gauge(self, name, help, read):
+        self.gauges[name] = (help, read)
+
+    def counter(self, name, help, read):
+        self.counters[name] = (help, read)
+
+    def labelled_counter(self, name, help, label, read):
+        self.labelled[name] = (help, label, read)
+
+    def render(self):
+        """ Prometheus text exposition format """
+        lines = []
+        for name, (help, read) in self.counters.items():
+            lines += ['# HELP %s %s' % (name, help), '# TYPE %s counter' % name,
+                      '%s %d' % (name, read())]
+        for name, (help, label, read) in self.labelled.items():
+            lines += ['# HELP %s %s' % (name, help), '# TYPE %s counter' % name]
+            lines += ['%s{%s="%s"} %d' % (name, label, key, value) for key, value in read().items()]
+        for name, (help, read) in self.gauges.items():
+            lines += ['# HELP %s %s' % (name, help), '# TYPE %s gauge' % name,
+                      '%s %s' % (name, read())]
+        name = 'thermostat_stage_seconds'
+        lines += ['# HELP %s Time spent per server stage' % name, '# TYPE %s summary' % name]
+        for stage, histogram in self.stages.items():
+            for fraction, value in zip(QUANTILES, histogram.quantiles()):
+                lines.append('%s{stage="%s",quantile="%s"} %.9f' % (name, stage, fraction, value / 1e9))
+            lines.append('%s_sum{stage="%s"} %.9f' % (name, stage, histogram.total / 1e9))
+            lines.append('%s_count{stage="%s"} %d' % (name, stage, histogram.count()))
+        return '\n'.join(lines) + '\n'
+
+
+async def _handle(metrics, reader, writer):
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+        path = request.split(b' ', 2)[1] if request.count(b' ') >= 2 else b''
+        if path.split(b'?')[0] == b'/metrics':
+            status, body = '200 OK', metrics.render().encode()
+        else:
+            status, body = '404 Not Found', b'not found\n'
+        writer.write(('HTTP/1.0 %s\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                      'Content-Length: %d\r\nConnection: close\r\n\r\n' % (status, len(body))).encode()
+                     + body)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+            ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(metrics, host, port):
+    """ Serve metrics.render() at http://host:port/metrics from the running loop """
+    return await asyncio.start_server(lambda r, w: _handle(metrics, r, w), host, port)
+
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : outbound.py
+# Description : Batched outbound command queue for the control server
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import time
+from collections import deque
+
+DEFAULT_BATCH_SIZE = 256  # Replies encoded and sent per drain
+
+
+def encode_plain(keys, messages):
+    return messages
+
+
+class OutboundQueue(object):
+    """ Reply queue drained in batches through one long-lived socket
+
+    sendto is the bound server socket's sendto, so no socket is created per
+    reply. encode_batch(keys, messages) wraps a whole batch of reply
+    payloads, addressed by device key, for the wire at once (the plain
+    server sends them as they are), which lets the encrypted server do its
+    cipher setup once per batch instead of once per reply. With metrics
+    (metrics.Metrics), each batch's encode and send times are recorded.
+    """
+
+    def __init__(self, sendto, encode_batch=encode_plain, batch_size=DEFAULT_BATCH_SIZE, metrics=None):
+        self.sendto = sendto
+        self.encode_batch = encode_batch
+        self.batch_size = batch_size
+        self.metrics = metrics
+        self.pending = deque()  # (device key, addr, message)
+        self.sent = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, key, addr, message):
+        self.pending.append((key, addr, message))
+
+    def drain(self):
+        """ Send one batch, return True if more replies are still queued """
+        pending = self.pending
+        count = min(len(pending), self.batch_size)
+        if not count:
+            return False
+        batch = [pending.popleft() for _ in range(count)]
+        start = time.perf_counter_ns()
+        payloads = self.encode_batch([key for key, _, _ in batch],
+                                     [message for _, _, message in batch])
+        encoded = time.perf_counter_ns()
+        sendto = self.sendto
+        for (_, addr, _), payload in zip(batch, payloads):
+            try:
+                sendto(payload, addr)
+            except OSError:
+                # A full socket buffer drops the reply like the network
+                # would; the thermostat's next report gets a fresh one
+                self.dropped += 1
+        self.sent += count
+        if self.metrics is not None:
+            self.metrics.stages['encode'].record(encoded - start)
+            self.metrics.stages['send'].record(time.perf_counter_ns() - encoded)
+        return bool(pending)
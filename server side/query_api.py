@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : query_api.py
+# Description : Local HTTP/JSON API over published snapshots of the device
+#               table, with set point overrides queued into the control loop
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The API runs in its own process so that readers, JSON encoding and slow
+# HTTP clients never take the control loop's time or its GIL. Every
+# PUBLISH_INTERVAL the loop copies the columns the API serves into one
+# structured NumPy array and hands it to a writer thread, which writes it
+# down a pipe (header, then the raw rows); while a copy is still on its
+# way the next one is skipped, so a stalled API process costs the loop
+# nothing. The API process reads the pipe without blocking as data
+# arrives, swaps in each complete snapshot whole and never modifies it,
+# and the device list is encoded once per snapshot however often it is
+# read. It runs under
+# SCHED_IDLE where Linux has it (else at API_NICE), so the server preempts
+# it as soon as a datagram arrives even when both share one CPU.
+#
+# Set point overrides go the other way: the API process sends (key code,
+# set point) over a Unix datagram socket and the loop applies it on its
+# next pass, like a datagram from the device, so the decision, the reply
+# to the thermostat, the state log and the history follow as usual.
+# Window statistics are too costly to copy for the whole fleet every
+# snapshot, so a stats request goes over the same socket as (key code,
+# request number) and the loop answers it with that device's statistics.
+#
+#   GET  /devices                        every device
+#   GET  /devices/<id | ip:port>         one device
+#   GET  /devices/<id | ip:port>/stats   its rolling statistics (see rolling_stats.py)
+#   POST /devices/<id | ip:port>         {"set_temp": 21.5}, answered 202 once queued
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import struct
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# The wire protocol is shared with the clients and lives in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from device_table import key_code, key_from_code
+from structured_log import get_log
+from thermostat_protocol import TEMP_SCALE
+from timeseries import parse_key
+
+PUBLISH_INTERVAL = 0.5  # Seconds between snapshots
+API_NICE = 19           # Niceness of the API process where SCHED_IDLE is missing
+OVERRIDE_BATCH = 256    # Overrides applied per readiness callback before yielding
+MAX_BODY = 4096
+MAX_SET_TEMP = 32767 / TEMP_SCALE  # Largest set point the binary protocol carries
+STATS_TIMEOUT = 1.0     # Seconds to wait for the loop to answer a stats request
+MAX_REPLY = 65536
+PIPE_READ = 1 << 20     # Bytes of snapshot read from the pipe per call
+# Unix datagram sockets and descriptors passed to the API process
+API_SUPPORTED = os.name == 'posix'
+SNAPSHOT_HEADER = struct.Struct('<dI')  # wall clock time published, devices
+OVERRIDE = struct.Struct('<Qd')  # device key code, set point
+STATS_REQUEST = struct.Struct('<QI')  # device key code, request number
+STATS_REPLY = struct.Struct('<I')  # request number, followed by the statistics as JSON
+SNAPSHOT = np.dtype([('key', '<u8'), ('current_temp', '<f8'), ('set_temp', '<f8'), ('heat', '?'),
+                     ('cool', '?'), ('binary', '?'), ('age', '<f4'), ('ewma', '<f4'), ('rate', '<f4')])
+
+
+class QueryApi(object):
+    """ The control loop's side of the API: publishes snapshots, takes overrides, answers stats """
+
+    def __init__(self, addr, log, interval=PUBLISH_INTERVAL):
+        self.addr = addr  # (host, port) the API process serves on
+        self.log = log
+        self.interval = interval
+        self.loop = None
+        self.devices = None
+        self.stats = None
+        self.apply = None  # Called with (device key, set point) for every override
+        self.query = None  # Called with a device key for every stats request
+        self.process = None  # The API process, a subprocess.Popen
+        self.snapshots = None  # Descriptor of the pipe end the snapshots are written to
+        self.overrides = None  # Unix datagram socket the overrides and stats requests arrive on
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix='api publisher')
+        self.sending = None  # Future of the snapshot on its way
+        self.timer = None
+        self.closing = False
+        self.published = 0
+        self.skipped = 0
+        self.overridden = 0
+        self.queried = 0
+
+    def start(self, loop, devices, stats, apply, query):
+        """ Start the API process, publishing devices (DeviceTable) and stats (RollingStats)
+
+        apply(key, set_temp) is called on the loop for every override, and
+        query(key) for every stats request; it returns the statistics as a
+        dict, or None.
+        """
+        self.loop = loop
+        self.devices = devices
+        self.stats = stats
+        self.apply = apply
+        self.query = query
+        receiver, self.snapshots = os.pipe()
+        self.overrides, queue = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.overrides.setblocking(False)
+        # A fresh interpreter rather than a fork, which would copy the log and
+        # writer threads' locks mid-use (and workers may not fork children)
+        host, port = self.addr
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--host', host, '--port', str(port),
+             '--snapshots-fd', str(receiver), '--overrides-fd', str(queue.fileno())],
+            pass_fds=(receiver, queue.fileno()))
+        os.close(receiver)
+        queue.close()
+        loop.add_reader(self.overrides.fileno(), self.overrides_ready)
+        self.publish()
+
+    def publish(self):
+        self.timer = self.loop.call_later(self.interval, self.publish)
+        if self.sending is not None and not self.sending.done():
+            self.skipped += 1
+            return
+        devices = self.devices
+        stats = self.stats
+        n = len(devices)
+        rows = np.empty(n, SNAPSHOT)
+        for name in ('key', 'current_temp', 'set_temp', 'heat', 'cool', 'binary'):
+            rows[name] = getattr(devices, 'key_code' if name == 'key' else name)[:n]
+        last_seen = devices.last_seen[:n]
+        rows['age'] = np.where(last_seen > 0, self.loop.time() - last_seen, np.nan)
+        m = min(n, stats.capacity)  # Devices added since the last tick have no statistics yet
+        rows['ewma'][m:] = rows['rate'][m:] = np.nan
+        seen = stats.last_time[:m] > 0
+        rows['ewma'][:m] = np.where(seen, stats.ewma[:m], np.nan)
+        rows['rate'][:m] = np.where(seen, stats.rate[:m], np.nan)
+        self.sending = self.writer.submit(self._send, SNAPSHOT_HEADER.pack(time.time(), n), rows)
+        self.published += 1
+
+    def _send(self, header, rows):
+        # Writer thread: the pipe writes release the GIL
+        try:
+            for data in memoryview(header), memoryview(rows.view(np.uint8)):
+                while data:
+                    data = data[os.write(self.snapshots, data):]
+        except OSError as e:
+            if not self.closing:  # The API process died: stop publishing
+                self.log.error('api_publish_failed', error=str(e))
+                self.loop.call_soon_threadsafe(self.close)
+
+    def overrides_ready(self):
+        for _ in range(OVERRIDE_BATCH):
+            try:
+                data = self.overrides.recv(OVERRIDE.size)
+            except (BlockingIOError, InterruptedError):
+                break
+            if len(data) == STATS_REQUEST.size:
+                self.answer(*STATS_REQUEST.unpack(data))
+                continue
+            code, set_temp = OVERRIDE.unpack(data)
+            self.overridden += 1
+            self.apply(key_from_code(code), set_temp)
+
+    def answer(self, code, number):
+        self.queried += 1
+        reply = STATS_REPLY.pack(number) + json.dumps(self.query(key_from_code(code))).encode()
+        try:
+            self.overrides.send(reply)
+        except OSError:  # The API process is not reading: it times the request out
+            pass
+
+    def close(self):
+        if self.closing or self.process is None:
+            return
+        self.closing = True
+        self.timer.cancel()
+        self.loop.remove_reader(self.overrides.fileno())
+        self.process.terminate()  # Also ends a send blocked on the pipe
+        self.process.wait()
+        self.writer.shutdown(wait=True)
+        os.close(self.snapshots)
+        self.overrides.close()
+
+
+# API process
+
+class Snapshot(object):
+    """ One published copy of the device table, sorted by key code, read-only """
+
+    def __init__(self, published, rows):
+        self.published = published
+        self.rows = rows[np.argsort(rows['key'], kind='stable')]
+        self.rows.flags.writeable = False
+        self._body = None
+
+    def find(self, code):
+        """ Row of the device with this key code, None if not in the snapshot """
+        codes = self.rows['key']
+        i = int(np.searchsorted(codes, np.uint64(code)))
+        return i if i < len(codes) and codes[i] == code else None
+
+    def device(self, i):
+        return _device(self.rows[i:i + 1].tolist()[0])
+
+    def body(self):
+        """ Every device as JSON, encoded on first use """
+        if self._body is None:
+            self._body = json.dumps({'published': self.published,
+                                     'devices': [_device(row) for row in self.rows.tolist()]}).encode()
+        return self._body
+
+
+def _number(value):
+    return None if math.isnan(value) else round(value, 3)
+
+
+def _rounded(stats):
+    """ Rolling statistics (see RollingStats.query) with the floats rounded like _number """
+    return {name: _rounded(value) if isinstance(value, dict) else
+            round(value, 3) if isinstance(value, float) else value
+            for name, value in stats.items()}
+
+
+def _device_id(code):
+    """ A device id, or 'ip:port' for a CSV device, as in the URLs """
+    key = key_from_code(code)
+    return '%s:%d' % key if isinstance(key, tuple) else key
+
+
+def _device(row):
+    code, current_temp, set_temp, heat, cool, binary, age, ewma, rate = row
+    return {'id': _device_id(code), 'current_temp': current_temp,
+            'set_temp': set_temp, 'heat': heat, 'cool': cool, 'protocol': 'binary' if binary else 'csv',
+            'age': _number(age), 'ewma': _number(ewma), 'rate_per_hour': _number(rate)}
+
+
+class QueryServer(object):
+    """ Answers the HTTP requests from the latest snapshot """
+
+    def __init__(self, overrides):
+        self.overrides = overrides
+        self.snapshot = Snapshot(0.0, np.zeros(0, SNAPSHOT))
+        self.requests = 0  # Number of the last stats request sent
+        self.pending = {}  # request number -> future of its statistics
+        self.incoming = bytearray()  # Snapshot bytes read but not yet complete
+
+    def receive(self, snapshots):
+        """ The snapshot pipe (non-blocking descriptor) is readable: take what is there """
+        try:
+            data = os.read(snapshots, PIPE_READ)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:  # The server is gone
+            loop = asyncio.get_running_loop()
+            loop.remove_reader(snapshots)
+            loop.stop()
+            return
+        incoming = self.incoming
+        incoming += data
+        # Only the newest complete snapshot is kept
+        start = latest = 0
+        while len(incoming) - start >= SNAPSHOT_HEADER.size:
+            published, n = SNAPSHOT_HEADER.unpack_from(incoming, start)
+            end = start + SNAPSHOT_HEADER.size + n * SNAPSHOT.itemsize
+            if end > len(incoming):
+                break
+            latest, start = (published, n, start), end
+        if latest:
+            published, n, offset = latest
+            self.snapshot = Snapshot(published, np.frombuffer(incoming, SNAPSHOT, n,
+                                                              offset + SNAPSHOT_HEADER.size))
+            del incoming[:start]
+
+    def replies(self):
+        """ Stats replies from the loop: resolve the requests still waiting for them """
+        while True:
+            try:
+                data = self.overrides.recv(MAX_REPLY)
+            except (BlockingIOError, InterruptedError):
+                return
+            future = self.pending.pop(STATS_REPLY.unpack_from(data)[0], None)
+            if future is not None and not future.done():
+                future.set_result(json.loads(data[STATS_REPLY.size:]))
+
+    async def stats(self, code):
+        """ -> (HTTP status, result) for the rolling statistics of the device with this key code """
+        self.requests = number = (self.requests + 1) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self.pending[number] = future
+        try:
+            self.overrides.send(STATS_REQUEST.pack(code, number))
+            stats = await asyncio.wait_for(future, STATS_TIMEOUT)
+        except OSError:  # The loop has a backlog of requests
+            return '503 Service Unavailable', {'error': 'request queue full'}
+        except asyncio.TimeoutError:
+            return '504 Gateway Timeout', {'error': 'no answer from the control loop'}
+        finally:
+            self.pending.pop(number, None)
+        if stats is None:
+            return '404 Not Found', {'error': 'no temperature reports from %s yet' % _device_id(code)}
+        return '200 OK', dict(id=_device_id(code), **_rounded(stats))
+
+    async def respond(self, method, path, body):
+        """ -> (HTTP status, JSON-able result or encoded body) """
+        snapshot = self.snapshot  # The same snapshot for the whole request
+        parts = path.strip('/').split('/')
+        if parts == ['devices'] and method == 'GET':
+            return '200 OK', snapshot.body()
+        if len(parts) not in (2, 3) or parts[0] != 'devices' or parts[2:] not in ([], ['stats']):
+            return '404 Not Found', {'error': 'not found'}
+        try:
+            code = key_code(parse_key(parts[1]))
+            if not 0 <= code < 1 << 64:
+                raise ValueError(code)
+        except (ValueError, OSError):  # OSError: not an IPv4 address
+            return '400 Bad Request', {'error': 'bad device id %r' % parts[1]}
+        i = snapshot.find(code)
+        if i is None:
+            return '404 Not Found', {'error': 'unknown device %s' % parts[1]}
+        if parts[2:]:
+            if method != 'GET':
+                return '405 Method Not Allowed', {'error': 'GET only'}
+            return await self.stats(code)
+        if method == 'GET':
+            return '200 OK', dict(snapshot.device(i), published=snapshot.published)
+        if method != 'POST':
+            return '405 Method Not Allowed', {'error': 'GET or POST'}
+        try:
+            set_temp = float(json.loads(body)['set_temp'])
+        except (ValueError, KeyError, TypeError):
+            return '400 Bad Request', {'error': 'expected {"set_temp": <degrees>}'}
+        if not abs(set_temp) <= MAX_SET_TEMP:
+            return '400 Bad Request', {'error': 'set_temp out of range'}
+        try:
+            self.overrides.send(OVERRIDE.pack(code, set_temp))
+        except OSError:  # The loop has a backlog of overrides
+            return '503 Service Unavailable', {'error': 'override queue full'}
+        return '202 Accepted', {'id': _device_id(code), 'set_temp': set_temp, 'queued': True}
+
+    async def handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+            lines = request.decode('latin-1').split('\r\n')
+            method, path = (lines[0].split(' ') + ['', ''])[:2]
+            length = 0
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            if length > MAX_BODY:
+                status, result = '413 Payload Too Large', {'error': 'body too large'}
+            else:
+                body = await asyncio.wait_for(reader.readexactly(length), 5) if length else b''
+                status, result = await self.respond(method, path.split('?')[0], body)
+            data = result if isinstance(result, bytes) else json.dumps(result).encode()
+            writer.write(('HTTP/1.0 %s\r\nContent-Type: application/json\r\n'
+                          'Content-Length: %d\r\nConnection: close\r\n\r\n' % (status, len(data))).encode()
+                         + data)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def stand_aside():
+    """ Yield the CPU to the control server whenever it wants it """
+    try:
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    except (AttributeError, OSError):
+        try:
+            os.nice(API_NICE)
+        except (AttributeError, OSError):  # Windows has neither
+            pass
+    # With autogroup scheduling a session competes as one unit, whatever
+    # its processes' policies: move to a session of its own and lower that
+    try:
+        os.setsid()
+        with open('/proc/self/autogroup', 'w') as f:
+            f.write(str(API_NICE))
+    except (AttributeError, OSError):  # AttributeError: no setsid (Windows)
+        pass
+
+
+async def _serve(addr, snapshots, overrides):
+    queries = QueryServer(overrides)
+    loop = asyncio.get_running_loop()
+    loop.add_reader(snapshots, queries.receive, snapshots)
+    loop.add_reader(overrides.fileno(), queries.replies)
+    try:
+        server = await asyncio.start_server(queries.handle, *addr)
+    except OSError as e:
+        get_log().error('api_unavailable', error=str(e))
+        return
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """ The API process, started by QueryApi """
+    parser = argparse.ArgumentParser(description='Thermostat device query API')
+    parser.add_argument('--host', required=True)
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--snapshots-fd', type=int, required=True)
+    parser.add_argument('--overrides-fd', type=int, required=True)
+    args = parser.parse_args()
+    stand_aside()
+    snapshots = args.snapshots_fd
+    os.set_blocking(snapshots, False)  # Read as it arrives, never waiting for the rest
+    overrides = socket.socket(fileno=args.overrides_fd)
+    overrides.setblocking(False)  # A full queue answers 503 rather than stalling every request
+    try:
+        asyncio.run(_serve((args.host, args.port), snapshots, overrides))
+    except (KeyboardInterrupt, RuntimeError):  # RuntimeError: stopped by receive()
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : rolling_stats.py
+# Description : Streaming per-device statistics over rolling windows
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Every window (WINDOWS) is split into BUCKETS time buckets per device, kept
+# as a ring: a sample only updates the bucket of the current time (min,
+# max, sum, count, and the seconds spent heating and cooling), reusing the
+# ring slot of the bucket that fell out of the window. All windows live in
+# one float32 array of shape (devices, windows, BUCKETS, FIELDS), so an
+# update is one gather, a few vectorised passes and one scatter for every
+# row of a control tick and every window at once, O(1) per device and
+# window; a window query combines its BUCKETS buckets. The window slides
+# in bucket steps, so it covers between BUCKETS - 1 and BUCKETS bucket
+# widths.
+#
+# The EWMA of the temperature and its rate of change (degrees per hour)
+# use a time constant, so irregular reports (devices only send changes)
+# weigh by the time between them. Duty cycle is time weighted too: the
+# seconds since a device's previous sample count for the heating/cooling
+# state decided then.
+#
+# The columns are indexed by DeviceTable row and grow with the table.
+import numpy as np
+
+WINDOWS = (('1m', 60.0), ('15m', 900.0), ('1h', 3600.0))
+BUCKETS = 10           # Buckets per window
+EWMA_TAU = 300.0       # Seconds, time constant of the EWMA and of the rate
+MAX_GAP = 300.0        # Longest gap between samples counted towards duty cycle
+FIELDS = ('min', 'max', 'sum', 'n', 'heat', 'cool', 'time')  # Last axis of a bucket ring
+MIN, MAX, SUM, N, HEAT, COOL, TIME = range(len(FIELDS))
+EMPTY_BUCKET = np.array([np.inf, -np.inf, 0, 0, 0, 0, 0], np.float32)
+COLUMNS = ('last_time', 'last_temp', 'last_heat', 'last_cool', 'ewma', 'rate')
+
+
+class RollingStats(object):
+    """ Rolling min/max/mean, duty cycle, EWMA and rate of change per device row """
+
+    def __init__(self, capacity=1024, windows=WINDOWS, buckets=BUCKETS, tau=EWMA_TAU):
+        self.windows = windows
+        self.names = [name for name, _ in windows]
+        self.bucket_width = np.array([width for _, width in windows]) / buckets
+        self.which = np.arange(len(windows))
+        self.buckets = buckets
+        self.tau = tau
+        self.capacity = 0
+        self.epochs = np.zeros((0, len(windows), buckets), np.int32)  # Bucket number held, -1 for none
+        self.values = np.zeros((0, len(windows), buckets, len(FIELDS)), np.float32)
+        self.last_time = np.zeros(0)           # Loop time of the previous sample, 0 before the first
+        self.last_temp = np.zeros(0)
+        self.last_heat = np.zeros(0, np.bool_)  # State decided at the previous sample
+        self.last_cool = np.zeros(0, np.bool_)
+        self.ewma = np.zeros(0)
+        self.rate = np.zeros(0)                # Degrees per hour
+        self.updates = 0
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        epochs = np.full((capacity,) + self.epochs.shape[1:], -1, np.int32)
+        epochs[:self.capacity] = self.epochs
+        values = np.empty((capacity,) + self.values.shape[1:], np.float32)
+        values[...] = EMPTY_BUCKET
+        values[:self.capacity] = self.values
+        self.epochs, self.values = epochs, values
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def nbytes(self):
+        """ Memory held, in bytes """
+        return self.epochs.nbytes + self.values.nbytes + sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    def update(self, devices, rows, now):
+        """ One sample per row (unique) of devices (DeviceTable) at loop time now """
+        if not len(rows):
+            return
+        if devices.capacity > self.capacity:
+            self._grow(devices.capacity)
+        temp = devices.current_temp[rows]
+        last_time = self.last_time[rows]
+        seen = last_time > 0
+        dt = np.where(seen, now - last_time, 0.0)
+        counted = np.minimum(dt, MAX_GAP)
+
+        # The current bucket of every row in every window: one gather and one scatter
+        epoch = (now // self.bucket_width).astype(np.int32)
+        index = (rows[:, None], self.which, epoch % self.buckets)
+        values = self.values[index]
+        values[self.epochs[index] != epoch] = EMPTY_BUCKET
+        np.minimum(values[..., MIN], temp[:, None], out=values[..., MIN], casting='unsafe')
+        np.maximum(values[..., MAX], temp[:, None], out=values[..., MAX], casting='unsafe')
+        added = np.column_stack((temp, np.ones_like(temp), counted * self.last_heat[rows],
+                                 counted * self.last_cool[rows], counted))
+        values[..., SUM:] += added[:, None, :]
+        self.values[index] = values
+        self.epochs[index] = epoch
+
+        alpha = np.where(seen, -np.expm1(-dt / self.tau), 1.0)
+        self.ewma[rows] += alpha * (temp - self.ewma[rows])
+        moving = seen & (dt > 0)
+        slope = np.divide((temp - self.last_temp[rows]) * 3600.0, dt, out=np.zeros_like(dt), where=moving)
+        self.rate[rows] += np.where(moving, alpha, 0.0) * (slope - self.rate[rows])
+        self.last_time[rows] = now
+        self.last_temp[rows] = temp
+        self.last_heat[rows] = devices.heat[rows]
+        self.last_cool[rows] = devices.cool[rows]
+        self.updates += len(rows)
+
+    def query(self, row, now):
+        """ Statistics of one device row at loop time now, None if it has no samples """
+        if row >= self.capacity or not self.last_time[row]:
+            return None
+        result = {'ewma': float(self.ewma[row]), 'rate_per_hour': float(self.rate[row]),
+                  'age': now - float(self.last_time[row])}
+        epoch = (now // self.bucket_width).astype(np.int32)
+        values = self.values[row]
+        live = (self.epochs[row] > (epoch - self.buckets)[:, None]) & (values[..., N] > 0)
+        low = np.where(live, values[..., MIN], np.inf).min(1).tolist()
+        high = np.where(live, values[..., MAX], -np.inf).max(1).tolist()
+        totals = np.where(live[..., None], values, 0).sum(1, dtype=np.float64).tolist()
+        for name, low, high, total in zip(self.names, low, high, totals):
+            n, seconds = int(total[N]), total[TIME]
+            result[name] = {
+                'samples': n,
+                'min': low if n else None,
+                'max': high if n else None,
+                'mean': total[SUM] / n if n else None,
+                'heat_duty': total[HEAT] / seconds if seconds else None,
+                'cool_duty': total[COOL] / seconds if seconds else None,
+            }
+        return result
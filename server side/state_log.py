@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : state_log.py
+# Description : Write-ahead log and snapshots of the device table, so a
+#               restarted server keeps every thermostat's set point
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Every control tick appends one fixed-size record per row it decided (the
+# row's durable state after the decision) to an in-memory buffer. A timer
+# group-commits the buffer every COMMIT_INTERVAL as one block: length,
+# CRC32 and the records, written and fsynced by a single writer thread, so
+# the loop never waits on the disk. A crash loses at most the last
+# interval, which the thermostats' next reports make good.
+#
+# Every SNAPSHOT_INTERVAL (or once a segment grows past SEGMENT_LIMIT) the
+# log moves on to a new segment and the table's durable columns are
+# copied and written as a snapshot that covers all older segments, which
+# are then deleted. Start-up loads the snapshot and replays the newer
+# segments, stopping at the first torn or corrupt block. Both are plain
+# NumPy arrays, so restoring hundreds of thousands of devices is a few
+# vectorised passes plus one dict insert per device.
+#
+# Files in the state directory:
+#   snapshot.npz      key, set_temp, current_temp, hysteresis, knob, segment
+#   wal-<n>.log       blocks of records, n counts up
+import os
+import re
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+COMMIT_INTERVAL = 0.1      # Seconds between group commits
+SNAPSHOT_INTERVAL = 300.0  # Seconds between snapshots
+SEGMENT_LIMIT = 64 << 20   # Bytes of log that trigger an early snapshot
+SNAPSHOT_FILE = 'snapshot.npz'
+SEGMENT_NAME = re.compile(r'wal-(\d+)\.log$')
+BLOCK_HEADER = struct.Struct('<II')  # record bytes, CRC32 of the records
+# The durable part of a device row, see DeviceTable.key_code for the key
+RECORD = np.dtype([('key', '<u8'), ('set_temp', '<f8'), ('current_temp', '<f8'),
+                   ('hysteresis', '<f8'), ('knob', 'i1')])
+DURABLE = RECORD.names[1:]  # DeviceTable columns saved with the key
+# macOS and Windows have no fdatasync; fsync also syncs the metadata
+fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+
+def segment_path(directory, number):
+    return os.path.join(directory, 'wal-%d.log' % number)
+
+
+def sync_directory(path):
+    """ Make the renames in directory path durable (Windows cannot open a directory) """
+    if os.name == 'nt':
+        return
+    directory = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def read_segment(path):
+    """ The records of one log segment, up to its first torn or corrupt block """
+    with open(path, 'rb') as f:
+        data = f.read()
+    blocks = []
+    offset = 0
+    while offset + BLOCK_HEADER.size <= len(data):
+        length, crc = BLOCK_HEADER.unpack_from(data, offset)
+        start = offset + BLOCK_HEADER.size
+        block = data[start:start + length]
+        if len(block) != length or length % RECORD.itemsize or zlib.crc32(block) != crc:
+            break
+        blocks.append(block)
+        offset = start + length
+    return np.frombuffer(b''.join(blocks), RECORD)
+
+
+class StateLog(object):
+    """ Durable device state for one ControlServer, kept in directory """
+
+    def __init__(self, directory, log, commit_interval=COMMIT_INTERVAL,
+                 snapshot_interval=SNAPSHOT_INTERVAL, segment_limit=SEGMENT_LIMIT):
+        self.directory = directory
+        self.log = log
+        self.commit_interval = commit_interval
+        self.snapshot_interval = snapshot_interval
+        self.segment_limit = segment_limit
+        self.devices = None
+        self.loop = None
+        self.pending = []  # Record batches not yet committed
+        self.segment = 0   # Number of the segment being written
+        self.segment_size = 0
+        self.file = None   # Only touched by the writer thread
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix='state writer')
+        self.timers = {}  # callback -> its next timer handle
+        self.records = 0   # Records committed
+        self.commits = 0
+        self.snapshots = 0
+
+    def recover(self, devices):
+        """ Load the snapshot and replay the log into devices, then start a new segment """
+        start = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        self.devices = devices
+        first, restored, replayed = 0, 0, 0
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(path):
+            with np.load(path) as snapshot:
+                first = int(snapshot['segment'])
+                restored = devices.restore(snapshot['key'], {name: snapshot[name] for name in DURABLE})
+        segments = self.segments()
+        for number in segments:
+            if number >= first:
+                records = read_segment(segment_path(self.directory, number))
+                # Only the last record of each device matters
+                keys, last = np.unique(records['key'][::-1], return_index=True)
+                latest = records[::-1][last]
+                devices.restore(keys, {name: latest[name] for name in DURABLE})
+                replayed += len(records)
+        self.segment = max(segments + [first - 1]) + 1
+        self.writer.submit(self._open_segment, self.segment).result()  # Raises here if it fails
+        self.log.info('state_recovered', directory=self.directory, devices=len(devices),
+                      snapshot_devices=restored, replayed=replayed,
+                      ms=round((time.perf_counter() - start) * 1e3, 1))
+
+    def segments(self):
+        return sorted(int(match.group(1)) for match in map(SEGMENT_NAME.match, os.listdir(self.directory))
+                      if match)
+
+    def start(self, loop):
+        """ Start the commit and snapshot timers on the server's loop """
+        self.loop = loop
+        self._every(self.commit_interval, self.commit)
+        self._every(self.snapshot_interval, self.snapshot)
+
+    def _every(self, interval, callback):
+        def tick():
+            self.timers[callback] = self.loop.call_later(interval, tick)
+            callback()
+        self.timers[callback] = self.loop.call_later(interval, tick)
+
+    def record(self, rows):
+        """ Queue the current durable state of rows (just decided) for the next commit """
+        if not len(rows):
+            return
+        devices = self.devices
+        records = np.empty(len(rows), RECORD)
+        records['key'] = devices.key_code[rows]
+        for name in DURABLE:
+            records[name] = getattr(devices, name)[rows]
+        self.pending.append(records.tobytes())
+
+    def commit(self):
+        """ Hand everything recorded since the last commit to the writer as one block """
+        self._flush()
+        if self.segment_size >= self.segment_limit:
+            self.snapshot()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        data = b''.join(self.pending)
+        self.pending = []
+        self.records += len(data) // RECORD.itemsize
+        self.commits += 1
+        self.segment_size += BLOCK_HEADER.size + len(data)
+        self._submit(self._append, BLOCK_HEADER.pack(len(data), zlib.crc32(data)) + data)
+
+    def snapshot(self):
+        """ Start a new segment and snapshot the table as of its start """
+        self._flush()
+        n = len(self.devices)
+        columns = {name: getattr(self.devices, name)[:n].copy() for name in DURABLE}
+        keys = self.devices.key_code[:n].copy()
+        self.segment += 1
+        self.segment_size = 0
+        self.snapshots += 1
+        self._submit(self._write_snapshot, self.segment, keys, columns)
+
+    def _submit(self, fn, *args):
+        """ Run fn on the writer thread; an unexpected error is logged, not left in its future """
+        self.writer.submit(fn, *args).add_done_callback(self._check)
+
+    def _check(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.log.error('state_writer_failed', error=repr(future.exception()))
+
+    def close(self):
+        """ Commit what is pending and snapshot, so the next start has nothing to replay """
+        for timer in self.timers.values():
+            timer.cancel()
+        if self.devices is not None:
+            self.snapshot()
+        self.writer.shutdown(wait=True)
+        if self.file is not None:
+            self.file.close()
+
+    # Writer thread
+
+    def _open_segment(self, number):
+        if self.file is not None:
+            self.file.close()
+        self.file = open(segment_path(self.directory, number), 'ab', buffering=0)
+
+    def _append(self, block):
+        try:
+            self.file.write(block)
+            fdatasync(self.file.fileno())
+        except (OSError, ValueError) as e:  # ValueError: the segment could not be opened
+            self.log.error('state_commit_failed', error=str(e))
+
+    def _write_snapshot(self, segment, keys, columns):
+        try:
+            self._open_segment(segment)
+            temp = os.path.join(self.directory, SNAPSHOT_FILE + '.tmp')
+            with open(temp, 'wb') as f:
+                np.savez(f, key=keys, segment=np.int64(segment), **columns)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, os.path.join(self.directory, SNAPSHOT_FILE))
+            sync_directory(self.directory)  # Make the rename durable before dropping the log
+            for number in self.segments():
+                if number < segment:
+                    os.remove(segment_path(self.directory, number))
+        except OSError as e:
+            self.log.error('state_snapshot_failed', error=str(e))
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : timeseries.py
+# Description : Memory-mapped per-device temperature history with raw,
+#               1-minute and 1-hour tiers
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Every tier is one file of fixed-size rings, one ring per device: slot s
+# of a file is device s's ring, so a device's history is contiguous and
+# the fleet costs one mapping per tier instead of one file per device.
+# index.bin holds, per slot, the device's key code (see
+# device_table.key_code), how many entries each tier has written and the
+# running aggregates of the minute and hour still open. All files are
+# NumPy memmaps; the kernel writes them back, and new devices extend
+# them at the end.
+#
+# The control tick appends the state of the rows that reported a
+# temperature since the last tick (not knob or set point changes): the raw
+# entry goes into the next ring position and the minute and hour
+# aggregates are updated, vectorised over the rows, with no search and no
+# reallocation. When a sample falls into a new minute (hour) the one that
+# ended is written to its tier as mean/min/max temperature, last set
+# point and heat/cool duty.
+#
+# history() answers a range query with NumPy views of the mapped rings:
+# one, or two when the range wraps around the end of the ring. Nothing is
+# copied, so a view changes under the reader as the server writes.
+#
+#   python3 timeseries.py <directory> <device id | ip:port> [--tier minute] [--since 3600]
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# The wire protocol is shared with the clients and lives in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from device_table import key_code
+from thermostat_protocol import COOL_FLAG, HEAT_FLAG
+
+# Ring length per tier and the width of a downsampled entry in seconds
+TIERS = (('raw', 256, 0), ('minute', 1440, 60), ('hour', 720, 3600))  # ~2 h+, 1 day, 30 days
+TIER_INDEX = {name: i for i, (name, _, _) in enumerate(TIERS)}
+INITIAL_SLOTS = 1024
+SAMPLE = np.dtype([('time', '<f8'), ('current_temp', '<f4'), ('set_temp', '<f4'), ('flags', 'u1')])
+SUMMARY = np.dtype([('time', '<f8'), ('current_temp', '<f4'), ('min', '<f4'), ('max', '<f4'),
+                    ('set_temp', '<f4'), ('heat', '<f4'), ('cool', '<f4')])
+OPEN_BUCKET = np.dtype([('start', '<f8'), ('n', '<u4'), ('sum', '<f8'), ('min', '<f4'), ('max', '<f4'),
+                        ('set_temp', '<f4'), ('heat', '<u4'), ('cool', '<u4')])
+INDEX = np.dtype([('key', '<u8'), ('used', 'u1'), ('written', '<u8', (len(TIERS),))]
+                 + [(name, OPEN_BUCKET) for name, _, width in TIERS if width])
+LAYOUT_FILE = 'layout.json'
+
+
+class TimeSeriesStore(object):
+    """ Per-device history rings in directory, 'r+' for the server or 'r' to read """
+
+    def __init__(self, directory, mode='r+'):
+        self.directory = directory
+        self.mode = mode
+        layout = {'tiers': [[name, length, width] for name, length, width in TIERS]}
+        path = os.path.join(directory, LAYOUT_FILE)
+        if mode == 'r+':
+            os.makedirs(directory, exist_ok=True)
+            if os.path.exists(path):
+                with open(path) as f:
+                    if json.load(f) != layout:
+                        raise ValueError("%s was written with other tiers, move it away" % directory)
+            else:
+                with open(path, 'w') as f:
+                    json.dump(layout, f)
+        self.capacity = 0
+        self.maps = []  # The np.memmap objects, for flush()
+        self.index = None
+        self.rings = {}
+        self._map(max(INITIAL_SLOTS, self._slots_on_disk()) if mode == 'r+' else self._slots_on_disk())
+        used = np.flatnonzero(self.index['used'])
+        self.count = int(used[-1]) + 1 if len(used) else 0  # Slots handed out
+        self.slot_of = dict(zip(self.index['key'][used].tolist(), used.tolist()))
+        self.row_slots = np.full(0, -1, np.int64)  # DeviceTable row -> slot, -1 until first seen
+        self.appended = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+    def _slots_on_disk(self):
+        path = self._path('index')
+        return os.path.getsize(path) // INDEX.itemsize if os.path.exists(path) else 0
+
+    def _map(self, capacity):
+        """ (Re)map every file for capacity slots, extending them first if needed """
+        files = [('index', INDEX, ())] + [(name, SAMPLE if not width else SUMMARY, (length,))
+                                          for name, length, width in TIERS]
+        maps = []
+        for name, dtype, shape in files:
+            path = self._path(name)
+            if self.mode == 'r+':
+                size = capacity * dtype.itemsize * int(np.prod(shape))
+                with open(path, 'ab') as f:
+                    if f.tell() < size:
+                        f.truncate(size)  # Sparse: pages are only allocated once written
+            if capacity:
+                mapped = np.memmap(path, dtype, self.mode, shape=(capacity,) + shape)
+                maps.append(mapped)
+                # Plain ndarray views: indexing a memmap subclass costs more than the copy
+                array = mapped.view(np.ndarray)
+            else:
+                array = np.zeros((0,) + shape, dtype)
+            if name == 'index':
+                self.index = array
+            else:
+                self.rings[name] = array
+        self.maps = maps
+        self.capacity = capacity
+
+    def slots(self, devices, rows):
+        """ Ring slots of DeviceTable rows, handing out slots to new devices """
+        if len(self.row_slots) < devices.capacity:
+            grown = np.full(devices.capacity, -1, np.int64)
+            grown[:len(self.row_slots)] = self.row_slots
+            self.row_slots = grown
+        slots = self.row_slots[rows]
+        for i in np.flatnonzero(slots < 0).tolist():
+            code = int(devices.key_code[rows[i]])
+            slot = self.slot_of.get(code)
+            if slot is None:
+                slot = self.count
+                if slot == self.capacity:
+                    self._map(self.capacity * 2)
+                self.count += 1
+                self.index['key'][slot] = code
+                self.index['used'][slot] = 1
+                self.slot_of[code] = slot
+            self.row_slots[rows[i]] = slots[i] = slot
+        return slots
+
+    def append(self, devices, rows, now):
+        """ One sample per row of devices (DeviceTable) at wall clock time now """
+        if not len(rows):
+            return
+        slots = self.slots(devices, rows)
+        temp = devices.current_temp[rows]
+        set_temp = devices.set_temp[rows]
+        cool = devices.cool[rows]
+        heat = devices.heat[rows]
+        samples = np.empty(len(rows), SAMPLE)
+        samples['time'] = now
+        samples['current_temp'] = temp
+        samples['set_temp'] = set_temp
+        samples['flags'] = cool * COOL_FLAG | heat * HEAT_FLAG
+        self._write('raw', slots, samples)
+        for name, _, width in TIERS[1:]:
+            buckets = self.index[name]
+            bucket = buckets[slots]  # One gather and one scatter per tier
+            start = now // width * width
+            ended = bucket['start'] != start
+            closed = ended & (bucket['n'] > 0)
+            if closed.any():
+                self._write(name, slots[closed], self._summaries(bucket[closed]))
+            bucket[ended] = (start, 0, 0.0, np.inf, -np.inf, 0.0, 0, 0)
+            bucket['n'] += 1
+            bucket['sum'] += temp
+            np.minimum(bucket['min'], temp, out=bucket['min'], casting='unsafe')
+            np.maximum(bucket['max'], temp, out=bucket['max'], casting='unsafe')
+            bucket['set_temp'] = set_temp
+            bucket['heat'] += heat
+            bucket['cool'] += cool
+            buckets[slots] = bucket
+        self.appended += len(rows)
+
+    @staticmethod
+    def _summaries(bucket):
+        """ Tier entries for the ended open buckets bucket """
+        summaries = np.empty(len(bucket), SUMMARY)
+        summaries['time'] = bucket['start']
+        summaries['current_temp'] = bucket['sum'] / bucket['n']
+        summaries['min'] = bucket['min']
+        summaries['max'] = bucket['max']
+        summaries['set_temp'] = bucket['set_temp']
+        summaries['heat'] = bucket['heat'] / bucket['n']
+        summaries['cool'] = bucket['cool'] / bucket['n']
+        return summaries
+
+    def _write(self, tier, slots, entries):
+        i = TIER_INDEX[tier]
+        written = self.index['written']
+        positions = written[slots, i]
+        self.rings[tier][slots, positions % self.rings[tier].shape[1]] = entries
+        written[slots, i] = positions + 1
+
+    def history(self, key, tier='raw', start=None, end=None):
+        """ Entries of device key in tier with start <= time <= end, as views oldest first """
+        slot = self.slot_of.get(key_code(key))
+        if slot is None:
+            return []
+        ring = self.rings[tier][slot]
+        written = int(self.index['written'][slot, TIER_INDEX[tier]])
+        length = len(ring)
+        if written <= length:
+            parts = [ring[:written]]
+        else:
+            head = written % length
+            parts = [ring[head:], ring[:head]]
+        views = []
+        for part in parts:
+            times = part['time']
+            low = 0 if start is None else int(np.searchsorted(times, start, 'left'))
+            high = len(part) if end is None else int(np.searchsorted(times, end, 'right'))
+            if high > low:
+                views.append(part[low:high])
+        return views
+
+    def flush(self):
+        if self.mode == 'r+':
+            for mapped in self.maps:
+                mapped.flush()
+
+
+def parse_key(text):
+    """ A device id (decimal or 0x..) or a CSV device's ip:port """
+    if ':' in text:
+        ip, port = text.rsplit(':', 1)
+        return ip, int(port)
+    return int(text, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print a thermostat\'s recorded history')
+    parser.add_argument('directory')
+    parser.add_argument('device', type=parse_key, help='device id, or ip:port of a CSV thermostat')
+    parser.add_argument('--tier', choices=TIER_INDEX, default='raw')
+    parser.add_argument('--since', type=float, metavar='SECONDS', help='only the last SECONDS')
+    args = parser.parse_args()
+    store = TimeSeriesStore(args.directory, 'r')
+    start = time.time() - args.since if args.since else None
+    for view in store.history(args.device, args.tier, start):
+        for entry in view.tolist():
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry[0]))
+            print(stamp, ' '.join('%s=%s' % (name, round(value, 2) if isinstance(value, float) else value)
+                                  for name, value in zip(view.dtype.names[1:], entry[1:])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#############################################################################
+# Filename    : workers.py
+# Description : Multi-process control server, one SO_REUSEPORT worker per core
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# Every worker binds its own socket to the server port with SO_REUSEPORT and
+# the kernel spreads incoming datagrams over them by sender address. Device
+# state is sharded by device key instead (device id, or the sender address
+# for CSV thermostats) with a jump consistent hash, so a device keeps the
+# same owner even when its address changes. A worker that receives another
+# shard's datagram forwards it, prefixed with the sender's address, over
+# the owner's Unix datagram socket; the owner answers through its own UDP
+# socket, which is bound to the same port. Linux only.
+import multiprocessing
+import os
+import socket
+import struct
+
+import thermostat_protocol
+from control_server import run
+
+FORWARD_HEADER = struct.Struct('!4sH')  # sender IPv4 address and port
+
+
+def jump_hash(key, buckets):
+    """ Jump consistent hash (Lamping & Veach) of a 64-bit key """
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+class Shard(object):
+    """ This worker's place among the workers and the forwarding sockets """
+
+    def __init__(self, index, count, inbox, outboxes):
+        self.index = index
+        self.count = count
+        self.inbox = inbox        # forwarded datagrams for this worker
+        self.outboxes = outboxes  # worker index -> socket delivering to its inbox
+        self.forwarded = 0
+        self.dropped = 0
+
+    def owner_of(self, data, addr):
+        device_id = thermostat_protocol.device_id_of(data)
+        if device_id is None:
+            # CSV thermostats are keyed by their address
+            ip, port = addr
+            device_id = (struct.unpack('!I', socket.inet_aton(ip))[0] << 16) | port
+        return jump_hash(device_id, self.count)
+
+    def forward(self, owner, data, addr):
+        ip, port = addr
+        try:
+            self.outboxes[owner].sendmsg([FORWARD_HEADER.pack(socket.inet_aton(ip), port), data])
+            self.forwarded += 1
+        except OSError:
+            self.dropped += 1
+
+    def receive_into(self, buffer):
+        """ Read one forwarded datagram -> (payload offset, length, sender address) """
+        nbytes = self.inbox.recv_into(buffer)
+        ip, port = FORWARD_HEADER.unpack_from(buffer)
+        return FORWARD_HEADER.size, nbytes, (socket.inet_ntoa(ip), port)
+
+
+def _worker(index, count, inboxes, outboxes, make_server, host, port):
+    server = make_server()
+    server.shard = Shard(index, count, inboxes[index], outboxes)
+    if server.metrics_addr is not None:
+        metrics_host, metrics_port = server.metrics_addr
+        server.metrics_addr = (metrics_host, metrics_port + index)  # One endpoint per worker
+    if server.api_addr is not None:
+        api_host, api_port = server.api_addr
+        server.api_addr = (api_host, api_port + index)  # Each worker serves its own shard
+    if server.state_dir is not None:
+        # Each worker logs its own shard; keep the worker count when restarting
+        server.state_dir = os.path.join(server.state_dir, 'worker-%d' % index)
+    if server.history_dir is not None:
+        server.history_dir = os.path.join(server.history_dir, 'worker-%d' % index)
+    run(server, host, port, reuse_port=True)
+
+
+def run_workers(count, make_server, host, port):
+    """ Fork count workers, each serving make_server() on host:port """
+    context = multiprocessing.get_context('fork')
+    pairs = [socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM) for _ in range(count)]
+    for inbox, outbox in pairs:
+        inbox.setblocking(False)
+        outbox.setblocking(False)
+    inboxes = [inbox for inbox, _ in pairs]
+    outboxes = [outbox for _, outbox in pairs]
+    processes = [context.Process(target=_worker, daemon=True,
+                                 args=(index, count, inboxes, outboxes, make_server, host, port))
+                 for index in range(count)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
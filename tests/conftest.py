@@ -0,0 +1,15 @@
+#############################################################################
+# Filename    : conftest.py
+# Description : Puts the server and shared modules on the path for the tests
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+#
+# The modules live in plain directories (with spaces in their names), not
+# packages, and the scripts find each other through sys.path; so do the tests.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('common', 'server side'):
+    sys.path.insert(0, os.path.join(ROOT, directory))
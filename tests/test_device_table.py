@@ -0,0 +1,104 @@
+#############################################################################
+# Filename    : test_device_table.py
+# Description : The vectorised control tick against the original server's rules
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import random
+
+import pytest
+
+from device_table import COMMAND_REFRESH, DeviceTable
+from thermostat_protocol import (MSG_COMMAND, MSG_KEEPALIVE, pack_knob, pack_telemetry, parse_csv,
+                                 unpack)
+
+
+def baseline(messages, set_temp=10):
+    """ (set temp, cool, heat) after messages, decided as the blocking server did for one device """
+    current_temp, knob = 0, None
+    cool = heat = False
+    for fields in messages:
+        if len(fields) == 1:  # Control knob status message
+            knob = fields[0]
+        else:
+            current_temp = float(fields[0])
+        # The knob applies once per message, whatever its type
+        if knob == 'Increasing':
+            set_temp += 1
+        elif knob == 'Decreasing':
+            set_temp -= 1
+        cool = current_temp > set_temp + 2
+        heat = current_temp < set_temp - 2
+    return set_temp, cool, heat
+
+
+def random_messages(rng, count):
+    messages = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            messages.append([rng.choice(('Increasing', 'Decreasing', 'Not Turned'))])
+        else:
+            # Whole and half degrees, so readings land exactly on the hysteresis edges too
+            messages.append(['%g' % (rng.randrange(-10, 60) / 2), '20'])
+    return messages
+
+
+@pytest.mark.parametrize('tick_every', [1, 3, 1000])
+def test_tick_matches_the_baseline_rules(tick_every):
+    rng = random.Random(tick_every)
+    devices = {('10.0.0.%d' % n, 5000 + n): random_messages(rng, 60) for n in range(8)}
+    table = DeviceTable(capacity=4)  # Grows on the way
+    # Interleave the devices' messages and tick every few of them
+    queue = [(addr, i) for addr, messages in devices.items() for i in range(len(messages))]
+    queue.sort(key=lambda item: (item[1], rng.random()))
+    for count, (addr, i) in enumerate(queue, 1):
+        row = table.row_for(addr)
+        table.update(row, addr, parse_csv(','.join(devices[addr][i]).encode()), now=count)
+        if count % tick_every == 0:
+            table.tick()
+    table.tick()
+    for addr, messages in devices.items():
+        row = table.index[addr]
+        assert (table.set_temp[row], bool(table.cool[row]), bool(table.heat[row])) == baseline(messages)
+
+
+def test_tick_answers_dirty_rows_and_reports_new_temperatures():
+    table = DeviceTable()
+    knob_row = table.row_for(1)
+    report_row = table.row_for(2)
+    idle_row = table.row_for(3)
+    table.update(knob_row, ('10.0.0.1', 1), unpack(pack_knob(1, 1, 1)))
+    table.update(report_row, ('10.0.0.2', 1), unpack(pack_telemetry(2, 1, 30.0, 20.0)))
+    rows, reported = table.tick()
+    assert rows.tolist() == [knob_row, report_row]
+    assert reported.tolist() == [report_row]
+    assert table.set_temp[knob_row] == 11 and table.set_temp[idle_row] == 10
+    assert table.cool[report_row] and not table.heat[report_row]
+    rows, reported = table.tick()
+    assert len(rows) == 0 and len(reported) == 0
+
+
+def test_unchanged_binary_commands_become_keepalives():
+    table = DeviceTable()
+    binary = table.row_for(7)
+    csv = table.row_for(('10.0.0.9', 4000))
+    table.update(binary, ('10.0.0.7', 1), unpack(pack_telemetry(7, 5, 30.0, 20.0)))
+    table.update(csv, ('10.0.0.9', 4000), parse_csv(b'30,20'))
+    rows, _ = table.tick()
+
+    def replies(now):
+        return {key: reply for key, _, reply in table.commands(rows, now)}
+
+    first = replies(now=1.0)
+    assert unpack(first[7])[:3] == (MSG_COMMAND, 7, 5)
+    assert first[('10.0.0.9', 4000)] == b'10,ON,OFF'
+    again = replies(now=2.0)
+    assert unpack(again[7])[:3] == (MSG_KEEPALIVE, 7, 5)
+    assert again[('10.0.0.9', 4000)] == b'10,ON,OFF'  # The CSV protocol has no keepalive
+    # A lost command is repeated once it is COMMAND_REFRESH old
+    assert unpack(replies(now=1.0 + COMMAND_REFRESH)[7])[0] == MSG_COMMAND
+    # A changed decision goes out at once
+    table.current_temp[binary] = 0.0
+    table.tick()
+    assert table.heat[binary]
+    assert unpack(replies(now=1.0 + COMMAND_REFRESH)[7])[0] == MSG_COMMAND
@@ -0,0 +1,88 @@
+#############################################################################
+# Filename    : test_histogram.py
+# Description : Latency histogram buckets and quantiles, and their /metrics text
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import math
+import random
+
+import pytest
+
+from histogram import BUCKETS, QUANTILES, SUB_COUNT, Histogram
+from metrics import Metrics
+
+
+def bucket_of(value):
+    histogram = Histogram()
+    histogram.record(value)
+    return next(index for index, count in enumerate(histogram.counts) if count)
+
+
+def exact_quantile(values, fraction):
+    """ The smallest value with at least fraction of the values at or below it """
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)), 1) - 1]
+
+
+def test_buckets_cover_every_value_once():
+    previous = -1
+    for value in list(range(5000)) + [2 ** 20 - 1, 2 ** 20, 2 ** 39 + 12345]:
+        index = bucket_of(value)
+        assert value <= Histogram.upper_bound(index)
+        assert index == 0 or Histogram.upper_bound(index - 1) < value
+        assert index >= previous
+        previous = index
+
+
+def test_bucket_width_is_within_an_eighth():
+    for index in range(2 * SUB_COUNT, BUCKETS):
+        low, high = Histogram.upper_bound(index - 1) + 1, Histogram.upper_bound(index)
+        assert high - low + 1 <= max(low / SUB_COUNT, 1)
+
+
+def test_empty_histogram_reports_zeros():
+    assert Histogram().quantiles() == [0] * len(QUANTILES)
+    assert Histogram().count() == 0
+
+
+def test_small_values_are_exact():
+    histogram = Histogram()
+    for value in range(1, 11):
+        histogram.record(value)
+    assert histogram.quantiles((0.1, 0.5, 0.9, 1.0)) == [1, 5, 9, 10]
+    assert histogram.count() == 10 and histogram.total == 55
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_quantiles_bound_the_exact_ones(seed):
+    rng = random.Random(seed)
+    # Log-normal latencies around 50 us, in nanoseconds
+    values = [int(rng.lognormvariate(math.log(50000), 1.0)) for _ in range(20000)]
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    fractions = (0.01,) + QUANTILES + (1.0,)
+    for fraction, estimate in zip(fractions, histogram.quantiles(fractions)):
+        exact = exact_quantile(values, fraction)
+        assert exact <= estimate <= exact * (1 + 1 / SUB_COUNT)
+
+
+def test_values_past_the_last_bucket_are_clamped():
+    histogram = Histogram()
+    histogram.record(2 ** 45)
+    histogram.record(-5)  # A clock stepping back counts as zero
+    assert histogram.counts[BUCKETS - 1] == 1 and histogram.counts[0] == 1
+    assert histogram.quantiles((1.0,)) == [Histogram.upper_bound(BUCKETS - 1)]
+
+
+def test_metrics_render_stage_quantiles_in_seconds():
+    metrics = Metrics()
+    for value in range(1, 101):
+        metrics.stages['decode'].record(value * 1000)
+    lines = metrics.render().splitlines()
+    decode = {line.split(' ')[0]: float(line.split(' ')[1]) for line in lines if 'stage="decode"' in line}
+    p50 = decode['thermostat_stage_seconds{stage="decode",quantile="0.5"}']
+    assert 50e-6 <= p50 <= 50e-6 * (1 + 1 / SUB_COUNT)
+    assert decode['thermostat_stage_seconds_count{stage="decode"}'] == 100
+    assert decode['thermostat_stage_seconds_sum{stage="decode"}'] == pytest.approx(5050e-6)
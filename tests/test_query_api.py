@@ -0,0 +1,92 @@
+#############################################################################
+# Filename    : test_query_api.py
+# Description : Snapshots through the API pipe, read without blocking
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from query_api import API_SUPPORTED, SNAPSHOT, SNAPSHOT_HEADER, QueryApi, QueryServer
+
+pytestmark = pytest.mark.skipif(not API_SUPPORTED, reason='the query API needs POSIX')
+
+
+class NullLog(object):
+    def error(self, event, **fields):
+        raise AssertionError('%s %s' % (event, fields))
+
+
+def snapshot(published, n):
+    rows = np.zeros(n, SNAPSHOT)
+    rows['key'] = np.arange(n)[::-1]
+    rows['set_temp'] = published
+    return SNAPSHOT_HEADER.pack(published, n), rows
+
+
+@pytest.fixture
+def pipe():
+    receiver, sender = os.pipe()
+    os.set_blocking(receiver, False)
+    yield receiver, sender
+    for fd in receiver, sender:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def drain(queries, receiver):
+    for _ in range(1000):
+        queries.receive(receiver)
+
+
+def test_fragments_and_backlogs_keep_the_newest_whole_snapshot(pipe):
+    receiver, sender = pipe
+    queries = QueryServer(None)
+    frames = [header + rows.tobytes() for header, rows in (snapshot(1.0, 3), snapshot(2.0, 0),
+                                                            snapshot(3.0, 5))]
+    os.write(sender, frames[0] + frames[1] + frames[2][:20])
+    drain(queries, receiver)
+    assert queries.snapshot.published == 2.0 and len(queries.snapshot.rows) == 0
+    os.write(sender, frames[2][20:-1])
+    drain(queries, receiver)
+    assert queries.snapshot.published == 2.0
+    os.write(sender, frames[2][-1:])
+    drain(queries, receiver)
+    assert queries.snapshot.published == 3.0
+    assert queries.snapshot.rows['key'].tolist() == [0, 1, 2, 3, 4]  # Sorted for lookups
+    assert not queries.incoming
+
+
+def test_large_snapshot_from_the_publisher_thread(pipe):
+    receiver, sender = pipe
+    api = QueryApi(('127.0.0.1', 0), NullLog())
+    api.snapshots = sender
+    header, rows = snapshot(7.0, 50000)  # Several pipe buffers full
+    writer = threading.Thread(target=api._send, args=(header, rows))
+    writer.start()
+    queries = QueryServer(None)
+    while queries.snapshot.published != 7.0:
+        queries.receive(receiver)
+    writer.join()
+    assert len(queries.snapshot.rows) == 50000
+    assert queries.snapshot.find(49999) == 49999
+
+
+def test_a_closed_pipe_stops_the_api_loop(pipe):
+    receiver, sender = pipe
+    queries = QueryServer(None)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        loop.add_reader(receiver, queries.receive, receiver)
+        loop.call_soon(os.close, sender)
+        await asyncio.sleep(5)
+
+    with pytest.raises(RuntimeError):  # asyncio.run: the loop stopped before serve() finished
+        asyncio.run(serve())
@@ -0,0 +1,139 @@
+#############################################################################
+# Filename    : test_rolling_stats.py
+# Description : Rolling window statistics against a direct computation
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import math
+import random
+
+import numpy as np
+import pytest
+
+from device_table import DeviceTable
+from rolling_stats import BUCKETS, EWMA_TAU, MAX_GAP, WINDOWS, RollingStats
+
+
+def feed(stats, devices, samples):
+    """ samples: {time: {device id: (temperature, heat, cool)}}, applied in time order """
+    for now in sorted(samples):
+        rows = []
+        for device_id, (temp, heat, cool) in samples[now].items():
+            row = devices.row_for(device_id)
+            devices.current_temp[row] = temp
+            devices.heat[row], devices.cool[row] = heat, cool
+            rows.append(row)
+        stats.update(devices, np.array(sorted(rows), np.intp), now)
+
+
+def expected(history, now):
+    """ What query() should give for one device's history [(time, temp, heat, cool)] at now """
+    result = {}
+    for name, width in WINDOWS:
+        bucket = width / BUCKETS
+        current = now // bucket
+        inside, seconds, heating, cooling = [], 0.0, 0.0, 0.0
+        previous = None
+        for time, temp, heat, cool in history:
+            # The time since the previous sample counts for the state decided then
+            counted = min(time - previous[0], MAX_GAP) if previous else 0.0
+            if current - BUCKETS < time // bucket <= current:
+                inside.append(np.float32(temp))
+                seconds += counted
+                heating += counted * previous[2] if previous else 0.0
+                cooling += counted * previous[3] if previous else 0.0
+            previous = (time, temp, heat, cool)
+        result[name] = {
+            'samples': len(inside),
+            'min': min(inside) if inside else None,
+            'max': max(inside) if inside else None,
+            'mean': sum(inside) / len(inside) if inside else None,
+            'heat_duty': heating / seconds if seconds else None,
+            'cool_duty': cooling / seconds if seconds else None,
+        }
+    return result
+
+
+def assert_window(actual, wanted):
+    assert actual['samples'] == wanted['samples']
+    for key in 'min', 'max', 'mean', 'heat_duty', 'cool_duty':
+        if wanted[key] is None:
+            assert actual[key] is None, key
+        else:
+            assert actual[key] == pytest.approx(wanted[key], rel=1e-4, abs=1e-4), key
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_windows_match_a_direct_computation(seed):
+    rng = random.Random(seed)
+    devices = DeviceTable(capacity=2)
+    stats = RollingStats(capacity=2)  # Both grow on the way
+    histories = {device_id: [] for device_id in range(5)}
+    samples = {}
+    now = 1.0
+    while now < 3 * 3600:
+        # Irregular reports: devices only send changes and heartbeats
+        now += rng.expovariate(1 / 20.0) + 0.001
+        reporting = rng.sample(sorted(histories), rng.randint(1, 3))
+        samples[now] = {}
+        for device_id in reporting:
+            sample = (round(rng.uniform(5, 35), 2), rng.random() < 0.3, rng.random() < 0.3)
+            samples[now][device_id] = sample
+            histories[device_id].append((now,) + sample)
+        if rng.random() < 0.02:
+            now += rng.uniform(0, 2 * MAX_GAP)  # Now and then a long silence
+    feed(stats, devices, samples)
+    for device_id, history in histories.items():
+        for later in (0.0, 45.0, 700.0):  # Queried at the last sample and as windows slide on
+            query_time = now + later
+            result = stats.query(devices.index[device_id], query_time)
+            wanted = expected(history, query_time)
+            for name, _ in WINDOWS:
+                assert_window(result[name], wanted[name])
+            assert result['age'] == pytest.approx(query_time - history[-1][0])
+
+
+def test_unknown_rows_have_no_statistics():
+    stats = RollingStats()
+    assert stats.query(0, 10.0) is None
+    assert stats.query(10 ** 6, 10.0) is None
+
+
+def test_window_forgets_old_samples():
+    devices = DeviceTable()
+    stats = RollingStats()
+    feed(stats, devices, {10.0: {1: (30.0, False, False)}, 100.0: {1: (20.0, False, False)}})
+    result = stats.query(0, 100.0)
+    assert result['1m'] == {'samples': 1, 'min': 20.0, 'max': 20.0, 'mean': 20.0,
+                            'heat_duty': 0.0, 'cool_duty': 0.0}
+    assert (result['15m']['samples'], result['15m']['min'], result['15m']['max']) == (2, 20.0, 30.0)
+    assert stats.query(0, 100.0 + 3600.0)['1h']['samples'] == 0
+
+
+def test_duty_cycle_weighs_time_in_each_state():
+    devices = DeviceTable()
+    stats = RollingStats()
+    # Heating decided at 0 s holds for 30 s, cooling decided at 30 s for 10 s
+    feed(stats, devices, {0.5: {1: (15.0, True, False)}, 30.5: {1: (25.0, False, True)},
+                          40.5: {1: (20.0, False, False)}})
+    window = stats.query(0, 40.5)['1m']
+    assert window['heat_duty'] == pytest.approx(0.75)
+    assert window['cool_duty'] == pytest.approx(0.25)
+
+
+def test_ewma_and_rate_follow_a_ramp():
+    devices = DeviceTable()
+    stats = RollingStats()
+    # One degree a minute, reported every 10 s for an hour
+    feed(stats, devices, {t: {1: (10.0 + t / 60.0, False, False)} for t in range(10, 3610, 10)})
+    result = stats.query(0, 3600.0)
+    assert result['rate_per_hour'] == pytest.approx(60.0, abs=0.01)  # Started from 0, 12 tau ago
+    # An EWMA of a ramp lags it by about tau
+    assert result['ewma'] == pytest.approx(10.0 + (3600.0 - EWMA_TAU) / 60.0, abs=0.1)
+
+
+def test_ewma_weighs_samples_by_the_time_between_them():
+    devices = DeviceTable()
+    stats = RollingStats()
+    feed(stats, devices, {1.0: {1: (10.0, False, False)}, 1.0 + EWMA_TAU: {1: (20.0, False, False)}})
+    assert stats.query(0, 1.0 + EWMA_TAU)['ewma'] == pytest.approx(20.0 - 10.0 * math.exp(-1))
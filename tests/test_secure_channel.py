@@ -0,0 +1,203 @@
+#############################################################################
+# Filename    : test_secure_channel.py
+# Description : Secure channel handshake, tampering, replay and server restarts
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import itertools
+
+import pytest
+
+from secure_channel import (REPLAY_WINDOW, SECURE_HEADER, Challenge, SecureServerChannel,
+                            SecureSession, load_keys, parse_header)
+
+DEVICE = 7
+PSK = bytes(range(16))
+
+
+@pytest.fixture
+def server():
+    ticks = itertools.count(1000)
+    return SecureServerChannel({DEVICE: PSK, 8: bytes(16)}, clock=lambda: next(ticks))
+
+
+def answer(session, challenge):
+    """ What the client does with a challenge: check it, then send its last frame again """
+    assert session.open(challenge, parse_header(challenge)[1]) == b''
+    return session.reseal()
+
+
+def connect(server, session, frame=b'hello'):
+    """ Run the handshake, return what the server made of the frame """
+    with pytest.raises(Challenge) as caught:
+        server.open(session.seal(frame))
+    return server.open(answer(session, caught.value.reply))
+
+
+def reply(server, session, payload):
+    data = server.seal(DEVICE, payload)
+    return session.open(data, parse_header(data)[1])
+
+
+def flip(data, index):
+    data = bytearray(data)
+    data[index] ^= 1
+    return bytes(data)
+
+
+def test_handshake_then_both_directions(server):
+    client = SecureSession(PSK, DEVICE)
+    assert connect(server, client) == (DEVICE, b'hello')
+    assert server.open(client.seal(b'next')) == (DEVICE, b'next')
+    assert reply(server, client, b'command') == b'command'
+    assert server.challenges == 1
+
+
+def test_server_opens_memoryviews(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    assert server.open(memoryview(bytearray(client.seal(b'view')))) == (DEVICE, b'view')
+
+
+@pytest.mark.parametrize('index', [
+    2,                              # device id
+    SECURE_HEADER.size - 17,        # salt
+    SECURE_HEADER.size,             # ciphertext
+    -1,                             # tag
+])
+def test_tampered_frames_are_rejected(server, index):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    frame = client.seal(b'payload')
+    with pytest.raises(ValueError):
+        server.open(flip(frame, index))
+    assert server.open(frame) == (DEVICE, b'payload')  # The session is unharmed
+
+
+def test_tampered_sequence_number_fails_authentication(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    with pytest.raises(ValueError, match='authentication'):
+        server.open(flip(client.seal(b'payload'), 9))
+
+
+def test_tampered_cookie_is_challenged_not_accepted(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    with pytest.raises(Challenge):
+        server.open(flip(client.seal(b'payload'), SECURE_HEADER.size - 1))
+
+
+def test_tampered_replies_are_rejected(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    data = server.seal(DEVICE, b'command')
+    with pytest.raises(ValueError):
+        client.open(flip(data, len(data) - 1), parse_header(data)[1])
+
+
+def test_wrong_key_never_gets_a_session(server):
+    impostor = SecureSession(bytes(16), DEVICE)
+    with pytest.raises(Challenge) as caught:
+        server.open(impostor.seal(b'hello'))
+    # The challenge is sealed with the real PSK, so the impostor cannot answer it
+    with pytest.raises(ValueError):
+        impostor.open(caught.value.reply, parse_header(caught.value.reply)[1])
+
+
+def test_replays_are_rejected(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    frames = [client.seal(b'%d' % n) for n in range(REPLAY_WINDOW + 2)]
+    assert server.open(frames[-1]) == (DEVICE, b'%d' % (REPLAY_WINDOW + 1))
+    # Late frames inside the window are accepted once
+    assert server.open(frames[2]) == (DEVICE, b'2')
+    for frame in frames[-1], frames[2]:
+        with pytest.raises(ValueError, match='replayed'):
+            server.open(frame)
+    with pytest.raises(ValueError, match='replayed'):
+        server.open(frames[0])  # Older than the window
+
+
+def test_replayed_replies_are_rejected(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    data = server.seal(DEVICE, b'command')
+    client.open(data, parse_header(data)[1])
+    with pytest.raises(ValueError, match='replayed'):
+        client.open(data, parse_header(data)[1])
+
+
+def test_unproven_salt_does_not_evict_the_live_session(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    # Anyone can send a frame with a new salt; it is only challenged
+    with pytest.raises(Challenge):
+        server.open(SecureSession(bytes(16), DEVICE).seal(b'spoof'))
+    with pytest.raises(Challenge):
+        server.open(SecureSession(PSK, DEVICE).seal(b'unanswered'))
+    assert server.open(client.seal(b'still here')) == (DEVICE, b'still here')
+    assert reply(server, client, b'command') == b'command'
+
+
+def test_restarted_client_replaces_its_session(server):
+    old = SecureSession(PSK, DEVICE)
+    connect(server, old)
+    stale = old.seal(b'stale')
+    new = SecureSession(PSK, DEVICE)
+    assert connect(server, new) == (DEVICE, b'hello')
+    assert reply(server, new, b'command') == b'command'
+    with pytest.raises(ValueError, match='earlier session'):
+        server.open(stale)
+
+
+def test_restarted_server_challenges_old_frames(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    captured = [client.seal(b'before restart %d' % n) for n in range(3)]
+    server.open(captured[0])
+    restarted = SecureServerChannel({DEVICE: PSK}, clock=itertools.count(1000).__next__)
+    # A frame recorded before the restart is never accepted, only challenged
+    for frame in captured:
+        with pytest.raises(Challenge):
+            restarted.open(frame)
+    # The live client answers and keeps going under the new cookie
+    with pytest.raises(Challenge) as caught:
+        restarted.open(client.seal(b'after restart'))
+    assert restarted.open(answer(client, caught.value.reply)) == (DEVICE, b'after restart')
+    assert reply(restarted, client, b'command') == b'command'
+    for frame in captured:
+        with pytest.raises(ValueError):
+            restarted.open(frame)
+
+
+def test_client_ignores_replies_of_an_earlier_server_run(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    old_reply = server.seal(DEVICE, b'old command')
+    restarted = SecureServerChannel({DEVICE: PSK})
+    with pytest.raises(Challenge) as caught:
+        restarted.open(client.seal(b'hello'))
+    restarted.open(answer(client, caught.value.reply))
+    with pytest.raises(ValueError, match='another server session'):
+        client.open(old_reply, parse_header(old_reply)[1])
+
+
+def test_devices_cannot_use_each_others_sessions(server):
+    client = SecureSession(PSK, DEVICE)
+    connect(server, client)
+    other = SecureSession(PSK, 8)  # Device 8 with device 7's key
+    with pytest.raises(Challenge) as caught:
+        server.open(other.seal(b'hello'))
+    with pytest.raises(ValueError):
+        other.open(caught.value.reply, parse_header(caught.value.reply)[1])
+    with pytest.raises(ValueError, match='unknown device'):
+        server.open(SecureSession(PSK, 9).seal(b'hello'))
+
+
+@pytest.mark.parametrize('content', ['{"7": "zz"}', '["7"]', '{"7": '])
+def test_bad_key_file_is_named(tmp_path, content):
+    path = tmp_path / 'device_keys.json'
+    path.write_text(content)
+    with pytest.raises(ValueError, match='bad device key file .*device_keys.json'):
+        load_keys(str(path))
@@ -0,0 +1,147 @@
+#############################################################################
+# Filename    : test_state_log.py
+# Description : Write-ahead log recovery: torn tails, corrupt blocks, snapshots
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import os
+import zlib
+
+import numpy as np
+
+from device_table import DeviceTable
+from state_log import BLOCK_HEADER, RECORD, SNAPSHOT_FILE, StateLog, read_segment, segment_path
+from thermostat_protocol import MSG_KNOB, MSG_TELEMETRY
+
+CSV_DEVICE = ('10.0.0.5', 4321)
+
+
+class RecordingLog(object):
+    """ Keeps what the state log reports """
+
+    def __init__(self):
+        self.records = []
+
+    def info(self, event, **fields):
+        self.records.append(('info', event, fields))
+
+    def error(self, event, **fields):
+        self.records.append(('error', event, fields))
+
+
+def decide(state, devices, reports):
+    """ One control tick over reports ({device key: (temperature, knob step)}), logged """
+    for key, (temp, step) in reports.items():
+        row = devices.row_for(key)
+        device_id = None if isinstance(key, tuple) else key
+        devices.update(row, key, (MSG_KNOB, device_id, 1, step, None))
+        devices.update(row, key, (MSG_TELEMETRY, device_id, 2, temp, 0.0))
+    rows, _ = devices.tick()
+    state.record(rows)
+
+
+def durable(devices):
+    """ {device key: (set temp, current temp, knob)} """
+    return {key: (devices.set_temp[row], devices.current_temp[row], devices.knob[row])
+            for key, row in devices.index.items()}
+
+
+def start(directory, log=None):
+    devices = DeviceTable()
+    state = StateLog(str(directory), log or RecordingLog())
+    state.recover(devices)
+    return state, devices
+
+
+def crash(state):
+    """ Stop as a killed server would: what the writer was handed is written, nothing more """
+    state.writer.shutdown(wait=True)
+    state.file.close()
+
+
+def test_replay_restores_the_last_decision_of_every_device(tmp_path):
+    state, devices = start(tmp_path)
+    decide(state, devices, {1: (20.0, 1), 2: (30.0, 0), CSV_DEVICE: (5.0, -1)})
+    state.commit()
+    decide(state, devices, {1: (21.5, 1), 3: (12.0, 0)})
+    state.commit()
+    expected = durable(devices)
+    crash(state)
+    state, recovered = start(tmp_path)
+    assert durable(recovered) == expected
+    assert recovered.set_temp[recovered.index[1]] == 14  # Two messages with the knob up, twice
+    state.close()
+
+
+def test_torn_tail_is_dropped_and_later_commits_survive(tmp_path):
+    state, devices = start(tmp_path)
+    decide(state, devices, {1: (20.0, 1), 2: (30.0, 0)})
+    state.commit()
+    expected = durable(devices)
+    crash(state)
+    # The crash tore the next block: its header and half its records made it to disk
+    records = np.zeros(2, RECORD)
+    records['key'] = [1, 2]
+    records['set_temp'] = 99.0
+    data = records.tobytes()
+    with open(segment_path(str(tmp_path), state.segment), 'ab') as f:
+        f.write(BLOCK_HEADER.pack(len(data), zlib.crc32(data)) + data[:len(data) // 2])
+
+    state, recovered = start(tmp_path)
+    assert durable(recovered) == expected
+    # New blocks go to a new segment, never after the torn bytes
+    decide(state, recovered, {2: (31.0, 1)})
+    state.commit()
+    expected = durable(recovered)
+    crash(state)
+    state, recovered = start(tmp_path)
+    assert durable(recovered) == expected
+    state.close()
+
+
+def test_replay_stops_at_a_corrupt_block(tmp_path):
+    path = str(tmp_path / 'wal-0.log')
+    blocks = []
+    for key in 1, 2, 3:
+        records = np.zeros(1, RECORD)
+        records['key'] = key
+        data = records.tobytes()
+        blocks.append(BLOCK_HEADER.pack(len(data), zlib.crc32(data)) + data)
+    corrupt = bytearray(blocks[1])
+    corrupt[-1] ^= 1
+    with open(path, 'wb') as f:
+        f.write(blocks[0] + bytes(corrupt) + blocks[2])
+    assert read_segment(path)['key'].tolist() == [1]
+    with open(path, 'wb') as f:
+        f.write(blocks[0] + BLOCK_HEADER.pack(RECORD.itemsize + 1, 0))  # Not a whole record
+    assert read_segment(path)['key'].tolist() == [1]
+
+
+def test_snapshot_covers_older_segments(tmp_path):
+    state, devices = start(tmp_path)
+    decide(state, devices, {1: (20.0, 1), 2: (30.0, -1)})
+    state.snapshot()
+    decide(state, devices, {2: (25.0, 0), 4: (18.0, 1)})
+    state.commit()
+    expected = durable(devices)
+    crash(state)
+    assert state.segments() == [state.segment]  # The snapshot replaced the older ones
+    assert os.path.exists(os.path.join(str(tmp_path), SNAPSHOT_FILE))
+    log = RecordingLog()
+    state, recovered = start(tmp_path, log)
+    assert durable(recovered) == expected
+    (level, event, fields), = log.records
+    assert (event, fields['snapshot_devices'], fields['replayed']) == ('state_recovered', 2, 2)
+    state.close()
+
+
+def test_clean_shutdown_leaves_nothing_to_replay(tmp_path):
+    state, devices = start(tmp_path)
+    decide(state, devices, {1: (20.0, 1)})
+    state.close()
+    expected = durable(devices)
+    log = RecordingLog()
+    state, recovered = start(tmp_path, log)
+    assert durable(recovered) == expected
+    assert log.records[0][2]['replayed'] == 0
+    state.close()
@@ -0,0 +1,89 @@
+#############################################################################
+# Filename    : test_thermostat_protocol.py
+# Description : Binary and CSV wire formats: round trips and malformed frames
+# Author      : Akshatha Vallampati
+# modification: 2026/18/10
+########################################################################
+import pytest
+
+from thermostat_protocol import (BINARY_PROBE, HEADER, MSG_COMMAND, MSG_KEEPALIVE, MSG_KNOB,
+                                 MSG_TELEMETRY, PROTOCOL_VERSION, WIRE_BINARY, WIRE_CSV, decode,
+                                 decode_command, device_id_of, encode_knob, encode_telemetry,
+                                 format_csv_command, is_binary, pack_command, pack_keepalive, pack_knob,
+                                 pack_telemetry, parse_csv, unpack)
+
+
+@pytest.mark.parametrize('frame, message', [
+    (pack_knob(7, 1, -1), (MSG_KNOB, 7, 1, -1, None)),
+    (pack_telemetry(0xFFFFFFFF, 2, -12.346, 21.5), (MSG_TELEMETRY, 0xFFFFFFFF, 2, -12.35, 21.5)),
+    (pack_command(7, 3, 19.25, True, False), (MSG_COMMAND, 7, 3, 19.25, 1)),
+    (pack_command(7, 4, 30, False, True), (MSG_COMMAND, 7, 4, 30.0, 2)),
+    (pack_keepalive(7, 5), (MSG_KEEPALIVE, 7, 5, None, None)),
+])
+def test_binary_round_trip(frame, message):
+    assert is_binary(frame)
+    assert device_id_of(frame) == message[1]
+    assert unpack(frame) == message
+    assert unpack(memoryview(bytearray(frame))) == message  # As the server hands it over
+    assert decode(frame) == message
+
+
+def test_temperatures_are_clamped_and_sequences_wrap():
+    assert unpack(pack_telemetry(1, 1 << 32, 1000.0, -1000.0))[2:] == (0, 327.67, -327.68)
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'Increasing', (MSG_KNOB, None, 0, 1, None)),
+    (b'Decreasing', (MSG_KNOB, None, 0, -1, None)),
+    (b'Not Turned', (MSG_KNOB, None, 0, 0, None)),
+    (b'21.5,20', (MSG_TELEMETRY, None, 0, 21.5, 20.0)),
+    (b'20,ON,OFF', (MSG_COMMAND, None, 0, 20.0, 1)),
+    (BINARY_PROBE.encode(), (MSG_KEEPALIVE, None, 0, 0, None)),
+])
+def test_csv_messages(data, message):
+    assert not is_binary(data)
+    assert device_id_of(data) is None
+    assert parse_csv(data) == message
+    assert decode(data) == message
+
+
+def test_clients_encode_both_formats():
+    # The CSV forms are exactly what the original client sent
+    assert encode_knob(WIRE_CSV, 7, 1, 'Increasing') == b'Increasing'
+    assert encode_telemetry(WIRE_CSV, 7, 1, 21.5, 20) == b'21.5,20'
+    assert decode(encode_knob(WIRE_BINARY, 7, 1, 'Decreasing')) == (MSG_KNOB, 7, 1, -1, None)
+    assert decode(encode_telemetry(WIRE_BINARY, 7, 2, 21.5, 20)) == (MSG_TELEMETRY, 7, 2, 21.5, 20.0)
+
+
+def test_replies_carry_their_wire_format():
+    assert decode_command(pack_command(7, 1, 19.5, False, True)) == (19.5, False, True, WIRE_BINARY)
+    assert decode_command(format_csv_command(19.5, True, False)) == (19.5, True, False, WIRE_CSV)
+    assert format_csv_command(10, False, False) == b'10,OFF,OFF'
+    assert decode_command(pack_keepalive(7, 1)) is None
+
+
+@pytest.mark.parametrize('frame', [
+    pack_keepalive(7, 1)[:HEADER.size - 1],        # Not even a header
+    bytes([PROTOCOL_VERSION, 99]) + bytes(8),      # Unknown type
+    pack_telemetry(7, 1, 20, 20)[:-1],             # Truncated
+    pack_knob(7, 1, 1) + b'\0',                    # Trailing byte
+    b'1,2,3,4',                                    # Too many CSV fields
+    b'warm,20',                                    # Not a number
+    b'\xff\xfe',                                   # Not UTF-8
+])
+def test_malformed_frames_raise_value_error(frame):
+    with pytest.raises(ValueError):
+        decode(frame)
+
+
+def test_unpack_rejects_short_frames_and_other_versions():
+    assert device_id_of(b'\x01\x02') is None
+    with pytest.raises(ValueError, match='short'):
+        decode(b'\x01\x02')
+    with pytest.raises(ValueError, match='version'):
+        unpack(bytes([PROTOCOL_VERSION + 1]) + pack_keepalive(7, 1)[1:])
+
+
+def test_a_client_cannot_send_commands_as_replies():
+    with pytest.raises(ValueError, match='expected a command'):
+        decode_command(pack_telemetry(7, 1, 20, 20))